@@ -2,5 +2,11 @@
 API関連のパッケージ
 """
 from .routes import create_routes
+from .json_api import create_api_routes
+from .events import create_event_routes, EventStreamGZipMiddleware
+from .static_assets import create_static_routes, asset_url
+from .metrics import create_metrics_routes, HTTPMetricsMiddleware
+from .tenants import TenantMiddleware
 
-__all__ = ['create_routes']
\ No newline at end of file
+__all__ = ['create_routes', 'create_api_routes', 'create_event_routes', 'EventStreamGZipMiddleware',
+           'create_static_routes', 'asset_url', 'create_metrics_routes', 'HTTPMetricsMiddleware', 'TenantMiddleware']
\ No newline at end of file
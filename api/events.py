@@ -0,0 +1,134 @@
+"""
+画面へのリアルタイム通知（Server-Sent Events）
+
+開いているページは GET /api/v1/events を購読し、届いたイベントで該当するカード・行・件数だけを書き換える
+（定期的な問い合わせやページの再読み込みはしない）。イベントの種類は utils.events を参照。
+差し込むカード・行のHTMLは GET /api/v1/fragments/emails でまとめて取得する。
+"""
+import gzip
+import io
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder
+from fastapi.responses import StreamingResponse
+from services.email_processor import EmailProcessor
+from services.tenants import current_tenant
+from api.routes import COMPLETED_ROW_FIELDS, TABLE_ROW_FIELDS
+from models.storage import EMAIL_CARD_FIELDS
+from templates.html_generator import generate_email_cards, generate_email_table_row, generate_completed_email_row
+from utils.events import Subscription, event_bus
+from config import API_PREFIX, EVENT_FRAGMENT_MAX_IDS, EVENT_HEARTBEAT_SECONDS, EVENT_RETRY_MS
+
+EVENTS_PATH = f"{API_PREFIX}/events"
+
+# 差し込み用HTMLの種類 → (描画関数, 必要なカラム)
+FRAGMENT_VIEWS = {
+    'card': (lambda email: generate_email_cards([email]), EMAIL_CARD_FIELDS),
+    'row': (generate_email_table_row, TABLE_ROW_FIELDS),
+    'completed-row': (generate_completed_email_row, COMPLETED_ROW_FIELDS),
+}
+
+# ページ側で表示先を判定するのに使うカラム
+FRAGMENT_FILTER_FIELDS = ('id', 'status', 'category', 'priority')
+
+
+class _SyncFlushGzipFile(gzip.GzipFile):
+    """書き込むたびに Z_SYNC_FLUSH で圧縮済みのデータを吐き出す GzipFile"""
+
+    def write(self, data) -> int:
+        written = super().write(data)
+        self.flush(zlib.Z_SYNC_FLUSH)
+        return written
+
+
+class StreamingGZipResponder(GZipResponder):
+    """ストリーミング応答のチャンクをその場で送る GZipResponder
+
+    Starlette の GZipResponder は GzipFile を flush しないため、最初の送信が gzip ヘッダーの10バイトだけになり、
+    一覧ページの先頭（head・スタイル・ナビ）がバッファが埋まるか全件読み終わるまで届かない。
+    """
+
+    def __init__(self, app, minimum_size: int, compresslevel: int = 9):
+        super().__init__(app, minimum_size, compresslevel=compresslevel)
+        # 親クラスの GzipFile がヘッダーを書き込んだバッファは使わない
+        self.gzip_buffer = io.BytesIO()
+        self.gzip_file = _SyncFlushGzipFile(mode="wb", fileobj=self.gzip_buffer, compresslevel=compresslevel)
+
+
+class EventStreamGZipMiddleware(GZipMiddleware):
+    """イベントストリームを除いて gzip 圧縮する
+
+    イベントストリームは圧縮しない（プロキシ側でもバッファされないように）。
+    逐次送信する一覧ページ（/completed・/all）はチャンクごとに flush して先頭をすぐ届ける。
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] == EVENTS_PATH:
+            await self.app(scope, receive, send)
+            return
+        if 'gzip' in Headers(scope=scope).get('Accept-Encoding', ''):
+            responder = StreamingGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """イベントを text/event-stream の1件に整形"""
+    data = json.dumps(event['data'], ensure_ascii=False, separators=(',', ':'))
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+
+async def _stream_events(request: Request, mailbox: str) -> AsyncIterator[str]:
+    """購読中のイベントを送り続ける（イベントがない間は EVENT_HEARTBEAT_SECONDS ごとにコメント行）"""
+    subscription: Subscription = event_bus.subscribe(mailbox)
+    try:
+        yield f"retry: {EVENT_RETRY_MS}\n\n"
+        while not await request.is_disconnected():
+            event = await subscription.get(EVENT_HEARTBEAT_SECONDS)
+            yield format_event(event) if event is not None else ": ping\n\n"
+    finally:
+        event_bus.unsubscribe(subscription)
+
+
+def create_event_routes(app: FastAPI, email_processor: EmailProcessor):
+    """リアルタイム通知のルートを作成"""
+
+    @app.get(EVENTS_PATH)
+    async def api_events(request: Request):
+        """このメールボックスの変更通知（email-changed / stats-changed / run-progress / resync）"""
+        return StreamingResponse(
+            _stream_events(request, current_tenant()),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    @app.get(f"{API_PREFIX}/fragments/emails")
+    async def api_email_fragments(ids: str, views: str = 'card'):
+        """変更のあったメールのカード・行HTML（ids=a,b&views=card,row,completed-row）
+
+        見つからないメールは含めない。ページ側は status・category・priority で表示先を判定する。
+        """
+        email_ids = list(dict.fromkeys(i.strip() for i in ids.split(',') if i.strip()))
+        if not email_ids:
+            raise HTTPException(status_code=400, detail="ids を指定してください")
+        if len(email_ids) > EVENT_FRAGMENT_MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"ids は{EVENT_FRAGMENT_MAX_IDS}件までです")
+        requested = [v.strip() for v in views.split(',') if v.strip()]
+        unknown = [v for v in requested if v not in FRAGMENT_VIEWS]
+        if unknown or not requested:
+            raise HTTPException(status_code=400, detail=f"views は {', '.join(FRAGMENT_VIEWS)} から指定してください")
+
+        fields = set(FRAGMENT_FILTER_FIELDS)
+        for view in requested:
+            fields.update(FRAGMENT_VIEWS[view][1])
+        emails = []
+        for email in email_processor.get_database().get_emails_by_ids(email_ids, fields=sorted(fields)):
+            fragment = {key: email.get(key) for key in FRAGMENT_FILTER_FIELDS}
+            fragment['html'] = {view: FRAGMENT_VIEWS[view][0](email) for view in requested}
+            emails.append(fragment)
+        return {"count": len(emails), "emails": emails}
@@ -0,0 +1,314 @@
+"""
+JSON API ルート定義 (v1)
+
+UIはこのAPIからデータだけを取得し、ページ全体を再描画せずにDOMを更新する。
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import FastAPI, HTTPException
+from services.email_processor import EmailProcessor
+from models.storage import SELECTABLE_EMAIL_FIELDS
+from templates.fragment_cache import email_card_cache
+from services.run_trace import decompress_spans
+from services.tenants import current_tenant, is_valid_tenant_id
+from config import (
+    API_PREFIX, API_MAX_LIMIT, BULK_MAX_IDS, DEFAULT_MAILBOX, EMAIL_CATEGORIES, PRIORITY_LEVELS, RETENTION_DAYS
+)
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """fieldsクエリ（カンマ区切り）を検証済みカラムリストに変換"""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in requested if f not in SELECTABLE_EMAIL_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不明なフィールド: {', '.join(unknown)}")
+    return requested
+
+
+# 一括操作 → (変更後のステータス, 変更対象にする現在のステータス)
+BULK_ACTIONS = {
+    'complete': ('completed', ('pending',)),
+    'delete': ('deleted', ('pending', 'completed')),
+}
+
+
+def _parse_bulk_filter(filters: Any, from_statuses: Tuple[str, ...]) -> Dict[str, Any]:
+    """一括操作の filter を検証して bulk_update_status の引数に変換（条件なしの全件操作は受け付けない）"""
+    if not isinstance(filters, dict):
+        raise HTTPException(status_code=400, detail="filter はオブジェクトで指定してください")
+    unknown = [key for key in filters if key not in ('category', 'priority', 'older_than_days', 'status')]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不明な条件: {', '.join(unknown)}")
+
+    parsed: Dict[str, Any] = {"from_statuses": from_statuses}
+    if filters.get("category"):
+        parsed["category"] = filters["category"]
+    if filters.get("priority"):
+        parsed["priority"] = PRIORITY_LEVELS.get(filters["priority"], filters["priority"])
+    if filters.get("older_than_days") is not None:
+        try:
+            parsed["older_than_days"] = int(filters["older_than_days"])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="older_than_days は整数で指定してください")
+        if parsed["older_than_days"] < 0:
+            raise HTTPException(status_code=400, detail="older_than_days は0以上で指定してください")
+    if filters.get("status"):
+        if filters["status"] not in from_statuses:
+            raise HTTPException(status_code=400, detail=f"status は {', '.join(from_statuses)} のいずれかです")
+        parsed["from_statuses"] = (filters["status"],)
+    if not any(key in parsed for key in ('category', 'priority', 'older_than_days')):
+        raise HTTPException(status_code=400, detail="filter に category・priority・older_than_days のいずれかを指定してください")
+    return parsed
+
+
+def create_api_routes(app: FastAPI, email_processor: EmailProcessor):
+    """JSON API ルートを作成"""
+
+    @app.get(f"{API_PREFIX}/emails")
+    async def api_list_emails(status: Optional[str] = 'pending', category: Optional[str] = None,
+                              priority: Optional[str] = None, fields: Optional[str] = None,
+                              limit: int = 50, offset: int = 0):
+        """メール一覧（fields=id,subject,... でカラム選択）"""
+        emails = email_processor.get_database().list_emails(
+            status=status or None,
+            category=category,
+            priority=PRIORITY_LEVELS.get(priority, priority) if priority else None,
+            fields=_parse_fields(fields),
+            limit=max(1, min(limit, API_MAX_LIMIT)),
+            offset=max(0, offset)
+        )
+        return {"count": len(emails), "emails": emails}
+
+    @app.get(f"{API_PREFIX}/emails/{{email_id}}")
+    async def api_get_email(email_id: str, fields: Optional[str] = None):
+        """メール詳細（保持期間を過ぎたものはアーカイブから返す）"""
+        db = email_processor.get_database()
+        email = db.get_email(email_id, fields=_parse_fields(fields))
+        if email is None:
+            email = db.get_archived_email(email_id, fields=_parse_fields(fields))
+        if email is None:
+            raise HTTPException(status_code=404, detail="メールが見つかりません")
+        return email
+
+    @app.post(f"{API_PREFIX}/emails/{{email_id}}/complete")
+    async def api_complete_email(email_id: str):
+        """メール完了マーク"""
+        success = email_processor.get_database().update_email_status(email_id, 'completed')
+        email_card_cache.invalidate(email_id)
+        if not success:
+            raise HTTPException(status_code=404, detail="メールが見つかりません")
+        email_processor.queue_gmail_writeback([email_id])
+        return {"success": True, "id": email_id, "status": "completed"}
+
+    @app.delete(f"{API_PREFIX}/emails/{{email_id}}")
+    async def api_delete_email(email_id: str):
+        """メール削除"""
+        success = email_processor.get_database().delete_email(email_id)
+        email_card_cache.invalidate(email_id)
+        if not success:
+            raise HTTPException(status_code=404, detail="メールが見つかりません")
+        return {"success": True, "id": email_id}
+
+    @app.post(f"{API_PREFIX}/emails/bulk")
+    async def api_bulk_update_emails(request: dict):
+        """メールの一括完了・削除（ids か filter で対象を指定し、1トランザクションで更新）
+
+        {"action": "complete", "ids": ["...", ...]}
+        {"action": "delete", "filter": {"category": "学会イベント", "older_than_days": 7}}
+        filter には category・priority・older_than_days（取り込みからの日数）・status を指定できる。
+        """
+        action = request.get("action")
+        if action not in BULK_ACTIONS:
+            raise HTTPException(status_code=400, detail=f"action は {', '.join(BULK_ACTIONS)} のいずれかです")
+        status, from_statuses = BULK_ACTIONS[action]
+        ids, filters = request.get("ids"), request.get("filter")
+        if (ids is None) == (filters is None):
+            raise HTTPException(status_code=400, detail="ids と filter のどちらか一方を指定してください")
+
+        if ids is not None:
+            if not isinstance(ids, list) or not ids or not all(isinstance(i, str) for i in ids):
+                raise HTTPException(status_code=400, detail="ids はメールIDの配列で指定してください")
+            if len(ids) > BULK_MAX_IDS:
+                raise HTTPException(status_code=400, detail=f"ids は{BULK_MAX_IDS}件までです")
+            updated = email_processor.get_database().bulk_update_status(
+                status, email_ids=ids, from_statuses=from_statuses
+            )
+        else:
+            filters = _parse_bulk_filter(filters, from_statuses)
+            updated = email_processor.get_database().bulk_update_status(status, **filters)
+
+        for email_id in updated:
+            email_card_cache.invalidate(email_id)
+        if status == 'completed':
+            email_processor.queue_gmail_writeback(updated)
+        return {"success": True, "action": action, "count": len(updated), "ids": updated}
+
+    @app.post(f"{API_PREFIX}/gmail/push")
+    def api_gmail_push(request: dict, token: str = ''):
+        """Gmail のプッシュ通知（Cloud Pub/Sub の push サブスクリプション）を受け取り、差分取り込みを予約
+
+        Pub/Sub は2xx以外を再送するので、宛先不明の通知も受け付けだけ返す（accepted: false）。
+        PROFMAIL_GMAIL_PUSH_TOKEN を設定した場合は push 先URLに ?token=... を付ける。
+        宛先のテナントを引くのに Gmail の getProfile を呼ぶことがあるので、同期関数としてスレッドプールで実行する。
+        """
+        if email_processor.gmail_push is None:
+            raise HTTPException(status_code=404, detail="プッシュ取り込みは無効です（PROFMAIL_GMAIL_PUSH=true で有効）")
+        try:
+            mailbox = email_processor.gmail_push.handle(request, token)
+        except PermissionError as e:
+            raise HTTPException(status_code=403, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"accepted": mailbox is not None, "mailbox": mailbox}
+
+    @app.get(f"{API_PREFIX}/stats")
+    async def api_stats():
+        """統計情報（ダッシュボードのカウンター更新用）"""
+        return email_processor.get_database().get_statistics()
+
+    @app.get(f"{API_PREFIX}/admin/stats")
+    async def api_admin_stats():
+        """管理用: 全メールボックス（シャード）の合計とメールボックスごとの統計"""
+        return {
+            "total": email_processor.db.get_statistics(),
+            "mailboxes": email_processor.db.get_mailbox_statistics()
+        }
+
+    @app.post(f"{API_PREFIX}/admin/retention")
+    def api_run_retention(request: Optional[dict] = None):
+        """管理用: 古いメールのアーカイブとDB圧縮を今すぐ実行（days・compact で上書き可）
+
+        VACUUM を含み時間がかかるので、イベントループを止めないよう同期関数としてスレッドプールで実行する。
+        """
+        request = request or {}
+        try:
+            days = int(request.get("days", RETENTION_DAYS))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="days は整数で指定してください")
+        if days < 0:
+            raise HTTPException(status_code=400, detail="days は0以上で指定してください")
+        result = email_processor.run_retention(days=days, compact=bool(request.get("compact", True)))
+        email_card_cache.clear()
+        return result
+
+    @app.get(f"{API_PREFIX}/categories")
+    async def api_categories():
+        """カテゴリ一覧と未対応件数"""
+        category_stats = email_processor.get_database().get_statistics().get('category_stats', {})
+        return {
+            "categories": [
+                {"name": name, "icon": icon, "pending": category_stats.get(name, 0)}
+                for name, icon in EMAIL_CATEGORIES.items()
+            ]
+        }
+
+    @app.get(f"{API_PREFIX}/cache")
+    async def api_cache_stats():
+        """HTMLフラグメントキャッシュ統計"""
+        return {"email_cards": email_card_cache.get_stats()}
+
+    @app.get(f"{API_PREFIX}/slack/recipients")
+    async def api_list_slack_recipients():
+        """このテナントのSlack DM配信先一覧（直近の配信レイテンシ・失敗回数付き）"""
+        return {"recipients": email_processor.get_database().get_slack_recipients(mailbox=current_tenant())}
+
+    @app.post(f"{API_PREFIX}/slack/recipients")
+    async def api_upsert_slack_recipient(request: dict):
+        """このテナントのSlack DM配信先の登録・更新（mailbox は省略するか、このテナントを指定）"""
+        slack_user_id = (request.get("slack_user_id") or "").strip()
+        if not slack_user_id:
+            raise HTTPException(status_code=400, detail="slack_user_id は必須です")
+        mailbox = request.get("mailbox") or current_tenant()
+        if not isinstance(mailbox, str) or not is_valid_tenant_id(mailbox):
+            raise HTTPException(status_code=400, detail="mailbox の形式が正しくありません")
+        if mailbox != current_tenant():
+            raise HTTPException(status_code=403, detail="他のテナントの配信先は登録できません")
+        db = email_processor.get_database()
+        success = db.upsert_slack_recipient(
+            slack_user_id,
+            display_name=request.get("display_name", ""),
+            mailbox=mailbox,
+            enabled=bool(request.get("enabled", True))
+        )
+        if not success and any(r['slack_user_id'] == slack_user_id for r in db.get_slack_recipients()):
+            raise HTTPException(status_code=409, detail="他のテナントに登録済みの配信先です")
+        return {"success": success, "slack_user_id": slack_user_id}
+
+    @app.delete(f"{API_PREFIX}/slack/recipients/{{slack_user_id}}")
+    async def api_delete_slack_recipient(slack_user_id: str):
+        """このテナントのSlack DM配信先の削除"""
+        if not email_processor.get_database().delete_slack_recipient(slack_user_id, mailbox=current_tenant()):
+            raise HTTPException(status_code=404, detail="配信先が見つかりません")
+        return {"success": True, "slack_user_id": slack_user_id}
+
+    @app.post(f"{API_PREFIX}/slack/dm-digests")
+    def api_send_dm_digests():
+        """このメールボックスの登録済み配信先へダイジェストDMを今すぐ一斉送信
+
+        配信先の数だけ Slack API を呼ぶので、イベントループを止めないよう
+        同期関数としてスレッドプールで実行する。
+        """
+        return email_processor.slack_service.send_dm_digests([], wait=True, mailboxes=[current_tenant()])
+
+    @app.get(f"{API_PREFIX}/runs")
+    async def api_list_runs(limit: int = 30):
+        """実行履歴（新しい順、段階別の所要時間つき）"""
+        runs = email_processor.get_database().get_processing_runs(limit=max(1, min(limit, API_MAX_LIMIT)))
+        return {"count": len(runs), "runs": runs}
+
+    @app.get(f"{API_PREFIX}/runs/{{run_id}}")
+    async def api_get_run(run_id: int):
+        """実行履歴1件（メール単位のスパン・エラー詳細つき）"""
+        run = email_processor.get_database().get_processing_run(run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail="実行履歴が見つかりません")
+        run['spans'] = decompress_spans(run['spans'])
+        return run
+
+    @app.get(f"{API_PREFIX}/tenants")
+    async def api_list_tenants():
+        """テナント一覧（定期実行時刻つき）"""
+        schedule = email_processor.tenants.schedule()
+        tenants = email_processor.tenants.tenants(enabled_only=False)
+        for tenant in tenants:
+            hour, minute = schedule.get(tenant['tenant_id'], (None, None))
+            tenant['scheduled_at'] = f"{hour:02d}:{minute:02d}" if hour is not None else None
+        return {"count": len(tenants), "tenants": tenants}
+
+    @app.post(f"{API_PREFIX}/tenants")
+    async def api_upsert_tenant(request: dict):
+        """テナントの登録・更新（Gmailトークンは python -m services.tenants add で作成）"""
+        tenant_id = (request.get("tenant_id") or "").strip()
+        try:
+            success = email_processor.tenants.add(
+                tenant_id,
+                display_name=request.get("display_name", ""),
+                enabled=bool(request.get("enabled", True))
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        email_processor.sync_tenant_schedule()
+        return {"success": success, "tenant_id": tenant_id}
+
+    @app.delete(f"{API_PREFIX}/tenants/{{tenant_id}}")
+    async def api_delete_tenant(tenant_id: str):
+        """テナントの削除（保存済みメールは残す）"""
+        if tenant_id == DEFAULT_MAILBOX:
+            raise HTTPException(status_code=400, detail="既定メールボックスは削除できません")
+        if not email_processor.tenants.remove(tenant_id):
+            raise HTTPException(status_code=404, detail="テナントが見つかりません")
+        email_processor.sync_tenant_schedule()
+        return {"success": True, "tenant_id": tenant_id}
+
+    @app.get(f"{API_PREFIX}/status")
+    async def api_status():
+        """処理状況"""
+        last_execution = email_processor.last_execution
+        return {
+            "tenant": current_tenant(),
+            "last_execution": last_execution.isoformat() if last_execution else None,
+            "last_processed_count": len(email_processor.last_tasks),
+            "timestamp": datetime.now().isoformat()
+        }
@@ -0,0 +1,63 @@
+"""
+メトリクス公開（/metrics）とHTTPリクエスト計測
+
+/metrics は Prometheus のテキスト形式でプロセス内レジストリの内容を返す。
+HTTPのレイテンシはルートのパステンプレート（例: /api/v1/emails/{email_id}）単位で集計する。
+"""
+import time
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from utils.metrics import metrics
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    'profmail_http_request_seconds', 'HTTPリクエストの処理時間（秒、レスポンス送信完了まで）',
+    ['method', 'route', 'status']
+)
+
+# Prometheus テキスト形式
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class HTTPMetricsMiddleware:
+    """リクエストごとの処理時間を記録するASGIミドルウェア
+
+    ストリーミング応答も最後のチャンクを送るまでを計測する。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # マッチしたルートのテンプレートで集計（未定義パスでラベルが増え続けないように）
+            route = scope.get('route')
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope['method'],
+                route=getattr(route, 'path', '<unmatched>'),
+                status=str(status_code)
+            )
+
+
+def create_metrics_routes(app: FastAPI):
+    """メトリクス公開ルートを作成"""
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        """Prometheus テキスト形式のメトリクス"""
+        return PlainTextResponse(metrics.render(), headers={"Content-Type": METRICS_CONTENT_TYPE})
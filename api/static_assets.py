@@ -0,0 +1,141 @@
+"""
+静的アセット配信（フィンガープリント付きURL + 事前圧縮）
+
+static/ 以下のCSS/JSを起動時に読み込み、内容ハッシュ入りのファイル名
+（例: /static/css/common.3f9a1c2b7d4e.css）で配信する。内容が変われば
+URLも変わるため、ブラウザには immutable で長期キャッシュさせられる。
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from config import STATIC_DIR, STATIC_URL_PREFIX, STATIC_CACHE_MAX_AGE
+
+try:
+    import brotli
+except ImportError:  # brotliは任意依存（なければgzipのみ）
+    brotli = None
+
+
+class StaticAsset:
+    """事前圧縮済みの静的アセット1ファイル"""
+
+    def __init__(self, path: str, content: bytes):
+        self.path = path
+        self.content = content
+        self.digest = hashlib.sha256(content).hexdigest()[:12]
+        self.etag = f'"{self.digest}"'
+        self.media_type = _media_type(path)
+        self.gzip = gzip.compress(content, compresslevel=9, mtime=0)
+        self.br = brotli.compress(content) if brotli else None
+
+    @property
+    def hashed_path(self) -> str:
+        """内容ハッシュ入りのパス（css/common.css → css/common.<hash>.css）"""
+        stem, ext = os.path.splitext(self.path)
+        return f"{stem}.{self.digest}{ext}"
+
+    def body_for(self, accept_encoding: str):
+        """Accept-Encodingに応じて(本文, Content-Encoding)を返す"""
+        if self.br is not None and 'br' in accept_encoding:
+            return self.br, 'br'
+        if 'gzip' in accept_encoding:
+            return self.gzip, 'gzip'
+        return self.content, None
+
+
+class StaticAssetRegistry:
+    """static/ 以下のアセットを保持し、論理パスとハッシュ付きパスを解決する"""
+
+    def __init__(self, root: str = STATIC_DIR):
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+        self.by_hashed_path: Dict[str, StaticAsset] = {}
+        self.load()
+
+    def load(self):
+        """アセットを読み込み、ハッシュ計算と圧縮を行う"""
+        self.assets.clear()
+        self.by_hashed_path.clear()
+        if not os.path.isdir(self.root):
+            print(f"⚠️ 静的アセットディレクトリがありません: {self.root}")
+            return
+
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                rel_path = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                with open(full_path, 'rb') as f:
+                    asset = StaticAsset(rel_path, f.read())
+                self.assets[rel_path] = asset
+                self.by_hashed_path[asset.hashed_path] = asset
+
+        print(f"✅ 静的アセット読み込み完了: {len(self.assets)}件")
+
+    def url(self, path: str) -> str:
+        """テンプレート用URL（未登録なら素のパス）"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return f"{STATIC_URL_PREFIX}/{path}"
+        return f"{STATIC_URL_PREFIX}/{asset.hashed_path}"
+
+    def resolve(self, path: str):
+        """リクエストパスから(アセット, ハッシュ一致か)を返す"""
+        asset = self.by_hashed_path.get(path)
+        if asset is not None:
+            return asset, True
+        return self.assets.get(path), False
+
+
+def _media_type(path: str) -> str:
+    """拡張子からContent-Typeを決定（text/* のcharsetはResponse側で付与される）"""
+    media_type, _ = mimetypes.guess_type(path)
+    return media_type or 'application/octet-stream'
+
+
+_registry: Optional[StaticAssetRegistry] = None
+
+
+def get_asset_registry() -> StaticAssetRegistry:
+    """アセットレジストリ取得（初回呼び出し時に読み込み）"""
+    global _registry
+    if _registry is None:
+        _registry = StaticAssetRegistry()
+    return _registry
+
+
+def asset_url(path: str) -> str:
+    """アセットのフィンガープリント付きURL"""
+    return get_asset_registry().url(path)
+
+
+def create_static_routes(app: FastAPI):
+    """静的アセット配信ルートを作成"""
+
+    @app.get(f"{STATIC_URL_PREFIX}/{{asset_path:path}}", include_in_schema=False)
+    async def static_asset(asset_path: str, request: Request):
+        """静的アセット配信（ハッシュ付きURLは immutable で長期キャッシュ）"""
+        asset, fingerprinted = get_asset_registry().resolve(asset_path)
+        if asset is None:
+            return Response(status_code=404)
+
+        if fingerprinted:
+            cache_control = f"public, max-age={STATIC_CACHE_MAX_AGE}, immutable"
+        else:
+            cache_control = "no-cache"
+        headers = {
+            "Cache-Control": cache_control,
+            "ETag": asset.etag,
+            "Vary": "Accept-Encoding",
+        }
+
+        if request.headers.get('if-none-match') == asset.etag:
+            return Response(status_code=304, headers=headers)
+
+        body, encoding = asset.body_for(request.headers.get('accept-encoding', ''))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=asset.media_type, headers=headers)
@@ -0,0 +1,85 @@
+"""
+リクエスト単位のテナント（教授のメールボックス）切り替え
+
+/t/{tenant_id}/... のパス、X-ProfMail-Tenant ヘッダー、Cookie の順でテナントを決め、
+処理中のテナント（services.tenants.current_tenant）に設定してからルートを呼ぶ。
+ルート側は email_processor.get_database() でそのテナントに絞ったDBを使う。
+"""
+from http.cookies import SimpleCookie
+from typing import Optional, Tuple
+from fastapi.responses import JSONResponse
+from services.tenants import TenantRegistry, tenant_context
+from config import DEFAULT_MAILBOX, TENANT_COOKIE_NAME, TENANT_HEADER_NAME, TENANT_PATH_PREFIX
+
+
+def _split_tenant_path(path: str) -> Optional[Tuple[str, str]]:
+    """/t/{tenant_id}/rest → (tenant_id, /rest)"""
+    prefix = TENANT_PATH_PREFIX.rstrip('/') + '/'
+    if not path.startswith(prefix):
+        return None
+    tenant_id, _, rest = path[len(prefix):].partition('/')
+    return (tenant_id, '/' + rest) if tenant_id else None
+
+
+def _header(scope, name: str) -> Optional[str]:
+    key = name.lower().encode('latin-1')
+    for header, value in scope.get('headers', []):
+        if header == key:
+            return value.decode('latin-1')
+    return None
+
+
+def _cookie_tenant(scope) -> Optional[str]:
+    raw = _header(scope, 'cookie')
+    if not raw:
+        return None
+    morsel = SimpleCookie(raw).get(TENANT_COOKIE_NAME)
+    return morsel.value if morsel else None
+
+
+class TenantMiddleware:
+    """リクエストのテナントを決めるASGIミドルウェア
+
+    パスで指定した場合はプレフィックスを外してルーティングし、Cookieにも保存する
+    （画面内のリンクは /all などの絶対パスのままでテナントが引き継がれる）。
+    未登録のテナントをパス・ヘッダーで指定した場合は404、Cookieが古い場合は既定メールボックスに戻す。
+    """
+
+    def __init__(self, app, registry: TenantRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        tenant_id = None
+        split = _split_tenant_path(scope['path'])
+        if split:
+            tenant_id, rest = split
+            # 外側のミドルウェア（メトリクス）がルートを参照できるよう scope は置き換えずに書き換える
+            scope['path'] = rest
+            scope['raw_path'] = rest.encode('utf-8')
+        else:
+            tenant_id = _header(scope, TENANT_HEADER_NAME)
+
+        if tenant_id is not None and not self.registry.exists(tenant_id):
+            response = JSONResponse({"detail": f"テナントが見つかりません: {tenant_id}"}, status_code=404)
+            await response(scope, receive, send)
+            return
+        if tenant_id is None:
+            tenant_id = _cookie_tenant(scope)
+            if tenant_id is not None and not self.registry.exists(tenant_id):
+                tenant_id = None
+
+        cookie = f'{TENANT_COOKIE_NAME}={tenant_id}; Path=/; SameSite=Lax'.encode('latin-1')
+
+        async def send_setting_cookie(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = [*message.get('headers', []), (b'set-cookie', cookie)]
+            await send(message)
+
+        send_wrapper = send_setting_cookie if split else send
+        with tenant_context(tenant_id or DEFAULT_MAILBOX):
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,5 @@
+"""
+ベンチマーク関連のパッケージ
+
+リポジトリのルートから `python -m benchmarks.<name>` で実行する。
+"""
@@ -0,0 +1,167 @@
+"""
+本文・返信草案の圧縮ベンチマーク
+
+合成コーパス（benchmarks.corpus）を圧縮ありで投入したDBと、同じ内容を平文に戻したDBを作り、
+ファイルサイズ・ページキャッシュのヒット率・一覧/詳細取得のレイテンシを比較する。
+一時ディレクトリのDBで計測する（既存DBには触れない）。
+
+ページキャッシュのヒット率は、ワークロード中にSQLiteがファイルから読んだページ数（/proc/self/io の
+rchar の増分 ÷ ページサイズ）と、キャッシュをほぼ無効にして同じワークロードを流したときの読み込み
+ページ数（≒要求ページ数）から求める（Pythonの sqlite3 は sqlite3_db_status を公開していないため）。
+    python -m benchmarks.bench_compression --emails 20000 --cache-kb 2000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import DEFAULT_MAILBOX, EMAIL_CATEGORIES
+from models.compression import COMPRESSED_EMAIL_FIELDS, decompress_text
+from models.database import email_row, select_columns_sql
+from models.storage import EMAIL_CARD_FIELDS, EMAIL_FIELDS
+from benchmarks.bench_pipeline import percentile
+
+
+def read_bytes() -> Optional[int]:
+    """このプロセスが read 系のシステムコールで読んだバイト数（Linux のみ）"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def decompress_database(path: str):
+    """圧縮済みの body・reply_draft を平文に戻す（比較用の「圧縮前」DB）"""
+    conn = sqlite3.connect(path)
+    rows = conn.execute(f"SELECT rowid, {', '.join(COMPRESSED_EMAIL_FIELDS)} FROM emails").fetchall()
+    conn.executemany(
+        f"UPDATE emails SET {', '.join(f'{field} = ?' for field in COMPRESSED_EMAIL_FIELDS)} WHERE rowid = ?",
+        [(*(decompress_text(value) for value in values), rowid) for rowid, *values in rows]
+    )
+    conn.commit()
+    conn.close()
+
+
+def vacuum(path: str):
+    conn = sqlite3.connect(path)
+    conn.execute('VACUUM')
+    conn.close()
+
+
+def build_workload(conn: sqlite3.Connection, page: int, pages: int, details: int,
+                   seed: int) -> List[Tuple[str, Callable[[sqlite3.Connection], Any]]]:
+    """UIを模したクエリ列（カテゴリ別の一覧ページ送り＋ランダムなメール詳細）"""
+    rng = random.Random(seed)
+    ids = [row[0] for row in conn.execute('SELECT id FROM emails')]
+    card_columns = select_columns_sql(EMAIL_CARD_FIELDS, EMAIL_CARD_FIELDS)
+    detail_columns = select_columns_sql(None, EMAIL_FIELDS)
+
+    def list_page(category: str, offset: int):
+        def run(c: sqlite3.Connection):
+            cursor = c.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(f'''
+                SELECT {card_columns} FROM emails
+                WHERE mailbox = ? AND status = 'pending' AND category = ?
+                ORDER BY urgency_score DESC, processed_at DESC
+                LIMIT ? OFFSET ?
+            ''', (DEFAULT_MAILBOX, category, page, offset))
+            return [email_row(row) for row in cursor.fetchall()]
+        return 'list', run
+
+    def detail(email_id: str):
+        def run(c: sqlite3.Connection):
+            cursor = c.cursor()
+            cursor.row_factory = sqlite3.Row
+            return email_row(cursor.execute(f'SELECT {detail_columns} FROM emails WHERE id = ?', (email_id,)).fetchone())
+        return 'detail', run
+
+    workload = [list_page(category, i * page) for category in EMAIL_CATEGORIES for i in range(pages)]
+    workload.extend(detail(email_id) for email_id in rng.sample(ids, min(details, len(ids))))
+    rng.shuffle(workload)
+    return workload
+
+
+def run_workload(path: str, workload: List[Tuple[str, Callable]], cache_kb: int) -> Dict[str, Any]:
+    """ワークロードを1接続で流し、読み込みページ数とクエリ種別ごとの時間を計測"""
+    conn = sqlite3.connect(path)
+    conn.execute(f'PRAGMA cache_size = -{cache_kb}')
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    latencies: Dict[str, List[float]] = {'list': [], 'detail': []}
+    before = read_bytes()
+    for kind, query in workload:
+        start = time.perf_counter()
+        query(conn)
+        latencies[kind].append(time.perf_counter() - start)
+    after = read_bytes()
+    conn.close()
+    return {
+        'page_reads': (after - before) // page_size if before is not None else None,
+        'list_p50_ms': percentile(latencies['list'], 0.5) * 1000,
+        'list_p95_ms': percentile(latencies['list'], 0.95) * 1000,
+        'detail_p50_ms': percentile(latencies['detail'], 0.5) * 1000,
+    }
+
+
+def measure(path: str, workload: List[Tuple[str, Callable]], cache_kb: int) -> Dict[str, Any]:
+    conn = sqlite3.connect(path)
+    page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+    conn.close()
+    # 1回目でOSのファイルキャッシュを温め、2回目を計測
+    run_workload(path, workload, cache_kb)
+    result = run_workload(path, workload, cache_kb)
+    requested = run_workload(path, workload, 1)['page_reads']
+    result['hit_rate'] = (1 - result['page_reads'] / requested) if requested else None
+    result['db_bytes'] = os.path.getsize(path)
+    result['page_count'] = page_count
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本文・返信草案の圧縮ベンチマーク")
+    parser.add_argument('--emails', type=int, default=20_000)
+    parser.add_argument('--page', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=5, help="カテゴリごとにめくる一覧ページ数")
+    parser.add_argument('--details', type=int, default=500, help="開くメール詳細の件数")
+    parser.add_argument('--cache-kb', type=int, default=2000, help="SQLiteのページキャッシュ（既定と同じ2MB）")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from benchmarks.corpus import CorpusGenerator, write_sqlite
+
+    workdir = tempfile.mkdtemp(prefix='profmail-compression-')
+    try:
+        compressed = os.path.join(workdir, 'compressed.db')
+        plain = os.path.join(workdir, 'plain.db')
+        write_sqlite(compressed, args.emails, CorpusGenerator(seed=args.seed))
+        shutil.copy(compressed, plain)
+        decompress_database(plain)
+        for path in (compressed, plain):
+            vacuum(path)
+
+        conn = sqlite3.connect(compressed)
+        workload = build_workload(conn, args.page, args.pages, args.details, args.seed)
+        conn.close()
+
+        print(f"📊 メール {args.emails}件, クエリ {len(workload)}件, ページキャッシュ {args.cache_kb} KB")
+        results = {name: measure(path, workload, args.cache_kb)
+                   for name, path in (('圧縮前 (平文)', plain), ('圧縮後 (zlib+辞書)', compressed))}
+        for name, result in results.items():
+            hit_rate = f"{result['hit_rate']:6.1%}" if result['hit_rate'] is not None else '   n/a'
+            print(f"   {name:<20} {result['db_bytes'] / (1024 * 1024):7.1f} MB ({result['page_count']:,} pages)"
+                  f"  ヒット率 {hit_rate}"
+                  f"  一覧 p50 {result['list_p50_ms']:6.2f} ms / p95 {result['list_p95_ms']:6.2f} ms"
+                  f"  詳細 p50 {result['detail_p50_ms']:5.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
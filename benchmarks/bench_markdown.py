@@ -0,0 +1,82 @@
+"""
+返信草案マークダウン変換のマイクロベンチマーク
+
+旧実装（str.replace の連鎖）と utils.markdown.render_markdown を比較する。
+    python -m benchmarks.bench_markdown --drafts 10000
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+from utils.markdown import render_markdown
+
+
+def legacy_render(reply_draft: str) -> str:
+    """旧 generate_email_cards の変換処理（比較用にそのまま保持）"""
+    return (reply_draft
+        .replace('\n### ', '<br><h4>')
+        .replace('\n## ', '<br><h3>')
+        .replace('\n# ', '<br><h2>')
+        .replace('**', '<strong>', 1).replace('**', '</strong>', 1)
+        .replace('- ', '<br>• ')
+        .replace('\n', '<br>'))
+
+
+def generate_drafts(count: int, seed: int = 42) -> List[str]:
+    """LLMが生成する返信草案に近い形のマークダウンを生成"""
+    rng = random.Random(seed)
+    greetings = ['○○さん', 'ご連絡ありがとうございます。', 'お世話になっております。']
+    sentences = [
+        'ご質問の件について回答いたします。',
+        '**締切**は来週の金曜日です。',
+        '詳細は[シラバス](https://example.ac.jp/syllabus)をご確認ください。',
+        '研究室ミーティングで `実験データ` を共有してください。',
+        '日程については以下の候補から選んでください。',
+        'Please let me know if you have any further questions.',
+    ]
+    drafts = []
+    for _ in range(count):
+        lines = [f"# {rng.choice(greetings)}", '']
+        for _ in range(rng.randint(2, 6)):
+            lines.append(rng.choice(sentences))
+        lines.append('')
+        lines.extend(f"- 候補{i}: {rng.randint(1, 28)}日 **{rng.randint(9, 17)}時**" for i in range(rng.randint(0, 4)))
+        lines.extend(['', '## よろしくお願いいたします。'])
+        drafts.append('\n'.join(lines))
+    return drafts
+
+
+def measure(name: str, func: Callable[[str], str], drafts: List[str], repeat: int) -> float:
+    """最良実行時間を計測して表示"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for draft in drafts:
+            func(draft)
+        best = min(best, time.perf_counter() - start)
+    per_draft_us = best / len(drafts) * 1_000_000
+    print(f"   {name:<24} {best * 1000:9.1f} ms  ({per_draft_us:6.2f} µs/件)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="返信草案マークダウン変換ベンチマーク")
+    parser.add_argument('--drafts', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    drafts = generate_drafts(args.drafts)
+    stored = [render_markdown(d) for d in drafts]
+    print(f"📊 返信草案 {len(drafts)}件, 平均 {sum(map(len, drafts)) // len(drafts)}文字")
+
+    legacy = measure('legacy str.replace', legacy_render, drafts, args.repeat)
+    single_pass = measure('render_markdown', render_markdown, drafts, args.repeat)
+    reused = measure('stored reply_html', lambda html: html, stored, args.repeat)
+
+    print(f"   render_markdown / legacy = {single_pass / legacy:.2f}x"
+          f"（エスケープ・リスト・リンク対応込み）")
+    print(f"   表示時コスト（取り込み時生成済み） = {reused / legacy:.3f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+メール処理パイプライン全体のオフラインベンチマーク
+
+Gmail / OpenAI / Slack を benchmarks.fakes の偽実装に差し替え、一時DBに対して
+EmailProcessor.process_emails → Slack通知 を実行し、スループット・段階別の時間・
+メール1件あたりのレイテンシ（p50/p95）・ピークRSSを出力する。
+ピークRSSはプロセス単位なので、--all ではシナリオごとに別プロセスで実行する。
+    python -m benchmarks.bench_pipeline --scenario 1k --openai-latency-ms 20
+    python -m benchmarks.bench_pipeline --all
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+SCENARIOS = {'30': 30, '1k': 1_000, '10k': 10_000}
+
+
+def percentile(values: List[float], ratio: float) -> float:
+    """最近傍法のパーセンタイル"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(ratio * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    """このプロセスのピークRSS（Linux は KB、macOS は bytes で返る）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_scenario(args: argparse.Namespace) -> Dict[str, Any]:
+    """1シナリオを実行して結果を表示"""
+    from benchmarks.fakes import FakeGmailService, FakeOpenAIClient, SlackWebhookSink
+
+    count = SCENARIOS[args.scenario]
+    sink = SlackWebhookSink(rate_limit_ratio=args.slack_rate_limit)
+    with sink, tempfile.TemporaryDirectory() as workdir:
+        # config は import 時に環境変数を読むので、偽Slackの設定とログレベルを先に入れる
+        os.environ.update({
+            'SLACK_ENABLED': 'true', 'SLACK_WEBHOOK_URL': sink.url, 'SLACK_BOT_TOKEN': '',
+            'PROFMAIL_LOG_LEVEL': os.environ.get('PROFMAIL_LOG_LEVEL', 'WARNING'),
+        })
+        from benchmarks.corpus import gmail_corpus
+        from models.database import ProfessorEmailDatabase
+        from services.email_processor import EmailProcessor
+        from services.gmail_service import GmailService
+        from services.openai_service import OpenAIService
+        from services.run_trace import RunTrace, decompress_spans
+        from services.slack_service import SlackService
+        from utils.log import setup_logging
+
+        setup_logging()
+        gmail = FakeGmailService(gmail_corpus(count), latency_seconds=args.gmail_latency_ms / 1000)
+        openai_client = FakeOpenAIClient(latency_seconds=args.openai_latency_ms / 1000,
+                                         rate_limit_ratio=args.openai_rate_limit)
+        processor = EmailProcessor(
+            db=ProfessorEmailDatabase(os.path.join(workdir, 'bench.db')),
+            gmail_service=GmailService(service=gmail),
+            openai_service=OpenAIService(client=openai_client),
+            slack_service=SlackService(),
+            start_scheduler=False
+        )
+
+        print(f"📊 シナリオ {args.scenario}: 受信トレイ {count}件"
+              f"（Gmail {args.gmail_latency_ms}ms, OpenAI {args.openai_latency_ms}ms,"
+              f" 429率 {args.openai_rate_limit:.0%}）")
+        trace = RunTrace('benchmark')
+        started = time.perf_counter()
+        processed = processor.process_emails(trace=trace, max_emails=count)
+        with trace.phase('notify'):
+            processor.slack_service.send_daily_todo(processed, wait=True)
+        elapsed = time.perf_counter() - started
+        trace.finish()
+
+    spans = decompress_spans(trace.to_record()['spans'])
+    result = {
+        'scenario': args.scenario,
+        'emails': count,
+        'seconds': elapsed,
+        'emails_per_second': count / elapsed if elapsed else 0.0,
+        'phase_ms': dict(trace.phase_ms),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    print(f"   合計 {elapsed:8.2f} s  ({result['emails_per_second']:8.1f} 件/秒)"
+          f"  ピークRSS {result['peak_rss_mb']:7.1f} MB")
+    print(f"   保存 {len(processed)}件 / 分析 {trace.counts['analyzed']}件"
+          f" / 429 {openai_client.calls['rate_limited']}件 / Slack受信 {len(sink.received)}件"
+          f" / Gmail呼び出し {sum(gmail.calls.values())}回")
+    for phase, ms in trace.phase_ms.items():
+        durations = [span['duration_ms'] for span in spans if span['phase'] == phase]
+        detail = (f"  p50 {percentile(durations, 0.5):7.2f} ms  p95 {percentile(durations, 0.95):7.2f} ms"
+                  if durations else '')
+        print(f"   {phase:<10} {ms:10.1f} ms{detail}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="メール処理パイプラインのオフラインベンチマーク")
+    parser.add_argument('--scenario', choices=list(SCENARIOS), default='30')
+    parser.add_argument('--all', action='store_true', help="全シナリオをそれぞれ別プロセスで実行")
+    parser.add_argument('--gmail-latency-ms', type=float, default=0.0)
+    parser.add_argument('--openai-latency-ms', type=float, default=0.0)
+    parser.add_argument('--openai-rate-limit', type=float, default=0.0, help="OpenAIが429を返す割合")
+    parser.add_argument('--slack-rate-limit', type=float, default=0.0, help="Slackが429を返す割合")
+    args = parser.parse_args()
+
+    if not args.all:
+        run_scenario(args)
+        return
+
+    passthrough = [arg for arg in sys.argv[1:] if arg != '--all']
+    for scenario in SCENARIOS:
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_pipeline', *passthrough, '--scenario', scenario],
+                       check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+一覧取得のカラム射影ベンチマーク
+
+SELECT * と、一覧用・カード用のカラム射影で1ページあたりの読み出しバイト数と時間を比較する。
+一時ファイルのDBに合成データを投入して計測する（既存DBには触れない）。
+    python -m benchmarks.bench_projection --emails 2000 --page 50
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from config import EMAIL_BODY_MAX_LENGTH, EMAIL_PREVIEW_LENGTH
+from models.database import select_columns_sql
+from models.storage import EMAIL_CARD_FIELDS, EMAIL_FIELDS, EMAIL_LIST_FIELDS
+from benchmarks.bench_markdown import generate_drafts
+from utils.markdown import render_markdown
+
+
+def create_database(path: str, count: int, seed: int = 42):
+    """本文・返信草案付きの合成メールを投入"""
+    rng = random.Random(seed)
+    drafts = generate_drafts(count, seed=seed)
+    conn = sqlite3.connect(path)
+    conn.execute(f'''
+        CREATE TABLE emails (
+            {', '.join(f"{field} TEXT" for field in EMAIL_FIELDS if field != 'urgency_score')},
+            urgency_score INTEGER
+        )
+    ''')
+    rows = []
+    for i, draft in enumerate(drafts):
+        body = ''.join(rng.choice('研究室の学生から質問がありました。締切を確認してください。')
+                       for _ in range(rng.randint(EMAIL_BODY_MAX_LENGTH // 3, EMAIL_BODY_MAX_LENGTH)))
+        row = {field: '' for field in EMAIL_FIELDS}
+        row.update({
+            'id': f'bench-{i:06d}', 'subject': f'【ご相談】研究計画について #{i}',
+            'sender': '学生 <student@example.ac.jp>', 'sender_email': 'student@example.ac.jp',
+            'date': 'Mon, 1 Jan 2024 09:00:00 +0900', 'body': body, 'body_preview': body[:EMAIL_PREVIEW_LENGTH],
+            'category': '学生質問', 'priority': rng.choice(['高', '中', '低']),
+            'urgency_score': rng.randint(1, 10), 'gmail_link': f'https://mail.google.com/mail/u/0/#all/bench-{i:06d}',
+            'reply_draft': draft, 'reply_html': render_markdown(draft), 'mailbox': 'default',
+            'status': 'pending', 'processed_at': '2024-01-01 09:00:00', 'created_at': '2024-01-01 09:00:00'
+        })
+        rows.append(row)
+    conn.executemany(
+        f"INSERT INTO emails ({', '.join(EMAIL_FIELDS)}) VALUES ({', '.join('?' for _ in EMAIL_FIELDS)})",
+        [tuple(row[field] for field in EMAIL_FIELDS) for row in rows]
+    )
+    conn.commit()
+    conn.close()
+
+
+def fetch_page(path: str, fields: Optional[Sequence[str]], page_size: int) -> List[Dict[str, Any]]:
+    """1ページ分を取得（fields=None は SELECT *）"""
+    columns = '*' if fields is None else select_columns_sql(fields, EMAIL_LIST_FIELDS)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(f'''
+        SELECT {columns} FROM emails
+        WHERE status = 'pending'
+        ORDER BY urgency_score DESC, processed_at DESC
+        LIMIT ?
+    ''', (page_size,)).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+def page_bytes(emails: List[Dict[str, Any]]) -> int:
+    """取得した値のUTF-8バイト数合計"""
+    return sum(len(str(value).encode('utf-8')) for email in emails for value in email.values() if value is not None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一覧取得のカラム射影ベンチマーク")
+    parser.add_argument('--emails', type=int, default=2000)
+    parser.add_argument('--page', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        create_database(path, args.emails)
+        print(f"📊 メール {args.emails}件, 1ページ {args.page}件")
+
+        variants = [
+            ('SELECT *', None),
+            ('カード用 (EMAIL_CARD_FIELDS)', EMAIL_CARD_FIELDS),
+            ('一覧用 (EMAIL_LIST_FIELDS)', EMAIL_LIST_FIELDS),
+        ]
+        baseline_bytes = None
+        for name, fields in variants:
+            best = float('inf')
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                emails = fetch_page(path, fields, args.page)
+                best = min(best, time.perf_counter() - start)
+            size = page_bytes(emails)
+            baseline_bytes = baseline_bytes or size
+            print(f"   {name:<30} {size / 1024:8.1f} KB/ページ  ({size / baseline_bytes:6.1%})"
+                  f"  {best * 1000:7.2f} ms")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
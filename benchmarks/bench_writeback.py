@@ -0,0 +1,71 @@
+"""
+Gmail 書き戻し（完了メールのラベル付け・アーカイブ）のベンチマーク
+
+偽Gmail（benchmarks.fakes）で1回目の取り込みを行い、その一部を一括完了して batchModify で書き戻した後、
+2回目の取り込みで Gmail から取得するメール数・API呼び出し数・所要時間が書き戻しなしと比べてどれだけ減るかを見る。
+    python -m benchmarks.bench_writeback --emails 3000 --complete-ratio 0.8 --gmail-latency-ms 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gmail書き戻しのベンチマーク")
+    parser.add_argument('--emails', type=int, default=3000)
+    parser.add_argument('--complete-ratio', type=float, default=0.8, help="1回目の後に完了にする割合")
+    parser.add_argument('--gmail-latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    os.environ.update({'SLACK_ENABLED': 'false', 'PROFMAIL_LOG_LEVEL': os.environ.get('PROFMAIL_LOG_LEVEL', 'WARNING')})
+    from config import DEFAULT_MAILBOX
+    from benchmarks.corpus import gmail_corpus
+    from benchmarks.fakes import FakeGmailService, FakeOpenAIClient
+    from models.database import ProfessorEmailDatabase
+    from services.email_processor import EmailProcessor
+    from services.gmail_service import GmailService
+    from services.gmail_writeback import GmailWriteback
+    from services.openai_service import OpenAIService
+    from services.slack_service import SlackService
+    from utils.log import setup_logging
+
+    setup_logging()
+    with tempfile.TemporaryDirectory() as workdir:
+        gmail = FakeGmailService(gmail_corpus(args.emails), latency_seconds=args.gmail_latency_ms / 1000)
+        processor = EmailProcessor(
+            db=ProfessorEmailDatabase(os.path.join(workdir, 'bench.db')),
+            gmail_service=GmailService(service=gmail),
+            openai_service=OpenAIService(client=FakeOpenAIClient()),
+            slack_service=SlackService(),
+            start_scheduler=False
+        )
+        writeback = GmailWriteback(processor.tenants)
+
+        def fetch(label: str):
+            gmail.calls.clear()
+            started = time.perf_counter()
+            processor.process_emails(max_emails=args.emails)
+            elapsed = time.perf_counter() - started
+            print(f"   {label:<16} 受信トレイ {len(gmail.inbox_ids()):>6}件  messages.get {gmail.calls['messages.get']:>6}回"
+                  f"  messages.list {gmail.calls['messages.list']:>3}回  {elapsed:7.2f} s")
+
+        print(f"📊 メール {args.emails}件, 完了にする割合 {args.complete_ratio:.0%},"
+              f" Gmail {args.gmail_latency_ms}ms")
+        fetch('1回目')
+        db = processor.get_database()
+        pending = [email['id'] for email in db.iter_emails(status='pending', fields=['id'], limit=0)]
+        completed = db.bulk_update_status('completed', email_ids=pending[:int(len(pending) * args.complete_ratio)])
+        fetch('書き戻しなし')
+
+        gmail.calls.clear()
+        writeback.enqueue(DEFAULT_MAILBOX, completed)
+        started = time.perf_counter()
+        writeback.flush()
+        print(f"   書き戻し          {len(completed):>6}件  batchModify {gmail.calls['messages.batchModify']}回"
+              f"  {time.perf_counter() - started:7.2f} s")
+        fetch('書き戻しあり')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,378 @@
+"""
+合成メールコーパスの生成
+
+EMAIL_CATEGORIES の全カテゴリについて、日本語・英語の学術系メールを seed 固定で再現可能に生成する。
+スレッド（Re: の往復）、本文長の偏り、MIME構成、優先度・ステータスの分布を現実に近づけている。
+
+- sqlite: ProfessorEmailDatabase のスキーマへ一括投入（100万件以上を想定、executemany + 大きめのトランザクション）
+- gmail:  messages.get(format='full') 形式のJSONL（benchmarks.fakes.FakeGmailService 用、不要メールも混ぜる）
+
+    python -m benchmarks.corpus sqlite --count 1000000 --out /tmp/corpus.db
+    python -m benchmarks.corpus gmail --count 10000 --out /tmp/corpus.jsonl
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from config import DEFAULT_MAILBOX, EMAIL_BODY_MAX_LENGTH, EMAIL_CATEGORIES, EMAIL_PREVIEW_LENGTH
+from models.compression import compress_text
+from models.storage import EMAIL_FIELDS
+from utils.markdown import render_markdown
+
+# 生成日時の基準（再現性のため現在時刻は使わない）
+DEFAULT_ANCHOR = datetime(2024, 4, 1, 9, 0, 0)
+
+# カテゴリごとの出現比率・優先度の重み（高/中/低）・緊急度の範囲
+CATEGORY_PROFILES: Dict[str, Dict[str, Any]] = {
+    "学生質問": {'weight': 30, 'priority': (3, 5, 2), 'urgency': (5, 10)},
+    "研究室運営": {'weight': 15, 'priority': (2, 5, 3), 'urgency': (4, 8)},
+    "共同研究": {'weight': 12, 'priority': (3, 5, 2), 'urgency': (5, 9)},
+    "論文査読": {'weight': 8, 'priority': (4, 4, 2), 'urgency': (6, 9)},
+    "会議調整": {'weight': 15, 'priority': (3, 5, 2), 'urgency': (6, 9)},
+    "事務連絡": {'weight': 12, 'priority': (1, 5, 4), 'urgency': (3, 7)},
+    "学会イベント": {'weight': 8, 'priority': (1, 3, 6), 'urgency': (3, 5)},
+}
+
+SUBJECTS: Dict[str, Dict[str, Sequence[str]]] = {
+    "学生質問": {
+        'ja': ['{course}のレポート提出について', '卒業研究の進め方についてのご相談', '{course}の課題に関する質問',
+               '研究室配属についての質問', '推薦書のお願い'],
+        'en': ['Question about the {course} assignment', 'Request for a recommendation letter',
+               'Thesis progress meeting'],
+    },
+    "研究室運営": {
+        'ja': ['ゼミ発表順の確認', '研究室の計算機サーバーについて', '実験データの共有について', '研究室ミーティングの議事録'],
+        'en': ['Lab meeting notes', 'GPU server maintenance', 'Shared dataset update'],
+    },
+    "共同研究": {
+        'ja': ['共同研究の進捗共有', '共同研究契約書のご確認', '共著論文の原稿について'],
+        'en': ['Joint project update', 'Draft of our joint paper', 'Data sharing agreement'],
+    },
+    "論文査読": {
+        'ja': ['査読のお願い（{journal}）', '査読期限のリマインド', '改訂稿の再査読のお願い'],
+        'en': ['Invitation to review for {journal}', 'Reminder: review due', 'Revised manuscript for re-review'],
+    },
+    "会議調整": {
+        'ja': ['打ち合わせ日程のご相談', '教授会の日程調整', 'オンライン面談の候補日'],
+        'en': ['Scheduling a meeting next week', 'Availability for a call', 'Rescheduling our meeting'],
+    },
+    "事務連絡": {
+        'ja': ['科研費の執行について', '成績入力期限のお知らせ', '出張旅費の精算について', '入試業務の割り当て'],
+        'en': ['Travel reimbursement', 'Grade submission deadline'],
+    },
+    "学会イベント": {
+        'ja': ['{conference}参加登録のご案内', 'セミナー開催のお知らせ', '招待講演のご依頼'],
+        'en': ['Call for papers: {conference}', 'Invited talk at our workshop', 'Seminar announcement'],
+    },
+}
+
+SENTENCES = {
+    'ja': [
+        'お忙しいところ恐れ入りますが、ご確認いただけますと幸いです。',
+        '先日の{course}の講義で扱った内容について質問があります。',
+        '締切は{day}日の17時となっております。',
+        '添付の資料をご覧いただき、ご意見をいただけますでしょうか。',
+        '実験の結果、予想とは異なる傾向が見られました。',
+        '候補日は{day}日の午後、または翌週の午前です。',
+        '{journal}からの依頼で、査読をお願いできないかと考えております。',
+        '研究室の共有サーバーの容量が不足してきています。',
+        '来年度の予算申請の書類を準備しています。',
+        '詳細は後日あらためてご連絡いたします。',
+        '引き続きどうぞよろしくお願いいたします。',
+    ],
+    'en': [
+        'I hope this message finds you well.',
+        'Could you please take a look at the attached draft?',
+        'The deadline for the review is the {day}th of next month.',
+        'We observed an unexpected trend in the latest experiment.',
+        'Would any time on Tuesday or Thursday afternoon work for you?',
+        'I would be grateful for any feedback on the {course} project.',
+        'Please let me know if you need any further information.',
+        'Best regards,',
+    ],
+}
+
+COURSES = ['機械学習', '情報理論', 'データ構造', '統計学', 'Signal Processing', 'Computer Vision']
+JOURNALS = ['IEEE Transactions', 'Journal of AI Research', '情報処理学会論文誌', 'Nature Communications']
+CONFERENCES = ['国際会議 ICML', '情報処理学会全国大会', 'NeurIPS', '人工知能学会全国大会']
+
+# 送信者（カテゴリ → 名前・ドメイン）
+SENDER_POOLS = {
+    "学生質問": ('学生', 'st.example.ac.jp'),
+    "研究室運営": ('研究室', 'lab.example.ac.jp'),
+    "共同研究": ('Researcher', 'partner-univ.edu'),
+    "論文査読": ('Editorial Office', 'journal-editorial.org'),
+    "会議調整": ('教員', 'example.ac.jp'),
+    "事務連絡": ('事務局', 'office.example.ac.jp'),
+    "学会イベント": ('Conference Committee', 'conf.example.org'),
+}
+
+# Gmail形式で混ぜる不要メール（LLMでスキップされる想定の広告・自動送信）
+NOISE_SUBJECTS = ['【広告】研究機器キャンペーンのご案内', 'Weekly newsletter', '求人情報のお知らせ', '自動送信: パスワード期限']
+
+# MIME構成の分布（Gmail形式のみ。DBの本文はテキストに正規化済みとして扱う）
+MIME_SHAPES = (('text/plain', 45), ('multipart/alternative', 40), ('multipart/mixed', 12), ('text/html', 3))
+
+DRAFT_POOL_SIZE = 512
+# プレースホルダーを埋めた文の種類（テンプレート1つあたり）
+SENTENCE_VARIANTS = 32
+
+
+def _weighted(rng: random.Random, items: Sequence[Tuple[Any, int]]) -> Any:
+    return rng.choices([item for item, _ in items], weights=[weight for _, weight in items])[0]
+
+
+class CorpusGenerator:
+    """seed 固定の合成メール生成器（同じ引数なら同じ列を返す）"""
+
+    def __init__(self, seed: int = 42, days: int = 365, mailboxes: Sequence[str] = (DEFAULT_MAILBOX,),
+                 english_ratio: float = 0.25, noise_ratio: float = 0.1, anchor: datetime = DEFAULT_ANCHOR):
+        self.seed = seed
+        self.days = days
+        self.mailboxes = list(mailboxes)
+        self.english_ratio = english_ratio
+        self.noise_ratio = noise_ratio
+        self.anchor = anchor
+        self.categories = [(category, CATEGORY_PROFILES[category]['weight']) for category in EMAIL_CATEGORIES]
+        # 返信草案は有限個のプールから選ぶ（HTML化を1回で済ませて100万件でも生成を速くする）
+        draft_rng = random.Random(seed ^ 0x5EED)
+        self.drafts = [self._make_draft(draft_rng) for _ in range(DRAFT_POOL_SIZE)]
+        self.draft_html = [render_markdown(draft) for draft in self.drafts]
+        # 本文の文もプレースホルダーを埋めたものを事前に用意（1通ごとに choices 1回で済ませる）
+        self.sentences = {
+            language: [self._fill(template, draft_rng) for template in templates for _ in range(SENTENCE_VARIANTS)]
+            for language, templates in SENTENCES.items()
+        }
+
+    @staticmethod
+    def _fill(template: str, rng: random.Random) -> str:
+        return template.format(course=rng.choice(COURSES), journal=rng.choice(JOURNALS),
+                               conference=rng.choice(CONFERENCES), day=rng.randint(1, 28))
+
+    def _make_draft(self, rng: random.Random) -> str:
+        lines = [f"# {rng.choice(['ご連絡ありがとうございます。', 'お世話になっております。', 'Thank you for your email.'])}", '']
+        lines.extend(self._fill(rng.choice(SENTENCES['ja']), rng) for _ in range(rng.randint(1, 4)))
+        lines.append('')
+        lines.extend(f"- 候補{i}: {rng.randint(1, 28)}日 **{rng.randint(9, 17)}時**" for i in range(rng.randint(0, 3)))
+        lines.extend(['', '## よろしくお願いいたします。'])
+        return '\n'.join(lines)
+
+    def _body(self, rng: random.Random, language: str) -> str:
+        """本文（文数は対数正規分布、最大 EMAIL_BODY_MAX_LENGTH 文字）"""
+        count = max(1, min(120, int(math.exp(rng.gauss(1.8, 0.8)))))
+        body = ('\n' if language == 'en' else '').join(rng.choices(self.sentences[language], k=count))
+        return body[:EMAIL_BODY_MAX_LENGTH]
+
+    def iter_threads(self) -> Iterator[List[Dict[str, Any]]]:
+        """スレッド単位（1通目＋返信）で無限に生成"""
+        rng = random.Random(self.seed)
+        thread_index = 0
+        while True:
+            noise = rng.random() < self.noise_ratio
+            category = '不要メール' if noise else _weighted(rng, self.categories)
+            language = 'en' if rng.random() < self.english_ratio else 'ja'
+            if noise:
+                subject = rng.choice(NOISE_SUBJECTS)
+                sender_name, domain = 'No Reply', 'mailer.example.com'
+            else:
+                subject = self._fill(rng.choice(SUBJECTS[category][language]), rng)
+                sender_name, domain = SENDER_POOLS[category]
+            mailbox = rng.choice(self.mailboxes)
+            thread_id = f"t{self.seed:x}{thread_index:09x}"
+            # 古いメールほど完了済みになりやすい
+            age_days = rng.random() ** 2 * self.days
+            started = self.anchor - timedelta(days=age_days, seconds=rng.randint(0, 86_399))
+            # スレッド長は幾何分布（平均1.6通程度）
+            length = 1 if noise else min(12, 1 + int(rng.expovariate(1.6)))
+
+            messages = []
+            sent_at = started
+            for position in range(length):
+                profile = CATEGORY_PROFILES.get(category)
+                sender_no = rng.randint(1, 400)
+                draft_index = rng.randrange(DRAFT_POOL_SIZE)
+                completed = not noise and rng.random() < min(0.95, 0.2 + age_days / self.days)
+                message = {
+                    'id': f"{thread_id}m{position:02d}",
+                    'thread_id': thread_id,
+                    'in_reply_to': messages[-1]['id'] if messages else None,
+                    'subject': subject if position == 0 else f"Re: {subject}",
+                    'sender': f"{sender_name}{sender_no} <user{sender_no}@{domain}>",
+                    'sender_email': f"user{sender_no}@{domain}",
+                    'sent_at': sent_at,
+                    'body': self._body(rng, language),
+                    'language': language,
+                    'mime_type': _weighted(rng, MIME_SHAPES),
+                    'category': category,
+                    'priority': _weighted(rng, list(zip(('高', '中', '低'), profile['priority']))) if profile else '低',
+                    'urgency_score': rng.randint(*profile['urgency']) if profile else 1,
+                    'reply_draft': self.drafts[draft_index],
+                    'reply_html': self.draft_html[draft_index],
+                    'mailbox': mailbox,
+                    'status': 'completed' if completed else 'pending',
+                    'completed_at': sent_at + timedelta(hours=rng.randint(1, 96)) if completed else None,
+                    'processed_at': sent_at + timedelta(minutes=rng.randint(1, 24 * 60)),
+                }
+                messages.append(message)
+                sent_at += timedelta(minutes=rng.randint(5, 3 * 24 * 60))
+            thread_index += 1
+            yield messages
+
+    def iter_messages(self, count: int, include_noise: bool = True) -> Iterator[Dict[str, Any]]:
+        """メッセージ単位で count 件（スレッドの途中で打ち切ることもある）"""
+        produced = 0
+        for thread in self.iter_threads():
+            for message in thread:
+                if not include_noise and message['category'] == '不要メール':
+                    continue
+                yield message
+                produced += 1
+                if produced >= count:
+                    return
+
+
+# ---------------------------------------------------------------- 出力形式
+
+def _sql_time(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def to_email_row(message: Dict[str, Any]) -> Tuple[Any, ...]:
+    """emails テーブルの1行（EMAIL_FIELDS の順、本文・返信草案は本体と同じく圧縮）"""
+    row = {
+        'id': message['id'],
+        'subject': message['subject'],
+        'sender': message['sender'],
+        'sender_email': message['sender_email'],
+        'date': format_datetime(message['sent_at']),
+        'body': compress_text(message['body']),
+        'body_preview': message['body'][:EMAIL_PREVIEW_LENGTH],
+        'category': message['category'],
+        'priority': message['priority'],
+        'urgency_score': message['urgency_score'],
+        'gmail_link': f"https://mail.google.com/mail/u/0/#all/{message['id']}",
+        'reply_draft': compress_text(message['reply_draft']),
+        'reply_html': message['reply_html'],
+        'mailbox': message['mailbox'],
+        'status': message['status'],
+        'completed_at': _sql_time(message['completed_at']),
+        'deleted_at': None,
+        'processed_at': _sql_time(message['processed_at']),
+        'created_at': _sql_time(message['processed_at']),
+    }
+    return tuple(row[field] for field in EMAIL_FIELDS)
+
+
+def to_gmail_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """messages.get(format='full') 形式"""
+    from benchmarks.fakes import build_gmail_message
+
+    headers = {'To': 'Professor <professor@example.ac.jp>', 'Message-ID': f"<{message['id']}@example.ac.jp>"}
+    if message['in_reply_to']:
+        headers['In-Reply-To'] = f"<{message['in_reply_to']}@example.ac.jp>"
+    return build_gmail_message(
+        message['id'], message['subject'], message['sender'], message['body'],
+        date=format_datetime(message['sent_at']), thread_id=message['thread_id'],
+        mime_type=message['mime_type'], extra_headers=headers
+    )
+
+
+def write_sqlite(path: str, count: int, generator: CorpusGenerator, batch_size: int = 20_000) -> int:
+    """ProfessorEmailDatabase のスキーマで一括投入（既存の同名DBには追記、メールボックスごとのシャードにも振り分け）"""
+    from models.database import ProfessorEmailDatabase
+
+    # スキーマ作成・マイグレーションは本体と同じ処理を通す
+    db = ProfessorEmailDatabase(path)
+    connections: Dict[str, sqlite3.Connection] = {}
+    batches: Dict[str, List[Tuple]] = {}
+    mailbox_index = EMAIL_FIELDS.index('mailbox')
+    sql = f"INSERT OR REPLACE INTO emails ({', '.join(EMAIL_FIELDS)}) VALUES ({', '.join('?' for _ in EMAIL_FIELDS)})"
+
+    def flush(shard: str):
+        conn = connections.get(shard)
+        if conn is None:
+            conn = connections[shard] = sqlite3.connect(shard)
+            # 投入中だけ同期書き込みを止める（途中で落ちたら作り直す前提）
+            conn.execute('PRAGMA journal_mode = OFF')
+            conn.execute('PRAGMA synchronous = OFF')
+        conn.executemany(sql, batches.pop(shard))
+        conn.commit()
+
+    written = 0
+    for message in generator.iter_messages(count, include_noise=False):
+        row = to_email_row(message)
+        shard = db.shard_path(row[mailbox_index])
+        batch = batches.setdefault(shard, [])
+        batch.append(row)
+        written += 1
+        if len(batch) >= batch_size:
+            flush(shard)
+    for shard in list(batches):
+        flush(shard)
+    for shard, conn in connections.items():
+        if shard != db.db_path:
+            conn.execute('PRAGMA journal_mode = WAL')  # シャードは本体と同じWALに戻す
+        conn.execute('ANALYZE')
+        conn.close()
+    return written
+
+
+def write_gmail_jsonl(path: str, count: int, generator: CorpusGenerator) -> int:
+    """Gmail API 形式のメッセージを1行1件で出力"""
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for history_id, message in enumerate(generator.iter_messages(count), start=1):
+            gmail_message = to_gmail_message(message)
+            gmail_message['historyId'] = str(history_id)
+            f.write(json.dumps(gmail_message, ensure_ascii=False) + '\n')
+            written += 1
+    return written
+
+
+def load_gmail_jsonl(path: str) -> List[Dict[str, Any]]:
+    """write_gmail_jsonl の出力を FakeGmailService に渡せる形で読む"""
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def gmail_corpus(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """FakeGmailService 用のメッセージをメモリ上に生成"""
+    messages = []
+    for history_id, message in enumerate(CorpusGenerator(seed=seed).iter_messages(count), start=1):
+        gmail_message = to_gmail_message(message)
+        gmail_message['historyId'] = str(history_id)
+        messages.append(gmail_message)
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成メールコーパスの生成")
+    parser.add_argument('format', choices=['sqlite', 'gmail'])
+    parser.add_argument('--count', type=int, default=100_000)
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days', type=int, default=365, help="生成する期間（基準日からさかのぼる日数）")
+    parser.add_argument('--mailboxes', default=DEFAULT_MAILBOX, help="カンマ区切りのメールボックス名")
+    parser.add_argument('--english-ratio', type=float, default=0.25)
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(seed=args.seed, days=args.days, mailboxes=args.mailboxes.split(','),
+                                english_ratio=args.english_ratio)
+    started = time.perf_counter()
+    if args.format == 'sqlite':
+        written = write_sqlite(args.out, args.count, generator)
+    else:
+        written = write_gmail_jsonl(args.out, args.count, generator)
+    elapsed = time.perf_counter() - started
+    size_mb = os.path.getsize(args.out) / (1024 * 1024)
+    print(f"📊 {written}件を生成: {args.out} ({size_mb:.1f} MB, {elapsed:.1f} s, {written / elapsed:,.0f} 件/秒)")
+
+
+if __name__ == '__main__':
+    main()
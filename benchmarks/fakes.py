@@ -0,0 +1,359 @@
+"""
+オフラインベンチマーク用の偽 Gmail / OpenAI / Slack
+
+- FakeGmailService: googleapiclient の Gmail リソースと同じ呼び出し形
+  （users().messages().list/get/batchModify、users().labels().list/create、users().history().list、
+  users().watch/getProfile、new_batch_http_request）で合成コーパス（benchmarks.corpus）を返す
+- FakeOpenAIClient: chat.completions.create の代わり（遅延・トークン数・429を設定可能）
+- SlackWebhookSink: ローカルHTTPサーバーとしてWebhookを受け取り件数を数える
+"""
+import base64
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import httpx
+    from openai import RateLimitError
+except ImportError:  # openai/httpx がなければ汎用の例外で代用
+    httpx = None
+    RateLimitError = None
+
+
+# ---------------------------------------------------------------- Gmail
+
+def _part(mime_type: str, text: str) -> Dict[str, Any]:
+    return {'mimeType': mime_type, 'body': {'data': base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')}}
+
+
+def build_gmail_message(message_id: str, subject: str, sender: str, body: str,
+                        date: str = 'Mon, 1 Jan 2024 09:00:00 +0900', thread_id: Optional[str] = None,
+                        history_id: int = 1, mime_type: str = 'text/plain',
+                        extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """messages.get(format='full') と同じ形のメッセージ
+
+    mime_type: text/plain / text/html / multipart/alternative / multipart/mixed（添付付き）
+    """
+    headers = [
+        {'name': 'Subject', 'value': subject},
+        {'name': 'From', 'value': sender},
+        {'name': 'Date', 'value': date},
+    ]
+    headers.extend({'name': name, 'value': value} for name, value in (extra_headers or {}).items())
+    html = '<div>' + body.replace('\n', '<br>') + '</div>'
+    if mime_type == 'multipart/alternative':
+        payload = {'mimeType': mime_type, 'parts': [_part('text/plain', body), _part('text/html', html)]}
+    elif mime_type == 'multipart/mixed':
+        attachment = {'mimeType': 'application/pdf', 'filename': 'document.pdf',
+                      'body': {'attachmentId': f'att-{message_id}', 'size': 48_213}}
+        alternative = {'mimeType': 'multipart/alternative', 'parts': [_part('text/plain', body), _part('text/html', html)]}
+        payload = {'mimeType': mime_type, 'parts': [alternative, attachment]}
+    elif mime_type == 'text/html':
+        payload = _part('text/html', html)
+    else:
+        payload = _part('text/plain', body)
+    payload['headers'] = headers
+    return {
+        'id': message_id,
+        'threadId': thread_id or message_id,
+        'historyId': str(history_id),
+        'labelIds': ['INBOX'],
+        'payload': payload,
+    }
+
+
+class _Request:
+    """googleapiclient の HttpRequest 相当（execute() で結果を返す）"""
+
+    def __init__(self, service: 'FakeGmailService', method: str, handler: Callable[[], Dict[str, Any]]):
+        self.service = service
+        self.method = method
+        self.handler = handler
+
+    def execute(self) -> Dict[str, Any]:
+        self.service.calls[self.method] += 1
+        if self.service.latency_seconds:
+            time.sleep(self.service.latency_seconds)
+        return self.handler()
+
+
+class _Batch:
+    """new_batch_http_request() 相当（1往復ぶんの遅延でまとめて実行）"""
+
+    def __init__(self, service: 'FakeGmailService', callback: Optional[Callable] = None):
+        self.service = service
+        self.callback = callback
+        self.requests: List[tuple] = []
+
+    def add(self, request: _Request, callback: Optional[Callable] = None, request_id: Optional[str] = None):
+        self.requests.append((request_id or str(len(self.requests)), request, callback or self.callback))
+
+    def execute(self):
+        self.service.calls['batch'] += 1
+        if self.service.latency_seconds:
+            time.sleep(self.service.latency_seconds)
+        for request_id, request, callback in self.requests:
+            self.service.calls[request.method] += 1
+            try:
+                response, exception = request.handler(), None
+            except Exception as e:
+                response, exception = None, e
+            if callback:
+                callback(request_id, response, exception)
+
+
+class _Messages:
+    def __init__(self, service: 'FakeGmailService'):
+        self.service = service
+
+    def list(self, userId: str = 'me', q: str = '', maxResults: int = 100,
+             pageToken: Optional[str] = None, labelIds: Optional[List[str]] = None) -> _Request:
+        def handler():
+            ids = self.service.inbox_ids()
+            start = int(pageToken or 0)
+            page = ids[start:start + min(maxResults, 500)]
+            result = {
+                'messages': [{'id': i, 'threadId': self.service.messages[i]['threadId']} for i in page],
+                'resultSizeEstimate': len(ids)
+            }
+            if start + len(page) < len(ids):
+                result['nextPageToken'] = str(start + len(page))
+            return result
+        return _Request(self.service, 'messages.list', handler)
+
+    def get(self, userId: str = 'me', id: str = '', format: str = 'full') -> _Request:
+        def handler():
+            if id not in self.service.messages:
+                raise KeyError(f'message not found: {id}')
+            return self.service.messages[id]
+        return _Request(self.service, 'messages.get', handler)
+
+    def batchModify(self, userId: str = 'me', body: Optional[Dict[str, Any]] = None) -> _Request:
+        def handler():
+            ids = body.get('ids', [])
+            if len(ids) > 1000:
+                raise ValueError(f'batchModify accepts at most 1000 ids: {len(ids)}')
+            for message_id in ids:
+                message = self.service.messages.get(message_id)
+                if message is None:
+                    continue
+                labels = [label for label in message.get('labelIds', []) if label not in body.get('removeLabelIds', [])]
+                labels.extend(label for label in body.get('addLabelIds', []) if label not in labels)
+                message['labelIds'] = labels
+            self.service.modified_ids.extend(ids)
+            return {}
+        return _Request(self.service, 'messages.batchModify', handler)
+
+
+class _Labels:
+    def __init__(self, service: 'FakeGmailService'):
+        self.service = service
+
+    def list(self, userId: str = 'me') -> _Request:
+        def handler():
+            return {'labels': [{'id': label_id, 'name': name} for name, label_id in self.service.labels.items()]}
+        return _Request(self.service, 'labels.list', handler)
+
+    def create(self, userId: str = 'me', body: Optional[Dict[str, Any]] = None) -> _Request:
+        def handler():
+            label_id = self.service.labels.setdefault(body['name'], f'Label_{len(self.service.labels) + 1}')
+            return {'id': label_id, 'name': body['name']}
+        return _Request(self.service, 'labels.create', handler)
+
+
+class _History:
+    def __init__(self, service: 'FakeGmailService'):
+        self.service = service
+
+    def list(self, userId: str = 'me', startHistoryId: str = '0', historyTypes: Optional[List[str]] = None,
+             labelId: Optional[str] = None, pageToken: Optional[str] = None, maxResults: int = 500) -> _Request:
+        def handler():
+            start = int(startHistoryId)
+            added = [m for m in list(self.service.messages.values())
+                     if int(m['historyId']) > start and (labelId is None or labelId in m.get('labelIds', []))]
+            added.sort(key=lambda m: int(m['historyId']))
+            return {
+                'history': [
+                    {'id': m['historyId'], 'messagesAdded': [{'message': {'id': m['id'], 'threadId': m['threadId']}}]}
+                    for m in added
+                ],
+                'historyId': str(self.service.history_id)
+            }
+        return _Request(self.service, 'history.list', handler)
+
+
+class _Users:
+    def __init__(self, service: 'FakeGmailService'):
+        self.service = service
+
+    def messages(self) -> _Messages:
+        return _Messages(self.service)
+
+    def history(self) -> _History:
+        return _History(self.service)
+
+    def labels(self) -> _Labels:
+        return _Labels(self.service)
+
+    def getProfile(self, userId: str = 'me') -> _Request:
+        def handler():
+            return {'emailAddress': self.service.email_address, 'historyId': str(self.service.history_id)}
+        return _Request(self.service, 'getProfile', handler)
+
+    def watch(self, userId: str = 'me', body: Optional[Dict[str, Any]] = None) -> _Request:
+        def handler():
+            self.service.watch_topic = body['topicName']
+            return {'historyId': str(self.service.history_id), 'expiration': str(int((time.time() + 7 * 86400) * 1000))}
+        return _Request(self.service, 'watch', handler)
+
+
+class FakeGmailService:
+    """Gmail API リソースの偽実装（latency_seconds は1リクエストあたりの往復時間）"""
+
+    def __init__(self, messages: List[Dict[str, Any]], latency_seconds: float = 0.0,
+                 email_address: str = 'professor@example.ac.jp'):
+        self.messages: Dict[str, Dict[str, Any]] = {m['id']: m for m in messages}
+        self.latency_seconds = latency_seconds
+        self.calls: Counter = Counter()
+        self.history_id = max((int(m['historyId']) for m in messages), default=0)
+        self.labels: Dict[str, str] = {'INBOX': 'INBOX'}  # ラベル名 → ID
+        self.modified_ids: List[str] = []  # batchModify で変更されたID（呼び出し順）
+        self.email_address = email_address
+        self.watch_topic: Optional[str] = None  # users.watch で登録されたトピック
+
+    def inbox_ids(self) -> List[str]:
+        return [i for i, m in list(self.messages.items()) if 'INBOX' in m.get('labelIds', [])]
+
+    def add_message(self, message: Dict[str, Any]):
+        """新着メールを追加（history.list に現れる）"""
+        self.history_id += 1
+        message['historyId'] = str(self.history_id)
+        self.messages[message['id']] = message
+
+    def users(self) -> _Users:
+        return _Users(self)
+
+    def new_batch_http_request(self, callback: Optional[Callable] = None) -> _Batch:
+        return _Batch(self, callback)
+
+
+# ---------------------------------------------------------------- OpenAI
+
+# 偽の分析結果で使うカテゴリ（「不要メール」は一定割合でスキップさせる）
+_FAKE_CATEGORIES = ['学生質問', '研究室運営', '共同研究', '論文査読', '会議調整', '事務連絡', '学会イベント']
+
+
+class FakeRateLimitError(Exception):
+    """openai が使えない環境での 429 の代用"""
+    status_code = 429
+
+
+def _rate_limit_error() -> Exception:
+    if RateLimitError is not None and httpx is not None:
+        request = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+        response = httpx.Response(429, request=request, headers={'retry-after': '1'})
+        return RateLimitError('Rate limit reached (fake)', response=response, body=None)
+    return FakeRateLimitError('Rate limit reached (fake)')
+
+
+class FakeOpenAIClient:
+    """OpenAI クライアントの偽実装
+
+    latency_seconds: 1呼び出しの応答時間
+    rate_limit_ratio: 429 を返す割合
+    skip_ratio: 「不要メール」と判定する割合
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, completion_tokens: int = 350,
+                 rate_limit_ratio: float = 0.0, skip_ratio: float = 0.1, seed: int = 42):
+        self.latency_seconds = latency_seconds
+        self.completion_tokens = completion_tokens
+        self.rate_limit_ratio = rate_limit_ratio
+        self.skip_ratio = skip_ratio
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str = '', messages: Optional[List[Dict[str, str]]] = None, **kwargs):
+        with self._lock:
+            roll = self._rng.random()
+            category_roll = self._rng.random()
+            self.calls['create'] += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if roll < self.rate_limit_ratio:
+            with self._lock:
+                self.calls['rate_limited'] += 1
+            raise _rate_limit_error()
+
+        prompt_chars = sum(len(m.get('content', '')) for m in messages or [])
+        if category_roll < self.skip_ratio:
+            analysis = {'category': '不要メール', 'priority': '低', 'urgency_score': 1,
+                        'summary': '', 'reply_draft': '', 'is_actionable': False}
+        else:
+            analysis = {
+                'category': _FAKE_CATEGORIES[int(category_roll * 1000) % len(_FAKE_CATEGORIES)],
+                'priority': ['高', '中', '低'][int(category_roll * 100) % 3],
+                'urgency_score': 3 + int(category_roll * 70) % 8,
+                'summary': 'ベンチマーク用の要約',
+                'reply_draft': '# ご連絡ありがとうございます\n\n- 確認します\n- **来週**までに返信します',
+                'is_actionable': True
+            }
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(analysis, ensure_ascii=False)))],
+            # 日本語はおおよそ1文字1トークン強として見積もる
+            usage=SimpleNamespace(prompt_tokens=prompt_chars, completion_tokens=self.completion_tokens,
+                                  total_tokens=prompt_chars + self.completion_tokens)
+        )
+
+
+# ---------------------------------------------------------------- Slack
+
+class SlackWebhookSink:
+    """Slack Incoming Webhook の受け口（127.0.0.1 の空きポートで待ち受け）"""
+
+    def __init__(self, rate_limit_ratio: float = 0.0, seed: int = 42):
+        self.rate_limit_ratio = rate_limit_ratio
+        self.received: List[Dict[str, Any]] = []
+        self.rate_limited = 0
+        rng = random.Random(seed)
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if rng.random() < sink.rate_limit_ratio:
+                    sink.rate_limited += 1
+                    self.send_response(429)
+                    self.send_header('Retry-After', '0')
+                    self.end_headers()
+                    return
+                sink.received.append(json.loads(body or b'{}'))
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b'ok')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name='slack-sink', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/services/T000/B000/XXXX'
+
+    def __enter__(self) -> 'SlackWebhookSink':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
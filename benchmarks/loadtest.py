@@ -0,0 +1,308 @@
+"""
+ダッシュボード・操作系のHTTP負荷テスト
+
+合成コーパスのDBと偽LLM（benchmarks.fakes）でアプリを別プロセスの uvicorn として起動し、
+仮想ユーザーが /, /all, /category/*, /priority/high, 完了・削除, /chat を混ぜてリクエストする。
+ルートごとのRPSと p50/p95/p99 を出力し、ベースライン（JSON）と比較して劣化を検出する。
+
+    python -m benchmarks.loadtest --users 20 --duration 30
+    python -m benchmarks.loadtest --save-baseline          # benchmarks/baselines/loadtest.json を更新
+    python -m benchmarks.loadtest --compare                # ベースラインより劣化したら終了コード1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import httpx
+from benchmarks.bench_pipeline import percentile
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'loadtest.json')
+
+# (集計名, メソッド, 重み) — パスは build_request で組み立てる
+ROUTE_MIX: Tuple[Tuple[str, str, int], ...] = (
+    ('/', 'GET', 25),
+    ('/all', 'GET', 15),
+    ('/category/{category_name}', 'GET', 15),
+    ('/priority/high', 'GET', 15),
+    ('/emails/{email_id}/complete', 'POST', 12),
+    ('/emails/{email_id}/delete', 'DELETE', 6),
+    ('/chat', 'POST', 12),
+)
+
+# ベースライン比較の許容幅（p95 の悪化率・RPS の低下率）
+DEFAULT_TOLERANCE = 0.25
+# これより少ない件数のルートはばらつきが大きいので比較しない
+MIN_COMPARE_REQUESTS = 30
+
+CHAT_MESSAGES = ['今日やるべきことを教えて', '高優先度のメールは？', '査読の締切が近いものはある？', '学生からの質問をまとめて']
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# ---------------------------------------------------------------- サーバー側
+
+def serve(args: argparse.Namespace):
+    """偽LLM・合成DBでアプリを起動（負荷テストの子プロセスとして実行される）"""
+    os.environ.update({'SLACK_ENABLED': 'false', 'PROFMAIL_LOG_LEVEL': os.environ.get('PROFMAIL_LOG_LEVEL', 'WARNING')})
+    import uvicorn
+    from benchmarks.fakes import FakeGmailService, FakeOpenAIClient
+    from models.database import ProfessorEmailDatabase
+    from services.email_processor import EmailProcessor
+    from services.gmail_service import GmailService
+    from services.openai_service import OpenAIService
+
+    # シングルトンを先に偽実装で初期化しておき、main.create_app() にはそれを使わせる
+    EmailProcessor(
+        db=ProfessorEmailDatabase(args.db),
+        gmail_service=GmailService(service=FakeGmailService([])),
+        openai_service=OpenAIService(client=FakeOpenAIClient(latency_seconds=args.llm_latency_ms / 1000)),
+        start_scheduler=False
+    )
+    from main import app
+    uvicorn.run(app, host='127.0.0.1', port=args.port, log_level='warning', access_log=False)
+
+
+def start_server(db_path: str, port: int, llm_latency_ms: float) -> subprocess.Popen:
+    """サーバープロセスを起動して /health が返るまで待つ"""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.loadtest', '--serve', '--db', db_path, '--port', str(port),
+         '--llm-latency-ms', str(llm_latency_ms)],
+        stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"サーバーが起動できませんでした（終了コード {process.returncode}）")
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/health', timeout=1).status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("サーバーの起動待ちがタイムアウトしました")
+
+
+# ---------------------------------------------------------------- 負荷生成
+
+class Workload:
+    """仮想ユーザーが共有するリクエスト生成器（完了・削除対象のIDを重複なく払い出す）"""
+
+    def __init__(self, pending_ids: List[str], categories: List[str], seed: int):
+        self.rng = random.Random(seed)
+        self.ids: Deque[str] = deque(pending_ids)
+        self.categories = categories
+        self.routes = [route for route, _, _ in ROUTE_MIX]
+        self.weights = [weight for _, _, weight in ROUTE_MIX]
+        self.methods = {route: method for route, method, _ in ROUTE_MIX}
+
+    def _next_id(self) -> str:
+        # 使い切ったら先頭に戻る（完了済み・削除済みへの操作もそのまま計測する）
+        email_id = self.ids.popleft()
+        self.ids.append(email_id)
+        return email_id
+
+    def build_request(self) -> Tuple[str, str, str, Optional[Dict[str, Any]]]:
+        """(集計名, メソッド, パス, JSONボディ)"""
+        route = self.rng.choices(self.routes, weights=self.weights)[0]
+        body = None
+        if route == '/category/{category_name}':
+            path = f'/category/{self.rng.choice(self.categories)}'
+        elif '{email_id}' in route:
+            path = route.replace('{email_id}', self._next_id())
+        elif route == '/chat':
+            path, body = route, {'message': self.rng.choice(CHAT_MESSAGES)}
+        else:
+            path = route
+        return route, self.methods[route], path, body
+
+
+async def _virtual_user(client: httpx.AsyncClient, workload: Workload, deadline: float, think_seconds: float,
+                        samples: Dict[str, List[float]], errors: Dict[str, int]):
+    while time.perf_counter() < deadline:
+        route, method, path, body = workload.build_request()
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            # ストリーミング応答も本文を最後まで読むまでを計測
+            await response.aread()
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        samples.setdefault(route, []).append((time.perf_counter() - started) * 1000)
+        if not ok:
+            errors[route] = errors.get(route, 0) + 1
+        if think_seconds:
+            await asyncio.sleep(think_seconds)
+
+
+async def run_load(base_url: str, workload: Workload, users: int, duration: float,
+                   think_ms: float) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    """users 並列で duration 秒リクエストし続ける"""
+    samples: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(
+            _virtual_user(client, workload, deadline, think_ms / 1000, samples, errors) for _ in range(users)
+        ))
+        elapsed = time.perf_counter() - started
+    return samples, errors, elapsed
+
+
+def summarize(samples: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict[str, Dict[str, float]]:
+    """ルートごとの RPS・パーセンタイル"""
+    summary = {}
+    for route, _, _ in ROUTE_MIX:
+        latencies = samples.get(route, [])
+        summary[route] = {
+            'requests': len(latencies),
+            'rps': round(len(latencies) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'errors': errors.get(route, 0),
+        }
+    all_latencies = [latency for latencies in samples.values() for latency in latencies]
+    summary['(total)'] = {
+        'requests': len(all_latencies),
+        'rps': round(len(all_latencies) / elapsed, 2),
+        'p50_ms': round(percentile(all_latencies, 0.50), 2),
+        'p95_ms': round(percentile(all_latencies, 0.95), 2),
+        'p99_ms': round(percentile(all_latencies, 0.99), 2),
+        'errors': sum(errors.values()),
+    }
+    return summary
+
+
+def compare(summary: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """ベースラインより p95 が悪化・RPS が低下したルート"""
+    regressions = []
+    for route, result in summary.items():
+        base = baseline.get(route)
+        if not base or min(base.get('requests', 0), result['requests']) < MIN_COMPARE_REQUESTS:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {base['p95_ms']:.1f} → {result['p95_ms']:.1f} ms")
+        if result['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{route}: RPS {base['rps']:.1f} → {result['rps']:.1f}")
+        if result['errors'] > base.get('errors', 0):
+            regressions.append(f"{route}: エラー {base.get('errors', 0)} → {result['errors']}")
+    return regressions
+
+
+def print_summary(summary: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]] = None):
+    print(f"   {'ルート':<30} {'件数':>7} {'RPS':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'エラー':>6}")
+    for route, result in summary.items():
+        line = (f"   {route:<30} {result['requests']:>7} {result['rps']:>8.1f} {result['p50_ms']:>7.1f}ms"
+                f" {result['p95_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms {result['errors']:>6}")
+        base = (baseline or {}).get(route)
+        if base and base.get('p95_ms'):
+            line += f"  (p95 {result['p95_ms'] / base['p95_ms'] - 1:+.0%})"
+        print(line)
+
+
+def prepare_database(path: str, emails: int, seed: int) -> Tuple[List[str], List[str]]:
+    """合成コーパスを投入し、操作対象の未対応メールIDとカテゴリを返す"""
+    from benchmarks.corpus import CorpusGenerator, write_sqlite
+
+    if not os.path.exists(path):
+        write_sqlite(path, emails, CorpusGenerator(seed=seed))
+    conn = sqlite3.connect(path)
+    pending_ids = [row[0] for row in conn.execute(
+        "SELECT id FROM emails WHERE status = 'pending' ORDER BY id LIMIT 5000"
+    )]
+    categories = [row[0] for row in conn.execute('SELECT DISTINCT category FROM emails')]
+    conn.close()
+    random.Random(seed).shuffle(pending_ids)
+    return pending_ids, categories
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ダッシュボード・操作系のHTTP負荷テスト")
+    parser.add_argument('--users', type=int, default=10, help="同時接続の仮想ユーザー数")
+    parser.add_argument('--duration', type=float, default=20.0, help="計測秒数")
+    parser.add_argument('--warmup', type=float, default=3.0, help="計測前のウォームアップ秒数")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="仮想ユーザーのリクエスト間隔")
+    parser.add_argument('--emails', type=int, default=20_000, help="合成DBの件数")
+    parser.add_argument('--db', help="合成DBのパス（既存ファイルはそのまま使う。省略時は一時ファイル）")
+    parser.add_argument('--llm-latency-ms', type=float, default=100.0, help="偽LLMの応答時間")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save-baseline', action='store_true', help="結果をベースラインとして保存")
+    parser.add_argument('--compare', action='store_true', help="ベースラインと比較し、劣化があれば終了コード1")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    workdir = tempfile.TemporaryDirectory()
+    db_path = args.db or os.path.join(workdir.name, 'loadtest.db')
+    print(f"🔧 合成DB準備中: {args.emails}件")
+    pending_ids, categories = prepare_database(db_path, args.emails, args.seed)
+
+    port = _free_port()
+    server = start_server(db_path, port, args.llm_latency_ms)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        if args.warmup:
+            asyncio.run(run_load(base_url, Workload(pending_ids, categories, args.seed + 1),
+                                 args.users, args.warmup, args.think_ms))
+        print(f"📊 仮想ユーザー {args.users}人 × {args.duration:.0f}秒（DB {args.emails}件, LLM {args.llm_latency_ms:.0f}ms）")
+        samples, errors, elapsed = asyncio.run(
+            run_load(base_url, Workload(pending_ids, categories, args.seed), args.users, args.duration, args.think_ms)
+        )
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        workdir.cleanup()
+
+    summary = summarize(samples, errors, elapsed)
+    baseline = None
+    if args.compare and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['routes']
+    print_summary(summary, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        config = {key: getattr(args, key) for key in ('users', 'duration', 'think_ms', 'emails', 'llm_latency_ms', 'seed')}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'config': config, 'routes': summary}, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"💾 ベースラインを保存: {args.baseline}")
+
+    if args.compare:
+        if baseline is None:
+            print(f"⚠️ ベースラインがありません: {args.baseline}")
+            return
+        regressions = compare(summary, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ ベースラインより劣化（許容 {args.tolerance:.0%}）:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"✅ ベースラインとの差は許容範囲内（{args.tolerance:.0%}）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Gmail プッシュ通知のローカルシミュレーター
+
+Pub/Sub の push と同じ形の通知を POST /api/v1/gmail/push に送る。
+
+既定では偽Gmail（benchmarks.fakes）と偽OpenAIでアプリをプロセス内に立て、新着メールを
+一定間隔で受信トレイに追加しては通知を送り、受信から分析・保存までの時間と Gmail API の呼び出し数を見る。
+    python -m benchmarks.push_simulator --arrivals 30 --interval 0.2 --burst 3
+
+--url を付けると起動中のサーバーへ通知だけを送る（PROFMAIL_GMAIL_PUSH=true で起動しておく）。
+    python -m benchmarks.push_simulator --url http://localhost:8000 --email-address prof@example.ac.jp --history-id 12345
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+SUBSCRIPTION = 'projects/local/subscriptions/profmail-gmail-push'
+TOPIC = 'projects/local/topics/profmail-gmail'
+
+
+def build_push_envelope(email_address: str, history_id: int) -> Dict[str, Any]:
+    """Pub/Sub の push リクエスト本文（Gmail の通知と同じ形）"""
+    data = json.dumps({'emailAddress': email_address, 'historyId': history_id}).encode('utf-8')
+    return {
+        'message': {
+            'data': base64.b64encode(data).decode('ascii'),
+            'messageId': uuid.uuid4().hex,
+            'publishTime': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        },
+        'subscription': SUBSCRIPTION
+    }
+
+
+def send_to_server(args):
+    """起動中のサーバーへ通知を送る"""
+    import requests
+
+    url = f"{args.url.rstrip('/')}/api/v1/gmail/push"
+    params = {'token': args.token} if args.token else None
+    for index in range(args.arrivals):
+        envelope = build_push_envelope(args.email_address, args.history_id + index)
+        response = requests.post(url, params=params, json=envelope, timeout=10)
+        print(f"   historyId {args.history_id + index}: {response.status_code} {response.text}")
+        time.sleep(args.interval)
+
+
+def simulate(args):
+    """プロセス内で新着→通知→取り込みを繰り返して遅延を計測"""
+    os.environ.update({
+        'SLACK_ENABLED': 'false',
+        'PROFMAIL_GMAIL_PUSH': 'true',
+        'PROFMAIL_LOG_LEVEL': os.environ.get('PROFMAIL_LOG_LEVEL', 'WARNING')
+    })
+    from fastapi.testclient import TestClient
+    from benchmarks.corpus import gmail_corpus
+    from benchmarks.fakes import FakeGmailService, FakeOpenAIClient
+    from config import DEFAULT_MAILBOX
+    from models.database import ProfessorEmailDatabase
+    from services.email_processor import EmailProcessor
+    from services.gmail_service import GmailService
+    from services.openai_service import OpenAIService
+    from services.slack_service import SlackService
+    from utils.log import setup_logging
+
+    setup_logging()
+    arrivals_total = args.arrivals * args.burst
+    corpus = gmail_corpus(args.emails + arrivals_total)
+    with tempfile.TemporaryDirectory() as workdir:
+        gmail = FakeGmailService(corpus[:args.emails], latency_seconds=args.gmail_latency_ms / 1000)
+        llm = FakeOpenAIClient(latency_seconds=args.llm_latency_ms / 1000, skip_ratio=0.0)
+        processor = EmailProcessor(
+            db=ProfessorEmailDatabase(os.path.join(workdir, 'push.db')),
+            gmail_service=GmailService(service=gmail),
+            openai_service=OpenAIService(client=llm),
+            slack_service=SlackService(),
+            start_scheduler=False
+        )
+        processor.gmail_push.debounce_seconds = args.debounce
+        processor.gmail_push.max_delay_seconds = args.max_delay
+        from main import app
+        client = TestClient(app)
+        db = processor.db.for_mailbox(DEFAULT_MAILBOX)
+
+        # 既存分の取り込みは計測しないのでAIの遅延なしで済ませる
+        llm.latency_seconds = 0.0
+        processor.process_emails(max_emails=args.emails)
+        llm.latency_seconds = args.llm_latency_ms / 1000
+        processor.gmail_push.watch_all(TOPIC)
+        gmail.calls.clear()
+        llm_calls_before = sum(llm.calls.values())
+
+        print(f"📊 受信トレイ {args.emails}件, 新着 {args.arrivals}回×{args.burst}件（{args.interval}s間隔）,"
+              f" debounce {args.debounce}s, Gmail {args.gmail_latency_ms}ms, LLM {args.llm_latency_ms}ms")
+        arrived: Dict[str, float] = {}
+        saved: Dict[str, float] = {}
+        sending = threading.Event()
+        sending.set()
+
+        def watch_saved():
+            # 新着を送っている間も保存されたかを見続ける
+            deadline = None
+            while True:
+                if not sending.is_set():
+                    deadline = deadline or time.perf_counter() + args.timeout
+                    if len(saved) >= len(arrived) or time.perf_counter() > deadline:
+                        return
+                waiting = [email_id for email_id in list(arrived) if email_id not in saved]
+                now = time.perf_counter()
+                for email_id in db.get_existing_statuses(waiting) if waiting else {}:
+                    saved[email_id] = now
+                time.sleep(0.02)
+
+        watcher = threading.Thread(target=watch_saved, daemon=True)
+        watcher.start()
+        new_messages = corpus[args.emails:]
+        for index in range(args.arrivals):
+            for message in new_messages[index * args.burst:(index + 1) * args.burst]:
+                arrived[message['id']] = time.perf_counter()
+                gmail.add_message(message)
+                # Gmail は受信トレイの変更ごとに通知する（同じ履歴IDの重複・順不同もありうる）
+                response = client.post('/api/v1/gmail/push', params={'token': args.token},
+                                       json=build_push_envelope(gmail.email_address, gmail.history_id))
+                response.raise_for_status()
+            time.sleep(args.interval)
+        sending.clear()
+        watcher.join()
+
+        latencies = sorted(saved[email_id] - arrived[email_id] for email_id in saved)
+        if latencies:
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"   受信→保存      {len(latencies)}/{len(arrived)}件  中央値 {statistics.median(latencies):.2f} s"
+                  f"  p95 {p95:.2f} s  最大 {latencies[-1]:.2f} s")
+        print(f"   Gmail API       history.list {gmail.calls['history.list']}回  messages.get {gmail.calls['messages.get']}回"
+              f"  messages.list {gmail.calls['messages.list']}回")
+        print(f"   AI分析          {sum(llm.calls.values()) - llm_calls_before}回")
+        if len(saved) < len(arrived):
+            print(f"⚠️ {len(arrived) - len(saved)}件が {args.timeout}s 以内に保存されませんでした")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gmail プッシュ通知のシミュレーター")
+    parser.add_argument('--emails', type=int, default=200, help="最初から受信トレイにあるメール数")
+    parser.add_argument('--arrivals', type=int, default=20, help="新着（通知）を送る回数")
+    parser.add_argument('--burst', type=int, default=1, help="1回に届くメール数")
+    parser.add_argument('--interval', type=float, default=0.5, help="新着の間隔（秒）")
+    parser.add_argument('--debounce', type=float, default=1.0)
+    parser.add_argument('--max-delay', type=float, default=5.0)
+    parser.add_argument('--gmail-latency-ms', type=float, default=20.0)
+    parser.add_argument('--llm-latency-ms', type=float, default=300.0)
+    parser.add_argument('--timeout', type=float, default=60.0, help="保存を待つ上限（秒）")
+    parser.add_argument('--url', help="起動中のサーバーへ通知だけを送る")
+    parser.add_argument('--email-address', default='professor@example.ac.jp')
+    parser.add_argument('--history-id', type=int, default=1)
+    parser.add_argument('--token', default=os.environ.get('PROFMAIL_GMAIL_PUSH_TOKEN', ''))
+    args = parser.parse_args()
+
+    if args.url:
+        send_to_server(args)
+    else:
+        simulate(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,12 @@ import uvicorn
 from fastapi import FastAPI
 from services.email_processor import EmailProcessor
 from api.routes import create_routes
-from config import APP_TITLE, APP_DESCRIPTION, APP_VERSION, WEB_HOST, WEB_PORT, WEB_RELOAD
+from api.json_api import create_api_routes
+from api.events import create_event_routes, EventStreamGZipMiddleware
+from api.static_assets import create_static_routes
+from api.metrics import create_metrics_routes, HTTPMetricsMiddleware
+from api.tenants import TenantMiddleware
+from config import APP_TITLE, APP_DESCRIPTION, APP_VERSION, WEB_HOST, WEB_PORT, WEB_RELOAD, GZIP_MINIMUM_SIZE
 
 
 def create_app() -> FastAPI:
@@ -22,8 +27,19 @@ def create_app() -> FastAPI:
     # メール処理サービス初期化（シングルトン）
     email_processor = EmailProcessor()
     
+    # 動的HTML/JSONレスポンスのgzip圧縮（事前圧縮済みの静的アセットとイベントストリームはそのまま通す）
+    app.add_middleware(EventStreamGZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+    # リクエストごとのテナント（教授のメールボックス）切り替え
+    app.add_middleware(TenantMiddleware, registry=email_processor.tenants)
+    # HTTPレイテンシ計測（最も外側で圧縮・ストリーミング送信まで含めて計測）
+    app.add_middleware(HTTPMetricsMiddleware)
+    
     # ルート設定
     create_routes(app, email_processor)
+    create_api_routes(app, email_processor)
+    create_event_routes(app, email_processor)
+    create_static_routes(app)
+    create_metrics_routes(app)
     
     print("✅ FastAPIアプリケーション作成完了")
     return app
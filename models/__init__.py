@@ -1,6 +1,7 @@
 """
 モデル関連のパッケージ
 """
+from .storage import EmailStorage, MailboxDatabase, get_storage
 from .database import ProfessorEmailDatabase
 
-__all__ = ['ProfessorEmailDatabase']
\ No newline at end of file
+__all__ = ['EmailStorage', 'MailboxDatabase', 'ProfessorEmailDatabase', 'get_storage']
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+メール本文・返信草案の圧縮
+
+body・reply_draft はDB容量の大半を占めるので、保存時に圧縮してBLOBで持つ。
+学術系の日本語メールは1通が短く、単体の zlib では縮みにくいため、よく出る言い回しを
+あらかじめ辞書（zdict）として渡し、1通目から辞書を参照して符号化する。
+
+保存形式: 先頭1バイトの形式番号 + 辞書付き raw deflate
+  - 辞書を変えるときは形式番号を増やし、古い番号の辞書も残す（既存行はそのまま読める）
+  - 短くて縮まない値・圧縮前からある値は TEXT のまま（読み出し時は型で見分ける）
+"""
+import zlib
+from typing import Any, Dict, Optional, Union
+
+# 圧縮して保存するカラム
+COMPRESSED_EMAIL_FIELDS = ('body', 'reply_draft')
+
+# 学術系メールの定型表現（zlib は後ろほど近い距離で参照できるので、よく出るものを後ろに置く）
+_DICTIONARY_V1 = '\n'.join([
+    # 英語のメール
+    'Dear Professor', 'Dear Prof.', 'Dear Dr.', 'Hi Professor', 'Thank you for your email.',
+    'Thank you very much for', 'I hope this message finds you well.', 'I am writing to',
+    'Please find attached', 'Could you please', 'I would be grateful if you could',
+    'Please let me know if you have any questions.', 'Please let me know if you need any further information.',
+    'Would you be available', 'Looking forward to hearing from you.', 'Best regards,', 'Kind regards,',
+    'Sincerely,', 'manuscript', 'review', 'deadline', 'meeting', 'submission', 'conference', 'University',
+    'Department of', 'Graduate School of',
+    # 署名・事務的な表現
+    'E-mail: ', 'TEL: ', 'FAX: ', '〒', '大学院', '研究科', '専攻', '学部', '学科', '准教授', '助教',
+    '事務局', '事務室', '教務課', '総務課', '会計課', '学生支援課', '国際交流課',
+    # 事務連絡・学会
+    '科研費', '予算', '執行', '出張', '旅費', '精算', '領収書', '申請書', '書類', '提出期限', '成績入力',
+    '入試', '教授会', '委員会', '学会', '大会', '発表', '講演', '招待講演', 'セミナー', 'ワークショップ',
+    '参加登録', '論文', '原稿', '投稿', '査読', '再査読', '改訂稿', 'コメント', '共著', '共同研究',
+    '契約書', 'データ', '実験', '結果', '研究計画', '卒業研究', '修士論文', '博士論文', 'レポート', '課題',
+    '講義', '授業', 'ゼミ', '研究室', 'ミーティング', '議事録', 'サーバー', '推薦書',
+    # 日程調整
+    '打ち合わせ', '日程調整', '候補日', 'ご都合', 'ご都合のよい日時', '午前', '午後', '来週', '今週',
+    '翌週', 'オンライン', 'Zoom', '対面', '月曜日', '火曜日', '水曜日', '木曜日', '金曜日',
+    # 返信草案（Markdown）
+    '## ', '### ', '- ', '1. ', '**', 'ご連絡ありがとうございます', '承知しました', '確認します',
+    'までに返信します', '以下の日程で', 'ご検討ください',
+    # 依頼・お礼・結び
+    'ご相談', 'ご質問', 'ご依頼', 'ご案内', 'お知らせ', 'ご報告', 'ご確認', 'ご検討', 'ご対応', 'ご協力',
+    'ご意見', 'ご助言', 'ご指導', '添付ファイル', '添付の資料', '締切', '期限', '詳細', '下記',
+    '以下', 'について', 'に関して', 'でしょうか', 'いただけますでしょうか', 'いただけますと幸いです',
+    'していただけないでしょうか', 'させていただきます', 'いたします', 'しております', 'ございます',
+    'お忙しいところ恐れ入りますが', 'お手数をおかけしますが', 'ご確認いただけますと幸いです',
+    '大変申し訳ございません', 'ありがとうございました', 'ありがとうございます', '何卒よろしくお願い申し上げます',
+    '引き続きどうぞよろしくお願いいたします', 'どうぞよろしくお願いいたします', 'よろしくお願いいたします',
+    '先生', '先生、', '大学', 'です。', 'ます。', 'お世話になっております。', 'いつもお世話になっております。',
+]).encode('utf-8')
+
+# 形式番号 → 辞書
+DICTIONARIES = {1: _DICTIONARY_V1}
+CURRENT_FORMAT = 1
+
+# これより短い値は圧縮しない（ヘッダ分でかえって大きくなりやすい）
+MIN_COMPRESS_BYTES = 64
+# 9 にしても1通あたり数バイトしか縮まず、保存時のCPUだけ増える
+COMPRESSION_LEVEL = 6
+
+
+def compress_text(text: Optional[str]) -> Union[str, bytes, None]:
+    """保存用に圧縮（縮まない値は文字列のまま返す）"""
+    if not text:
+        return text
+    raw = text.encode('utf-8')
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return text
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15, zdict=DICTIONARIES[CURRENT_FORMAT])
+    packed = bytes([CURRENT_FORMAT]) + compressor.compress(raw) + compressor.flush()
+    return packed if len(packed) < len(raw) else text
+
+
+def decompress_text(value: Any) -> Any:
+    """保存値を文字列に戻す（圧縮されていない値はそのまま）"""
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        return value
+    value = bytes(value)
+    decompressor = zlib.decompressobj(-15, zdict=DICTIONARIES[value[0]])
+    return (decompressor.decompress(value[1:]) + decompressor.flush()).decode('utf-8')
+
+
+def decompress_columns(email: Dict[str, Any]) -> Dict[str, Any]:
+    """取得した行の圧縮カラムだけを展開（選択していないカラムには触れない）"""
+    for field in COMPRESSED_EMAIL_FIELDS:
+        if field in email:
+            email[field] = decompress_text(email[field])
+    return email
@@ -1,37 +1,377 @@
 """
 データベースモデル
 """
+import functools
+import heapq
+import json
+import os
+import re
 import sqlite3
-from datetime import datetime
-from typing import List, Dict, Any, Optional
-from config import DATABASE_PATH
+import threading
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+from config import (
+    DATABASE_MAX_OPEN_SHARDS,
+    DATABASE_PATH,
+    DATABASE_SHARD_DIR,
+    DATABASE_SHARDING,
+    DEFAULT_MAILBOX,
+    EMAIL_PREVIEW_LENGTH,
+    RETENTION_BATCH_SIZE,
+    RETENTION_DAYS,
+    STREAM_CHUNK_SIZE,
+    TODO_MAX_ITEMS,
+    TODO_PRIORITY_ORDER
+)
+from models.compression import compress_text, decompress_columns, decompress_text
+from models.shards import ShardConnectionCache
+from models.storage import (
+    EMAIL_FIELDS,
+    EMAIL_LIST_FIELDS,
+    SELECTABLE_EMAIL_FIELDS,
+    EmailStorage
+)
+from utils.events import event_bus
+from utils.log import get_logger, log_fields, sampled
+from utils.markdown import render_markdown
+from utils.metrics import metrics
 
+logger = get_logger(__name__)
 
-class ProfessorEmailDatabase:
+DB_QUERY_SECONDS = metrics.histogram('profmail_db_query_seconds', 'DBメソッドごとの処理時間（秒）', ['method'])
+
+
+def timed_query(func):
+    """DBメソッドの処理時間をメトリクスに記録"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with DB_QUERY_SECONDS.time(method=func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def priority_rank_sql(column: str = 'priority') -> str:
+    """TODO_PRIORITY_ORDER に従った優先度順位のSQL式（未知の値は「中」扱い）"""
+    default_rank = TODO_PRIORITY_ORDER.index('中') if '中' in TODO_PRIORITY_ORDER else len(TODO_PRIORITY_ORDER)
+    whens = ' '.join(f"WHEN '{p}' THEN {i}" for i, p in enumerate(TODO_PRIORITY_ORDER))
+    return f"CASE {column} {whens} ELSE {default_rank} END"
+
+
+# IN (...) に一度に渡すID数（古いSQLiteのバインド変数上限 999 に収める）
+SQLITE_IN_CHUNK_SIZE = 500
+
+# 既存DBへ ALTER TABLE で追加するカラム
+MIGRATED_EMAIL_COLUMNS = {
+    'reply_html': 'TEXT',
+    'mailbox': "TEXT DEFAULT 'default'",
+    'body_preview': 'TEXT',
+    'deleted_at': 'DATETIME NULL'
+}
+MIGRATED_HISTORY_COLUMNS = {
+    'trigger': "TEXT DEFAULT 'scheduled'",
+    'duration_ms': 'REAL',
+    'phase_timings': 'TEXT',
+    'emails_fetched': 'INTEGER DEFAULT 0',
+    'emails_skipped': 'INTEGER DEFAULT 0',
+    'prompt_tokens': 'INTEGER DEFAULT 0',
+    'completion_tokens': 'INTEGER DEFAULT 0',
+    'error_count': 'INTEGER DEFAULT 0',
+    'errors': 'TEXT',
+    'spans': 'BLOB',
+    'mailbox': "TEXT DEFAULT 'default'"
+}
+
+# 実行履歴一覧で返すカラム（スパンは詳細取得時のみ）
+HISTORY_LIST_FIELDS = (
+    'id', 'execution_time', 'mailbox', 'trigger', 'status', 'duration_ms', 'phase_timings',
+    'emails_fetched', 'emails_processed', 'emails_categorized', 'emails_skipped',
+    'prompt_tokens', 'completion_tokens', 'error_count', 'error_message'
+)
+
+# メールのステータス（削除は行を消さず deleted の墓標にする）
+EMAIL_STATUSES = ('pending', 'completed', 'deleted')
+
+
+def email_filters_sql(status: Optional[str], category: Optional[str], priority: Optional[str],
+                      mailbox: Optional[str] = None, placeholder: str = '?') -> Tuple[str, List[Any]]:
+    """WHERE句とパラメータを組み立て（mailbox は idx_emails_mailbox_status に乗るよう先頭に置く）
+
+    既知のステータスはリテラルで埋め込む（プリペアド文の汎用プランでも WHERE status = 'pending' の
+    部分インデックスを使えるように）。
+    """
+    conditions = []
+    params: List[Any] = []
+    for column, value in (('mailbox', mailbox), ('status', status), ('category', category), ('priority', priority)):
+        if column == 'status' and value in EMAIL_STATUSES:
+            conditions.append(f"status = '{value}'")
+        elif value:
+            conditions.append(f'{column} = {placeholder}')
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return where, params
+
+
+def history_row(row) -> Dict[str, Any]:
+    """実行履歴1行を辞書化（JSONカラムは展開）"""
+    run = dict(row)
+    run['phase_timings'] = json.loads(run['phase_timings']) if run.get('phase_timings') else {}
+    if 'errors' in run:
+        run['errors'] = json.loads(run['errors']) if run['errors'] else []
+    return run
+
+
+def select_columns_sql(fields: Optional[Sequence[str]], default: Sequence[str]) -> str:
+    """SELECT句のカラムリスト（ホワイトリスト外の名前は無視）"""
+    columns = [f for f in (fields or default) if f in SELECTABLE_EMAIL_FIELDS] or list(default)
+    return ', '.join(columns)
+
+
+def email_row(row) -> Dict[str, Any]:
+    """メール1行を辞書化（圧縮カラムを選択していればここで展開）"""
+    return decompress_columns(dict(row))
+
+
+def email_event(email_data: Dict[str, Any], status: str) -> Dict[str, Any]:
+    """email-changed イベントで送る保存したメールの要約（ページ側でカードを差し込むか決めるのに使う）"""
+    return {
+        'id': email_data['id'],
+        'status': status,
+        'category': email_data.get('category'),
+        'priority': email_data.get('priority'),
+        'urgency_score': email_data.get('urgency_score')
+    }
+
+
+def publish_archived(rows: List[Dict[str, Any]]):
+    """アーカイブへ移したメールをメールボックスごとに通知"""
+    by_mailbox: Dict[str, List[str]] = {}
+    for row in rows:
+        by_mailbox.setdefault(row['mailbox'], []).append(row['id'])
+    for mailbox, ids in by_mailbox.items():
+        event_bus.email_changed(mailbox, ids, 'archived', 'archived')
+
+
+# シャードのファイル名に使えるメールボックス名
+SHARD_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]*$')
+
+# シャードをまたいで並べ替えるときだけ SELECT に加えるカラム（返す前に取り除く）
+EMAIL_SORT_COLUMNS = 'urgency_score AS _sort_urgency, processed_at AS _sort_processed'
+
+
+def email_sort_key(email: Dict[str, Any]) -> Tuple[int, str]:
+    """ORDER BY urgency_score DESC, processed_at DESC と同じ順になるキー（reverse=True で使う）"""
+    return (email['_sort_urgency'] or 0, str(email['_sort_processed'] or ''))
+
+
+def strip_sort_columns(email: Dict[str, Any]) -> Dict[str, Any]:
+    for key in [key for key in email if key.startswith('_sort_')]:
+        del email[key]
+    return email
+
+
+def empty_statistics() -> Dict[str, Any]:
+    return {
+        'pending_emails': 0, 'completed_emails': 0, 'deleted_emails': 0, 'total_emails': 0,
+        'category_stats': {}, 'priority_stats': {}
+    }
+
+
+def add_statistics(totals: Dict[str, Any], stats: Dict[str, Any]):
+    """シャードごとの統計を合算"""
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            for name, count in value.items():
+                totals[key][name] = totals[key].get(name, 0) + count
+        else:
+            totals[key] += value
+
+
+# アーカイブへ移すステータスと、圧縮して残すカラム（reply_html・body_preview は作り直せるので持たない）
+ARCHIVABLE_STATUSES = ('completed', 'deleted')
+ARCHIVED_EMAIL_FIELDS = tuple(field for field in EMAIL_FIELDS if field not in ('reply_html', 'body_preview'))
+
+
+def compress_email(email: Dict[str, Any]) -> bytes:
+    """アーカイブ用にメール1件をzlib圧縮したJSONにする"""
+    return zlib.compress(json.dumps(email, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'))
+
+
+def decompress_email(payload: bytes, archived_at: Any, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """アーカイブ済みメールを展開（fields 指定時はそのカラムだけ、派生カラムもここで計算）"""
+    email = json.loads(zlib.decompress(payload).decode('utf-8'))
+    email['reply_html'] = render_markdown(email.get('reply_draft') or '')
+    email['body_preview'] = (email.get('body') or '')[:EMAIL_PREVIEW_LENGTH]
+    email['archived_at'] = archived_at
+    return {field: email.get(field) for field in (fields or (*EMAIL_FIELDS, 'archived_at'))}
+
+
+class ProfessorEmailDatabase(EmailStorage):
+    """教授向けメールデータベース（SQLite）
+
+    DATABASE_SHARDING が有効なら、既定メールボックス以外のメールは1メールボックス1ファイルの
+    シャード（shard_dir/{mailbox}.db）に置き、教授ごとの書き込みが互いを待たないようにする。
+    Slack・テナント・実行履歴など共通のテーブルは db_path に置く。
+    """
+    backend = 'sqlite'
     _instance: Optional['ProfessorEmailDatabase'] = None
     _initialized = False
     
-    def __new__(cls, db_path: str = DATABASE_PATH):
+    def __new__(cls, db_path: str = DATABASE_PATH, shard_dir: Optional[str] = None):
         """シングルトンパターン実装"""
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def __init__(self, db_path: str = DATABASE_PATH):
-        """教授向けメールデータベース（1回だけ初期化）"""
+    def __init__(self, db_path: str = DATABASE_PATH, shard_dir: Optional[str] = None):
+        """教授向けメールデータベース（1回だけ初期化）
+
+        shard_dir: シャードの置き場（省略時は DATABASE_SHARD_DIR、未設定ならDBファイルの隣の <DB名>_shards/）
+        """
         if ProfessorEmailDatabase._initialized:
             return
             
         self.db_path = db_path
+        self.sharding = DATABASE_SHARDING
+        self.shard_dir = shard_dir or DATABASE_SHARD_DIR or f'{os.path.splitext(db_path)[0]}_shards'
+        self._shards = ShardConnectionCache(DATABASE_MAX_OPEN_SHARDS)
+        self._ready_shards = set()
+        self._shard_init_lock = threading.Lock()
         self.init_database()
+        if self.sharding:
+            self._migrate_mailboxes_to_shards()
         ProfessorEmailDatabase._initialized = True
     
     def init_database(self):
         """データベース・テーブル作成"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+        # 新規DBは削除した分の領域を compact() で少しずつ返せるようにする（既存DBは初回の compact() で切り替え）
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        
+        # メールテーブル（既定メールボックス分。分割無効時は全メールボックス分）
+        self._init_email_tables(cursor)
+        
+        # 処理履歴テーブル
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS processing_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                execution_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+                emails_processed INTEGER,
+                emails_categorized INTEGER,
+                status TEXT,
+                error_message TEXT
+            )
+        ''')
         
-        # メールテーブル
+        # Slack送信アウトボックス（送信失敗メッセージの再送キュー）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS slack_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                status TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                last_error TEXT,
+                next_attempt_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                sent_at DATETIME NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_slack_outbox_due
+            ON slack_outbox (status, next_attempt_at)
+        ''')
+        
+        # Slack DM配信先（教授ごとのダイジェスト送信先）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS slack_recipients (
+                slack_user_id TEXT PRIMARY KEY,
+                display_name TEXT,
+                mailbox TEXT NOT NULL DEFAULT 'default',
+                enabled INTEGER DEFAULT 1,
+                delivered_count INTEGER DEFAULT 0,
+                failure_count INTEGER DEFAULT 0,
+                last_sent_at DATETIME NULL,
+                last_latency_ms REAL NULL,
+                last_error TEXT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # テナント（教授ごとのメールボックスとGmail認証情報）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tenants (
+                tenant_id TEXT PRIMARY KEY,
+                display_name TEXT,
+                token_file TEXT,
+                enabled INTEGER DEFAULT 1,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        self._add_missing_columns(cursor, 'processing_history', MIGRATED_HISTORY_COLUMNS)
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_processing_history_time ON processing_history (execution_time)')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_processing_history_mailbox_time
+            ON processing_history (mailbox, execution_time)
+        ''')
+        
+        conn.commit()
+        conn.close()
+        print("✅ 教授向けデータベース初期化完了")
+    
+    def _add_missing_columns(self, cursor: sqlite3.Cursor, table: str, migrated_columns: Dict[str, str]) -> List[str]:
+        """後から追加したカラムを既存DBに追加（追加したカラム名を返す）"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        columns = {row[1] for row in cursor.fetchall()}
+        added = []
+        for column, definition in migrated_columns.items():
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+                print(f"🔄 {table}テーブルにカラム追加: {column}")
+                added.append(column)
+        return added
+    
+    def _migrate_reply_html(self, cursor: sqlite3.Cursor):
+        """既存行の返信草案HTML事前生成"""
+        cursor.execute('''
+            SELECT id, reply_draft FROM emails
+            WHERE reply_html IS NULL AND reply_draft IS NOT NULL AND reply_draft != ''
+        ''')
+        rows = cursor.fetchall()
+        if rows:
+            cursor.executemany(
+                'UPDATE emails SET reply_html = ? WHERE id = ?',
+                [(render_markdown(decompress_text(reply_draft)), email_id) for email_id, reply_draft in rows]
+            )
+            print(f"🔄 返信草案HTMLを事前生成: {len(rows)}件")
+    
+    def _migrate_compressed_text(self, cursor: sqlite3.Cursor, batch_size: int = 1000):
+        """圧縮導入前の行: 本文の先頭を body_preview に切り出し、body・reply_draft を圧縮"""
+        cursor.execute(f'UPDATE emails SET body_preview = substr(body, 1, {EMAIL_PREVIEW_LENGTH}) WHERE body_preview IS NULL')
+        compressed = 0
+        last_rowid = 0
+        while True:
+            rows = cursor.execute('''
+                SELECT rowid, body, reply_draft FROM emails WHERE rowid > ? ORDER BY rowid LIMIT ?
+            ''', (last_rowid, batch_size)).fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                'UPDATE emails SET body = ?, reply_draft = ? WHERE rowid = ?',
+                [(compress_text(body), compress_text(reply_draft), rowid) for rowid, body, reply_draft in rows]
+            )
+            compressed += len(rows)
+            last_rowid = rows[-1][0]
+        if compressed:
+            # 空いた領域は次の compact()（services.retention）でファイルから返す
+            print(f"🔄 本文・返信草案を圧縮: {compressed}件")
+    
+    def _init_email_tables(self, cursor: sqlite3.Cursor):
+        """メールテーブル・インデックス作成とマイグレーション（共有DB・各シャード共通）"""
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS emails (
                 id TEXT PRIMARY KEY,
@@ -40,302 +380,1247 @@ class ProfessorEmailDatabase:
                 sender_email TEXT NOT NULL,
                 date TEXT NOT NULL,
                 body TEXT NOT NULL,
+                body_preview TEXT,
                 category TEXT NOT NULL,
                 priority TEXT NOT NULL,
                 urgency_score INTEGER DEFAULT 0,
                 gmail_link TEXT,
                 reply_draft TEXT,
+                reply_html TEXT,
+                mailbox TEXT DEFAULT 'default',
                 status TEXT DEFAULT 'pending',
                 completed_at DATETIME NULL,
+                deleted_at DATETIME NULL,
                 processed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        added = self._add_missing_columns(cursor, 'emails', MIGRATED_EMAIL_COLUMNS)
+        self._migrate_reply_html(cursor)
+        if 'body_preview' in added:
+            self._migrate_compressed_text(cursor)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_emails_mailbox_status ON emails (mailbox, status)')
+        # 未対応メールだけの部分インデックス（完了・削除済みが増えても一覧・集計が読む範囲は増えない）
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_emails_pending_urgency
+            ON emails (mailbox, urgency_score DESC, processed_at DESC) WHERE status = 'pending'
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_emails_pending_category
+            ON emails (mailbox, category, urgency_score DESC, processed_at DESC) WHERE status = 'pending'
+        ''')
         
-        # 処理履歴テーブル
+        # 保持期間を過ぎた完了・削除済みメール（本文ごとzlib圧縮したJSON、検索しないので列は最小限）
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS processing_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                execution_time DATETIME DEFAULT CURRENT_TIMESTAMP,
-                emails_processed INTEGER,
-                emails_categorized INTEGER,
-                status TEXT,
-                error_message TEXT
+            CREATE TABLE IF NOT EXISTS emails_archive (
+                id TEXT PRIMARY KEY,
+                mailbox TEXT DEFAULT 'default',
+                status TEXT NOT NULL,
+                completed_at DATETIME NULL,
+                archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                payload BLOB NOT NULL
             )
         ''')
-        
-        conn.commit()
-        conn.close()
-        print("✅ 教授向けデータベース初期化完了")
     
+    def shard_path(self, mailbox: Optional[str]) -> str:
+        """メールボックスのメールを置くDBファイル（初回はスキーマを作成）
+
+        既定メールボックス・分割無効時・mailbox=None は共有DB（db_path）。
+        """
+        if not self.sharding or not mailbox or mailbox == DEFAULT_MAILBOX:
+            return self.db_path
+        if not SHARD_NAME_PATTERN.match(mailbox):
+            raise ValueError(f"メールボックス名に使えない文字が含まれています: {mailbox!r}")
+        path = os.path.join(self.shard_dir, f'{mailbox}.db')
+        if path not in self._ready_shards:
+            self._init_shard(path)
+        return path
+    
+    def _init_shard(self, path: str):
+        """シャードファイルのスキーマ作成（プロセス内で1回）"""
+        with self._shard_init_lock:
+            if path in self._ready_shards:
+                return
+            os.makedirs(self.shard_dir, exist_ok=True)
+            conn = sqlite3.connect(path)
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            # シャード内でも読み込みが書き込みを待たないようにする
+            conn.execute('PRAGMA journal_mode = WAL')
+            self._init_email_tables(conn.cursor())
+            conn.commit()
+            conn.close()
+            self._ready_shards.add(path)
+    
+    def shard_mailboxes(self) -> List[str]:
+        """メールがありうるメールボックス（既定・登録済みテナント・既存のシャードファイル）"""
+        mailboxes = {DEFAULT_MAILBOX}
+        mailboxes.update(tenant['tenant_id'] for tenant in self.get_tenants())
+        if self.sharding and os.path.isdir(self.shard_dir):
+            mailboxes.update(name[:-len('.db')] for name in os.listdir(self.shard_dir) if name.endswith('.db'))
+        return sorted(mailboxes, key=lambda mailbox: (mailbox != DEFAULT_MAILBOX, mailbox))
+    
+    def _targets(self, mailbox: Optional[str]) -> List[Optional[str]]:
+        """クエリを流すメールボックス（mailbox=None は全体: 分割なしなら絞り込みなしで1回、分割ありならシャードごと）"""
+        if mailbox or not self.sharding:
+            return [mailbox]
+        return self.shard_mailboxes()
+    
+    def _group_by_shard(self, mailboxes: List[str]) -> List[List[str]]:
+        """同じDBファイルに入るメールボックスをまとめる（名前が不正なものは除く）"""
+        groups: Dict[str, List[str]] = {}
+        for mailbox in mailboxes:
+            try:
+                groups.setdefault(self.shard_path(mailbox), []).append(mailbox)
+            except ValueError as e:
+                print(f"⚠️ {e}")
+        return list(groups.values())
+    
+    @contextmanager
+    def _connect(self, mailbox: Optional[str]) -> Iterator[sqlite3.Connection]:
+        """メールボックスのシャードへの接続をキャッシュから借りる"""
+        with self._shards.connection(self.shard_path(mailbox)) as conn:
+            yield conn
+    
+    def _migrate_mailboxes_to_shards(self):
+        """分割前に共有DBへ保存された既定以外のメールボックスのメールを各シャードへ移す"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        columns = ', '.join(EMAIL_FIELDS)
+        try:
+            mailboxes = [row[0] for row in conn.execute(
+                'SELECT DISTINCT mailbox FROM emails WHERE mailbox != ?', (DEFAULT_MAILBOX,)
+            )]
+            for mailbox in mailboxes:
+                try:
+                    path = self.shard_path(mailbox)
+                except ValueError as e:
+                    print(f"⚠️ {e}")
+                    continue
+                conn.execute('ATTACH DATABASE ? AS shard', (path,))
+                try:
+                    conn.execute('BEGIN')
+                    moved = conn.execute(f'''
+                        INSERT OR IGNORE INTO shard.emails ({columns})
+                        SELECT {columns} FROM main.emails WHERE mailbox = ?
+                    ''', (mailbox,)).rowcount
+                    conn.execute('DELETE FROM main.emails WHERE mailbox = ?', (mailbox,))
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                finally:
+                    conn.execute('DETACH DATABASE shard')
+                print(f"🔄 メールボックス {mailbox} のメールをシャードへ移動: {moved}件")
+        finally:
+            conn.close()
+    
+    @timed_query
     def save_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
         """メール情報を保存（既存メールのステータス保持）"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            email_id = email_data['id']
-            email_subject = email_data['subject'][:50] + "..." if len(email_data['subject']) > 50 else email_data['subject']
-            
-            # デバッグ: メールID確認
-            print(f"🔍 処理中メールID: {email_id}")
-            print(f"📧 件名: {email_subject}")
-            
-            # 既存メールの状態をチェック
-            cursor.execute('SELECT status, completed_at FROM emails WHERE id = ?', (email_id,))
-            existing_email = cursor.fetchone()
-            
-            # 複数のGmailリンク形式を試す
-            gmail_links = [
-                f"https://mail.google.com/mail/u/0/#all/{email_id}",  # 全メールから検索
-                f"https://mail.google.com/mail/u/0/#inbox/{email_id}",  # 受信トレイ
-                f"https://mail.google.com/mail/u/0/?shva=1#search/rfc822msgid%3A{email_id}"  # RFC822 ID検索
-            ]
-            gmail_link = gmail_links[0]
-            
-            result = {"success": False, "action": "none", "status": "unknown"}
-            
-            if existing_email:
-                # 既存メールの場合：ステータスと完了日時を保持
-                existing_status, existing_completed_at = existing_email
+            with self._connect(email_data.get('mailbox', DEFAULT_MAILBOX)) as conn:
+                cursor = conn.cursor()
                 
-                print(f"🔄 既存メール検出！ 現在のステータス: {existing_status}")
-                if existing_completed_at:
-                    print(f"   完了日時: {existing_completed_at}")
+                email_id = email_data['id']
                 
-                cursor.execute('''
-                    UPDATE emails SET 
-                    subject = ?, sender = ?, sender_email = ?, date = ?, body = ?, 
-                    category = ?, priority = ?, urgency_score = ?, gmail_link = ?, 
-                    reply_draft = ?, processed_at = ?
-                    WHERE id = ?
-                ''', (
-                    email_data['subject'],
-                    email_data['sender'],
-                    email_data['sender_email'],
-                    email_data['date'],
-                    email_data['body'],
-                    email_data['category'],
-                    email_data['priority'],
-                    email_data['urgency_score'],
-                    gmail_link,
-                    email_data['reply_draft'],
-                    datetime.now(),
-                    email_id
-                ))
+                # 既存メールの状態をチェック
+                cursor.execute('SELECT status, completed_at FROM emails WHERE id = ?', (email_id,))
+                existing_email = cursor.fetchone()
                 
-                rows_affected = cursor.rowcount
-                print(f"   📝 UPDATE実行: {rows_affected}行更新")
+                # 複数のGmailリンク形式を試す
+                gmail_links = [
+                    f"https://mail.google.com/mail/u/0/#all/{email_id}",  # 全メールから検索
+                    f"https://mail.google.com/mail/u/0/#inbox/{email_id}",  # 受信トレイ
+                    f"https://mail.google.com/mail/u/0/?shva=1#search/rfc822msgid%3A{email_id}"  # RFC822 ID検索
+                ]
+                gmail_link = gmail_links[0]
                 
-                result = {
-                    "success": True, 
-                    "action": "updated", 
-                    "status": existing_status,
-                    "message": f"既存メール更新（ステータス保持: {existing_status}）",
-                    "rows_affected": rows_affected
-                }
-                print(f"   ✅ {result['message']}")
-            else:
-                # 新しいメールの場合：通常の挿入
-                print(f"🆕 新規メール検出")
+                # 返信草案は取り込み時に1回だけHTML化して保存（表示時は再利用）
+                reply_html = render_markdown(email_data.get('reply_draft') or '')
+                # 本文・返信草案は圧縮して保存し、一覧用に本文の先頭だけ平文で持つ
+                body = compress_text(email_data['body'])
+                body_preview = email_data['body'][:EMAIL_PREVIEW_LENGTH]
+                reply_draft = compress_text(email_data['reply_draft'])
                 
-                cursor.execute('''
-                    INSERT INTO emails 
-                    (id, subject, sender, sender_email, date, body, category, priority, urgency_score, gmail_link, reply_draft, status, processed_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    email_id,
-                    email_data['subject'],
-                    email_data['sender'],
-                    email_data['sender_email'],
-                    email_data['date'],
-                    email_data['body'],
-                    email_data['category'],
-                    email_data['priority'],
-                    email_data['urgency_score'],
-                    gmail_link,
-                    email_data['reply_draft'],
-                    'pending',
-                    datetime.now()
-                ))
+                result = {"success": False, "action": "none", "status": "unknown"}
                 
-                rows_affected = cursor.rowcount
-                print(f"   📝 INSERT実行: {rows_affected}行追加")
+                # アーカイブ済みのメールは取り込み直さない（古いメールが pending で復活しないように）
+                archived = None
+                if not existing_email:
+                    cursor.execute('SELECT status FROM emails_archive WHERE id = ?', (email_id,))
+                    archived = cursor.fetchone()
                 
-                result = {
-                    "success": True, 
-                    "action": "inserted", 
-                    "status": "pending",
-                    "message": "新規メール追加（pending）",
-                    "rows_affected": rows_affected
-                }
-                print(f"   ✅ {result['message']}")
-            
-            conn.commit()
-            conn.close()
+                if archived:
+                    result = {
+                        "success": True,
+                        "action": "archived",
+                        "status": archived[0],
+                        "message": f"アーカイブ済みのため保存しません（{archived[0]}）",
+                        "rows_affected": 0
+                    }
+                elif existing_email:
+                    # 既存メールの場合：ステータスと完了日時を保持
+                    existing_status, existing_completed_at = existing_email
+                
+                    cursor.execute('''
+                        UPDATE emails SET 
+                        subject = ?, sender = ?, sender_email = ?, date = ?, body = ?, body_preview = ?,
+                        category = ?, priority = ?, urgency_score = ?, gmail_link = ?, 
+                        reply_draft = ?, reply_html = ?, processed_at = ?
+                        WHERE id = ?
+                    ''', (
+                        email_data['subject'],
+                        email_data['sender'],
+                        email_data['sender_email'],
+                        email_data['date'],
+                        body,
+                        body_preview,
+                        email_data['category'],
+                        email_data['priority'],
+                        email_data['urgency_score'],
+                        gmail_link,
+                        reply_draft,
+                        reply_html,
+                        datetime.now(),
+                        email_id
+                    ))
+                
+                    rows_affected = cursor.rowcount
+                
+                    result = {
+                        "success": True, 
+                        "action": "updated", 
+                        "status": existing_status,
+                        "message": f"既存メール更新（ステータス保持: {existing_status}）",
+                        "rows_affected": rows_affected
+                    }
+                else:
+                    # 新しいメールの場合：通常の挿入
+                    cursor.execute('''
+                        INSERT INTO emails 
+                        (id, subject, sender, sender_email, date, body, body_preview, category, priority, urgency_score, gmail_link, reply_draft, reply_html, mailbox, status, processed_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (
+                        email_id,
+                        email_data['subject'],
+                        email_data['sender'],
+                        email_data['sender_email'],
+                        email_data['date'],
+                        body,
+                        body_preview,
+                        email_data['category'],
+                        email_data['priority'],
+                        email_data['urgency_score'],
+                        gmail_link,
+                        reply_draft,
+                        reply_html,
+                        email_data.get('mailbox', DEFAULT_MAILBOX),
+                        'pending',
+                        datetime.now()
+                    ))
+                
+                    rows_affected = cursor.rowcount
+                
+                    result = {
+                        "success": True, 
+                        "action": "inserted", 
+                        "status": "pending",
+                        "message": "新規メール追加（pending）",
+                        "rows_affected": rows_affected
+                    }
+                
+                conn.commit()
+            logger.debug("📝 メール保存", extra=sampled(
+                email_id=email_id, action=result['action'], status=result['status'],
+                completed_at=existing_email[1] if existing_email else None
+            ))
+            if result['action'] in ('updated', 'inserted'):
+                event_bus.email_changed(email_data.get('mailbox', DEFAULT_MAILBOX), [email_id], 'saved',
+                                        result['status'], emails=[email_event(email_data, result['status'])])
             return result
             
         except Exception as e:
-            print(f"❌ メール保存エラー: {e}")
-            print(f"   メールID: {email_data.get('id', 'Unknown')}")
-            print(f"   件名: {email_data.get('subject', 'Unknown')[:50]}")
+            logger.error("❌ メール保存エラー", extra=log_fields(email_id=email_data.get('id'), error=str(e)))
             return {"success": False, "action": "error", "status": "error", "error": str(e)}
     
-    def get_emails_by_priority(self, priority: str, status: str = 'pending', limit: int = 20) -> List[Dict[str, Any]]:
-        """優先度別メール取得"""
+    @timed_query
+    def list_emails(self, status: Optional[str] = 'pending', category: Optional[str] = None,
+                    priority: Optional[str] = None, fields: Optional[List[str]] = None,
+                    limit: int = 50, offset: int = 0, mailbox: Optional[str] = None) -> List[Dict[str, Any]]:
+        """条件・カラム指定付きメール一覧取得（mailbox 省略時は全シャードを緊急度順にマージ）"""
+        columns = select_columns_sql(fields, EMAIL_LIST_FIELDS)
+        targets = self._targets(mailbox)
+        fan_out = len(targets) > 1
+        if fan_out:
+            # 各シャードから offset+limit 件ずつ取り、まとめて並べ替えてから切り出す
+            columns = f'{columns}, {EMAIL_SORT_COLUMNS}'
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            emails = []
+            for target in targets:
+                where, params = email_filters_sql(status, category, priority, target)
+                with self._connect(target) as conn:
+                    cursor = conn.cursor()
+                    cursor.row_factory = sqlite3.Row
+                    cursor.execute(f'''
+                        SELECT {columns} FROM emails
+                        {where}
+                        ORDER BY urgency_score DESC, processed_at DESC
+                        LIMIT ? OFFSET ?
+                    ''', (*params, limit + offset, 0) if fan_out else (*params, limit, offset))
+                    emails.extend(email_row(row) for row in cursor.fetchall())
             
-            cursor.execute('''
-                SELECT * FROM emails 
-                WHERE priority = ? AND status = ?
-                ORDER BY urgency_score DESC, processed_at DESC
-                LIMIT ?
-            ''', (priority, status, limit))
+            if fan_out:
+                emails.sort(key=email_sort_key, reverse=True)
+                emails = [strip_sort_columns(email) for email in emails[offset:offset + limit]]
+            return emails
             
-            emails = [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"❌ メール一覧取得エラー: {e}")
+            return []
+    
+    @timed_query
+    def count_emails(self, status: Optional[str] = 'pending', category: Optional[str] = None,
+                     priority: Optional[str] = None, mailbox: Optional[str] = None) -> int:
+        """条件に一致するメール件数"""
+        try:
+            count = 0
+            for target in self._targets(mailbox):
+                where, params = email_filters_sql(status, category, priority, target)
+                with self._connect(target) as conn:
+                    count += conn.execute(f'SELECT COUNT(*) FROM emails {where}', params).fetchone()[0]
+            return count
             
-            # デバッグ: データ構造確認
-            if emails:
-                print(f"📧 優先度フィルター: {priority} - {len(emails)}件取得")
+        except Exception as e:
+            print(f"❌ メール件数取得エラー: {e}")
+            return 0
+    
+    def iter_emails(self, status: Optional[str] = 'pending', category: Optional[str] = None,
+                    priority: Optional[str] = None, fields: Optional[List[str]] = None,
+                    limit: int = 0, chunk_size: int = STREAM_CHUNK_SIZE,
+                    mailbox: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """メールをカーソルから少しずつ読み出すジェネレータ（limit=0で全件）
+
+        ストリーミング応答用。mailbox 省略時はシャードごとのカーソルを緊急度順にマージする。
+        """
+        targets = self._targets(mailbox)
+        if len(targets) == 1:
+            yield from self._iter_shard(targets[0], status, category, priority, fields, limit, chunk_size)
+            return
+        
+        streams = [
+            self._iter_shard(target, status, category, priority, fields, limit, chunk_size, sort_columns=True)
+            for target in targets
+        ]
+        try:
+            merged = heapq.merge(*streams, key=email_sort_key, reverse=True)
+            for count, email in enumerate(merged, start=1):
+                yield strip_sort_columns(email)
+                if 0 < limit <= count:
+                    break
+        finally:
+            for stream in streams:
+                stream.close()
+    
+    def _iter_shard(self, mailbox: Optional[str], status: Optional[str], category: Optional[str],
+                    priority: Optional[str], fields: Optional[List[str]], limit: int, chunk_size: int,
+                    sort_columns: bool = False) -> Iterator[Dict[str, Any]]:
+        """1シャード分の iter_emails
+
+        応答を送り終えるまで接続を持つので、キャッシュの接続は使わず専用に開く。
+        呼び出し側のスレッドが切り替わっても使えるよう check_same_thread=False で接続する
+        （同時に使うのは1スレッドのみ）。
+        """
+        columns = select_columns_sql(fields, EMAIL_LIST_FIELDS)
+        if sort_columns:
+            columns = f'{columns}, {EMAIL_SORT_COLUMNS}'
+        where, params = email_filters_sql(status, category, priority, mailbox)
+        
+        conn = sqlite3.connect(self.shard_path(mailbox), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {columns} FROM emails
+                {where}
+                ORDER BY urgency_score DESC, processed_at DESC
+                LIMIT ?
+            ''', (*params, limit if limit > 0 else -1))
             
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield email_row(row)
+        finally:
             conn.close()
-            return emails
+    
+    @timed_query
+    def get_email(self, email_id: str, fields: Optional[List[str]] = None,
+                  mailbox: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """メール1件取得（詳細表示用）"""
+        columns = select_columns_sql(fields, EMAIL_FIELDS)
+        
+        try:
+            for target in self._targets(mailbox):
+                where, params = email_filters_sql(None, None, None, target)
+                where = f"{where} AND id = ?" if where else "WHERE id = ?"
+                with self._connect(target) as conn:
+                    cursor = conn.cursor()
+                    cursor.row_factory = sqlite3.Row
+                    cursor.execute(f'SELECT {columns} FROM emails {where}', (*params, email_id))
+                    row = cursor.fetchone()
+                if row:
+                    return email_row(row)
+            return None
             
         except Exception as e:
-            print(f"❌ 優先度別メール取得エラー: {e}")
+            print(f"❌ メール取得エラー: {e}")
+            return None
+    
+    @timed_query
+    def get_emails_by_ids(self, email_ids: List[str], fields: Optional[List[str]] = None,
+                          mailbox: Optional[str] = None) -> List[Dict[str, Any]]:
+        """指定したIDのメールをまとめて取得（email_ids の順、見つからないものは含めない）"""
+        columns = select_columns_sql(list(dict.fromkeys(['id', *(fields or EMAIL_FIELDS)])), EMAIL_FIELDS)
+        ids = list(dict.fromkeys(email_ids))
+        found: Dict[str, Dict[str, Any]] = {}
+        try:
+            for target in self._targets(mailbox):
+                where, params = email_filters_sql(None, None, None, target)
+                with self._connect(target) as conn:
+                    cursor = conn.cursor()
+                    cursor.row_factory = sqlite3.Row
+                    # 古いSQLiteのバインド変数上限（999）に収まるよう分けて引く
+                    for start in range(0, len(ids), SQLITE_IN_CHUNK_SIZE):
+                        chunk = ids[start:start + SQLITE_IN_CHUNK_SIZE]
+                        id_filter = f"id IN ({', '.join('?' for _ in chunk)})"
+                        cursor.execute(f"SELECT {columns} FROM emails {f'{where} AND' if where else 'WHERE'} {id_filter}",
+                                       (*params, *chunk))
+                        found.update((row['id'], email_row(row)) for row in cursor.fetchall())
+            return [found[email_id] for email_id in ids if email_id in found]
+            
+        except Exception as e:
+            print(f"❌ メール取得エラー: {e}")
             return []
+    
+    @timed_query
+    def update_email_status(self, email_id: str, status: str, mailbox: Optional[str] = None) -> bool:
+        """メールステータス更新（mailbox 指定時は他のメールボックスのメールを更新しない）
 
-    def get_emails_by_category(self, category: str = None, status: str = 'pending', limit: int = 20) -> List[Dict[str, Any]]:
-        """カテゴリ別メール取得"""
+        削除済み（墓標）のメールは更新せず False を返す。
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+            for target in self._targets(mailbox):
+                scope = ' AND mailbox = ?' if target else ''
+                scope_params = (target,) if target else ()
+                with self._connect(target) as conn:
+                    cursor = conn.cursor()
+                    
+                    if status == 'completed':
+                        # 完了時は完了日時も記録
+                        cursor.execute(f'''
+                            UPDATE emails 
+                            SET status = ?, completed_at = ?
+                            WHERE id = ? AND status != 'deleted'{scope}
+                        ''', (status, datetime.now().isoformat(), email_id, *scope_params))
+                    else:
+                        cursor.execute(f'''
+                            UPDATE emails 
+                            SET status = ?
+                            WHERE id = ? AND status != 'deleted'{scope}
+                        ''', (status, email_id, *scope_params))
+                    
+                    updated = cursor.rowcount > 0
+                    conn.commit()
+                if updated:
+                    event_bus.email_changed(target, [email_id], status, status)
+                    return True
+            return False
+            
+        except Exception as e:
+            print(f"❌ メールステータス更新エラー: {e}")
+            return False
+    
+    @timed_query
+    def delete_email(self, email_id: str, mailbox: Optional[str] = None) -> bool:
+        """メール削除（行は消さず status='deleted' の墓標にして、次回の取り込みで復活させない）
+
+        mailbox 指定時は他のメールボックスのメールを削除しない。
+        """
+        try:
+            for target in self._targets(mailbox):
+                with self._connect(target) as conn:
+                    cursor = conn.cursor()
+                    
+                    # 保持期間は削除した時点から数える
+                    deleted_at = datetime.now().isoformat()
+                    if target:
+                        cursor.execute("UPDATE emails SET status = 'deleted', deleted_at = ? WHERE id = ? AND mailbox = ?",
+                                       (deleted_at, email_id, target))
+                    else:
+                        cursor.execute("UPDATE emails SET status = 'deleted', deleted_at = ? WHERE id = ?",
+                                       (deleted_at, email_id))
+                    
+                    deleted = cursor.rowcount > 0
+                    conn.commit()
+                if deleted:
+                    event_bus.email_changed(target, [email_id], 'deleted', 'deleted')
+                    return True
+            return False
+            
+        except Exception as e:
+            print(f"❌ メール削除エラー: {e}")
+            return False
+    
+    @timed_query
+    def bulk_update_status(self, status: str, email_ids: Optional[List[str]] = None,
+                           category: Optional[str] = None, priority: Optional[str] = None,
+                           older_than_days: Optional[int] = None, from_statuses: Sequence[str] = ('pending',),
+                           mailbox: Optional[str] = None) -> List[str]:
+        """ID リストまたは条件に合うメールのステータスをまとめて変更し、変更したIDを返す
+
+        シャードごとに BEGIN IMMEDIATE の1トランザクションで、対象の選択から更新までを行う。
+        """
+        # 削除済み（墓標）は from_statuses によらず対象外
+        conditions = [f"status IN ({', '.join('?' for _ in from_statuses)})", "status != 'deleted'"]
+        params: List[Any] = list(from_statuses)
+        for column, value in (('category', category), ('priority', priority)):
+            if value:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if older_than_days is not None:
+            # created_at は CURRENT_TIMESTAMP（UTC）なので、SQLite側の現在時刻と比べる
+            conditions.append("created_at < datetime('now', ?)")
+            params.append(f'-{older_than_days} days')
+        ids = list(dict.fromkeys(email_ids)) if email_ids is not None else None
+        completed_at = datetime.now().isoformat() if status == 'completed' else None
+        deleted_at = datetime.now().isoformat() if status == 'deleted' else None
+        updated: List[str] = []
+        try:
+            for target in self._targets(mailbox):
+                where = ' AND '.join(conditions + (['mailbox = ?'] if target else []))
+                where_params = params + ([target] if target else [])
+                with self._connect(target) as conn:
+                    conn.execute('BEGIN IMMEDIATE')
+                    try:
+                        if ids is None:
+                            matched = [row[0] for row in conn.execute(f'SELECT id FROM emails WHERE {where}',
+                                                                      where_params)]
+                        else:
+                            matched = []
+                            # 古いSQLiteのバインド変数上限（999）に収まるよう分けて引く
+                            for start in range(0, len(ids), SQLITE_IN_CHUNK_SIZE):
+                                chunk = ids[start:start + SQLITE_IN_CHUNK_SIZE]
+                                matched.extend(row[0] for row in conn.execute(
+                                    f"SELECT id FROM emails WHERE id IN ({', '.join('?' for _ in chunk)}) AND {where}",
+                                    (*chunk, *where_params)
+                                ))
+                        conn.executemany(
+                            '''UPDATE emails SET status = ?, completed_at = COALESCE(?, completed_at),
+                               deleted_at = COALESCE(?, deleted_at) WHERE id = ?''',
+                            [(status, completed_at, deleted_at, email_id) for email_id in matched]
+                        )
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                updated.extend(matched)
+                event_bus.email_changed(target, matched, status, status)
+            logger.info(f"📦 一括更新: {len(updated)}件を{status}に", extra=log_fields(
+                status=status, updated=len(updated), mailbox=mailbox
+            ))
+            return updated
+            
+        except Exception as e:
+            print(f"❌ メール一括更新エラー: {e}")
+            return updated
+    
+    @timed_query
+    def get_statistics(self, mailbox: Optional[str] = None) -> Dict[str, Any]:
+        """統計情報取得（mailbox 指定時はそのメールボックスのみ、省略時は全シャードの合計）"""
+        try:
+            totals = empty_statistics()
+            for target in self._targets(mailbox):
+                add_statistics(totals, self._shard_statistics(target))
+            return totals
+            
+        except Exception as e:
+            print(f"❌ 統計情報取得エラー: {e}")
+            return {}
+    
+    @timed_query
+    def get_mailbox_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """管理用: メールボックスごとの統計とDBファイルサイズ"""
+        try:
+            statistics = {}
+            for mailbox in self.shard_mailboxes():
+                stats = self._shard_statistics(mailbox)
+                path = self.shard_path(mailbox)
+                stats['db_path'] = path
+                stats['db_bytes'] = os.path.getsize(path) if os.path.exists(path) else 0
+                statistics[mailbox] = stats
+            return statistics
+            
+        except Exception as e:
+            print(f"❌ メールボックス別統計取得エラー: {e}")
+            return {}
+    
+    def _shard_statistics(self, mailbox: Optional[str]) -> Dict[str, Any]:
+        """1シャード（mailbox=None かつ分割なしなら全体）の統計"""
+        scope = 'AND mailbox = ?' if mailbox else ''
+        params = (mailbox,) if mailbox else ()
+        with self._connect(mailbox) as conn:
             cursor = conn.cursor()
             
-            if category:
-                cursor.execute('''
-                    SELECT * FROM emails 
-                    WHERE category = ? AND status = ?
-                    ORDER BY urgency_score DESC, processed_at DESC
-                    LIMIT ?
-                ''', (category, status, limit))
-            else:
-                cursor.execute('''
-                    SELECT * FROM emails 
-                    WHERE status = ?
-                    ORDER BY urgency_score DESC, processed_at DESC
-                    LIMIT ?
-                ''', (status, limit))
+            # ステータス別件数
+            cursor.execute(f"SELECT status, COUNT(*) FROM emails WHERE 1 = 1 {scope} GROUP BY status", params)
+            status_counts = dict(cursor.fetchall())
             
-            emails = [dict(row) for row in cursor.fetchall()]
+            # カテゴリ別統計
+            cursor.execute(f'''
+                SELECT category, COUNT(*) 
+                FROM emails WHERE status = 'pending' {scope}
+                GROUP BY category
+            ''', params)
+            category_stats = dict(cursor.fetchall())
+            
+            # 優先度別統計
+            cursor.execute(f'''
+                SELECT priority, COUNT(*) 
+                FROM emails WHERE status = 'pending' {scope}
+                GROUP BY priority
+            ''', params)
+            priority_stats = dict(cursor.fetchall())
+        
+        return {
+            'pending_emails': status_counts.get('pending', 0),
+            'completed_emails': status_counts.get('completed', 0),
+            'deleted_emails': status_counts.get('deleted', 0),
+            'total_emails': sum(status_counts.values()),
+            'category_stats': category_stats,
+            'priority_stats': priority_stats
+        }
+    
+    @timed_query
+    def get_email_debug_info(self, mailbox: Optional[str] = None) -> Dict[str, Any]:
+        """デバッグ用: ステータス分布・最近処理したメール・完了済みメール・重複ID"""
+        info: Dict[str, Any] = {
+            "status_counts": {}, "recent_processed": [], "recent_completed": [],
+            "completed_count": 0, "first_completed": None, "last_completed": None, "duplicate_ids": []
+        }
+        try:
+            for target in self._targets(mailbox):
+                where, params = email_filters_sql(None, None, None, target)
+                completed_where, completed_params = email_filters_sql('completed', None, None, target)
+                with self._connect(target) as conn:
+                    cursor = conn.cursor()
+                    cursor.row_factory = sqlite3.Row
+                    
+                    cursor.execute(f'SELECT status, COUNT(*) AS count FROM emails {where} GROUP BY status', params)
+                    for row in cursor.fetchall():
+                        info["status_counts"][row['status']] = info["status_counts"].get(row['status'], 0) + row['count']
+                    
+                    cursor.execute(f'''
+                        SELECT id, subject, status, processed_at, completed_at FROM emails {where}
+                        ORDER BY processed_at DESC LIMIT 10
+                    ''', params)
+                    info["recent_processed"].extend(dict(row) for row in cursor.fetchall())
+                    
+                    cursor.execute(f'''
+                        SELECT id, subject, status, completed_at, processed_at FROM emails {completed_where}
+                        ORDER BY completed_at DESC LIMIT 5
+                    ''', completed_params)
+                    info["recent_completed"].extend(dict(row) for row in cursor.fetchall())
+                    
+                    cursor.execute(f'''
+                        SELECT COUNT(*) AS count, MIN(completed_at) AS first, MAX(completed_at) AS last
+                        FROM emails {completed_where}
+                    ''', completed_params)
+                    row = cursor.fetchone()
+                    info["completed_count"] += row['count']
+                    if row['first'] and (info["first_completed"] is None or row['first'] < info["first_completed"]):
+                        info["first_completed"] = row['first']
+                    if row['last'] and (info["last_completed"] is None or row['last'] > info["last_completed"]):
+                        info["last_completed"] = row['last']
+                    
+                    cursor.execute(f'SELECT id, COUNT(*) AS count FROM emails {where} GROUP BY id HAVING COUNT(*) > 1', params)
+                    info["duplicate_ids"].extend(dict(row) for row in cursor.fetchall())
             
-            # デバッグ: データ構造確認
-            if emails:
-                print(f"📧 デバッグ: メールデータのキー = {list(emails[0].keys())}")
-                print(f"📧 デバッグ: サンプルメール = {emails[0]}")
+            info["recent_processed"] = sorted(info["recent_processed"], key=lambda e: str(e['processed_at'] or ''),
+                                              reverse=True)[:10]
+            info["recent_completed"] = sorted(info["recent_completed"], key=lambda e: str(e['completed_at'] or ''),
+                                              reverse=True)[:5]
+            return info
             
+        except Exception as e:
+            print(f"❌ デバッグ情報取得エラー: {e}")
+            return info
+    
+    @timed_query
+    def describe_storage(self, mailbox: Optional[str] = None) -> Dict[str, Any]:
+        """デバッグ用: DBファイル・emailsテーブルの構造・サンプル1行"""
+        where, params = email_filters_sql(None, None, None, mailbox)
+        try:
+            with self._connect(mailbox) as conn:
+                table_structure = conn.execute('PRAGMA table_info(emails)').fetchall()
+                sample_data = conn.execute(f'SELECT * FROM emails {where} LIMIT 1', params).fetchone()
+            if sample_data:
+                sample_data = tuple(decompress_text(value) for value in sample_data)
+            return {
+                "backend": self.backend,
+                "location": self.shard_path(mailbox),
+                "table_structure": table_structure,
+                "sample_data": sample_data
+            }
+            
+        except Exception as e:
+            print(f"❌ DB構造取得エラー: {e}")
+            return {}
+    
+    @timed_query
+    def enqueue_slack_message(self, payload: Dict[str, Any], error: Optional[str] = None) -> Optional[int]:
+        """Slackアウトボックスにメッセージ追加"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO slack_outbox (payload, last_error, next_attempt_at)
+                VALUES (?, ?, ?)
+            ''', (json.dumps(payload, ensure_ascii=False), error, datetime.now().isoformat()))
+            message_id = cursor.lastrowid
+            conn.commit()
             conn.close()
-            return emails
+            return message_id
             
         except Exception as e:
-            print(f"❌ メール取得エラー: {e}")
-            return []
+            print(f"❌ Slackアウトボックス追加エラー: {e}")
+            return None
     
-    def update_email_status(self, email_id: str, status: str) -> bool:
-        """メールステータス更新"""
+    @timed_query
+    def get_due_slack_messages(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """再送期限の来たSlackメッセージ取得"""
         try:
             conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, payload, attempts FROM slack_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY id
+                LIMIT ?
+            ''', (datetime.now().isoformat(), limit))
+            messages = [
+                {"id": row["id"], "payload": json.loads(row["payload"]), "attempts": row["attempts"]}
+                for row in cursor.fetchall()
+            ]
+            conn.close()
+            return messages
             
-            if status == 'completed':
-                # 完了時は完了日時も記録
-                cursor.execute('''
-                    UPDATE emails 
-                    SET status = ?, completed_at = ?
-                    WHERE id = ?
-                ''', (status, datetime.now().isoformat(), email_id))
-            else:
-                cursor.execute('''
-                    UPDATE emails 
-                    SET status = ?
-                    WHERE id = ?
-                ''', (status, email_id))
+        except Exception as e:
+            print(f"❌ Slackアウトボックス取得エラー: {e}")
+            return []
+    
+    @timed_query
+    def mark_slack_message_sent(self, message_id: int) -> bool:
+        """Slackメッセージ送信済み"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE slack_outbox
+                SET status = 'sent', attempts = attempts + 1, sent_at = ?, last_error = NULL
+                WHERE id = ?
+            ''', (datetime.now().isoformat(), message_id))
+            updated = cursor.rowcount > 0
+            conn.commit()
+            conn.close()
+            return updated
             
+        except Exception as e:
+            print(f"❌ Slackアウトボックス更新エラー: {e}")
+            return False
+    
+    @timed_query
+    def mark_slack_message_failed(self, message_id: int, error: Optional[str],
+                                  next_attempt_at: datetime, dead: bool = False) -> bool:
+        """Slackメッセージ送信失敗（deadなら再送しない）"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE slack_outbox
+                SET status = ?, attempts = attempts + 1, last_error = ?, next_attempt_at = ?
+                WHERE id = ?
+            ''', ('dead' if dead else 'pending', error, next_attempt_at.isoformat(), message_id))
             updated = cursor.rowcount > 0
             conn.commit()
             conn.close()
             return updated
             
         except Exception as e:
-            print(f"❌ メールステータス更新エラー: {e}")
+            print(f"❌ Slackアウトボックス更新エラー: {e}")
             return False
     
-    def delete_email(self, email_id: str) -> bool:
-        """メール削除"""
+    @timed_query
+    def get_slack_outbox_stats(self) -> Dict[str, int]:
+        """Slackアウトボックスのステータス別件数"""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
+            cursor.execute('SELECT status, COUNT(*) FROM slack_outbox GROUP BY status')
+            stats = dict(cursor.fetchall())
+            conn.close()
+            return stats
             
-            cursor.execute('DELETE FROM emails WHERE id = ?', (email_id,))
+        except Exception as e:
+            print(f"❌ Slackアウトボックス統計取得エラー: {e}")
+            return {}
+    
+    @timed_query
+    def upsert_slack_recipient(self, slack_user_id: str, display_name: str = '',
+                               mailbox: str = DEFAULT_MAILBOX, enabled: bool = True) -> bool:
+        """Slack DM配信先の登録・更新（他のメールボックスに登録済みの配信先は書き換えず False）"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO slack_recipients (slack_user_id, display_name, mailbox, enabled)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(slack_user_id) DO UPDATE SET
+                    display_name = excluded.display_name,
+                    enabled = excluded.enabled
+                WHERE slack_recipients.mailbox = excluded.mailbox
+            ''', (slack_user_id, display_name, mailbox, 1 if enabled else 0))
+            upserted = cursor.rowcount > 0
+            conn.commit()
+            conn.close()
+            return upserted
             
+        except Exception as e:
+            print(f"❌ Slack配信先登録エラー: {e}")
+            return False
+    
+    @timed_query
+    def delete_slack_recipient(self, slack_user_id: str, mailbox: Optional[str] = None) -> bool:
+        """Slack DM配信先の削除（mailbox 指定時はそのメールボックスの配信先のみ）"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            if mailbox is None:
+                cursor.execute('DELETE FROM slack_recipients WHERE slack_user_id = ?', (slack_user_id,))
+            else:
+                cursor.execute('DELETE FROM slack_recipients WHERE slack_user_id = ? AND mailbox = ?',
+                               (slack_user_id, mailbox))
             deleted = cursor.rowcount > 0
             conn.commit()
             conn.close()
             return deleted
             
         except Exception as e:
-            print(f"❌ メール削除エラー: {e}")
+            print(f"❌ Slack配信先削除エラー: {e}")
             return False
     
-    def get_statistics(self) -> Dict[str, Any]:
-        """統計情報取得"""
+    @timed_query
+    def get_slack_recipients(self, enabled_only: bool = False, mailbox: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Slack DM配信先一覧（配信実績付き、mailbox 指定時はそのメールボックスのみ）"""
         try:
             conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
+            conditions, params = (['enabled = 1'] if enabled_only else []), []
+            if mailbox is not None:
+                conditions.append('mailbox = ?')
+                params.append(mailbox)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            cursor.execute(f'SELECT * FROM slack_recipients {where} ORDER BY mailbox, slack_user_id', params)
+            recipients = [dict(row) for row in cursor.fetchall()]
+            conn.close()
+            return recipients
             
-            # 基本統計
-            cursor.execute('SELECT COUNT(*) FROM emails WHERE status = "pending"')
-            pending_emails = cursor.fetchone()[0]
+        except Exception as e:
+            print(f"❌ Slack配信先取得エラー: {e}")
+            return []
+    
+    @timed_query
+    def record_slack_delivery(self, slack_user_id: str, success: bool, latency_ms: float,
+                              error: Optional[str] = None) -> bool:
+        """Slack DM配信結果を記録"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE slack_recipients SET
+                    delivered_count = delivered_count + ?,
+                    failure_count = failure_count + ?,
+                    last_sent_at = CASE WHEN ? THEN ? ELSE last_sent_at END,
+                    last_latency_ms = ?,
+                    last_error = ?
+                WHERE slack_user_id = ?
+            ''', (
+                1 if success else 0, 0 if success else 1,
+                success, datetime.now().isoformat(),
+                latency_ms, error, slack_user_id
+            ))
+            updated = cursor.rowcount > 0
+            conn.commit()
+            conn.close()
+            return updated
             
-            cursor.execute('SELECT COUNT(*) FROM emails WHERE status = "completed"')
-            completed_emails = cursor.fetchone()[0]
+        except Exception as e:
+            print(f"❌ Slack配信結果記録エラー: {e}")
+            return False
+    
+    @timed_query
+    def get_pending_digests(self, mailboxes: List[str], per_mailbox_limit: int) -> Dict[str, Dict[str, Any]]:
+        """複数メールボックスの未対応ダイジェストをまとめて取得（シャードごとに2クエリ）
+
+        戻り値: {mailbox: {"emails": [...上位N件], "total": 件数, "priority_stats": {...}}}
+        """
+        digests: Dict[str, Dict[str, Any]] = {
+            mailbox: {"emails": [], "total": 0, "priority_stats": {}} for mailbox in mailboxes
+        }
+        if not mailboxes:
+            return digests
+        
+        try:
+            for shard_mailboxes in self._group_by_shard(mailboxes):
+                placeholders = ', '.join('?' for _ in shard_mailboxes)
+                with self._connect(shard_mailboxes[0]) as conn:
+                    cursor = conn.cursor()
+                    cursor.row_factory = sqlite3.Row
+                    
+                    # メールボックスごとの上位N件（ウィンドウ関数で1クエリ）
+                    cursor.execute(f'''
+                        SELECT id, subject, sender, category, priority, urgency_score, mailbox
+                        FROM (
+                            SELECT id, subject, sender, category, priority, urgency_score, mailbox,
+                                   ROW_NUMBER() OVER (
+                                       PARTITION BY mailbox
+                                       ORDER BY {priority_rank_sql()}, urgency_score DESC, processed_at DESC
+                                   ) AS rank_in_mailbox
+                            FROM emails
+                            WHERE status = 'pending' AND mailbox IN ({placeholders})
+                        )
+                        WHERE rank_in_mailbox <= ?
+                        ORDER BY mailbox, rank_in_mailbox
+                    ''', (*shard_mailboxes, per_mailbox_limit))
+                    for row in cursor.fetchall():
+                        digests[row['mailbox']]["emails"].append(dict(row))
+                    
+                    # メールボックス×優先度の件数
+                    cursor.execute(f'''
+                        SELECT mailbox, priority, COUNT(*) AS count
+                        FROM emails
+                        WHERE status = 'pending' AND mailbox IN ({placeholders})
+                        GROUP BY mailbox, priority
+                    ''', shard_mailboxes)
+                    for row in cursor.fetchall():
+                        digest = digests[row['mailbox']]
+                        digest["priority_stats"][row['priority']] = row['count']
+                        digest["total"] += row['count']
             
-            cursor.execute('SELECT COUNT(*) FROM emails WHERE status = "deleted"')
-            deleted_emails = cursor.fetchone()[0]
+            return digests
             
-            cursor.execute('SELECT COUNT(*) FROM emails')
-            total_emails = cursor.fetchone()[0]
+        except Exception as e:
+            print(f"❌ ダイジェスト取得エラー: {e}")
+            return digests
+
+    @timed_query
+    def get_pending_digest(self, limit: int = TODO_MAX_ITEMS, mailbox: Optional[str] = None) -> Dict[str, Any]:
+        """TODOダイジェスト用の未対応メール上位N件と件数集計（本文は読まない）
+
+        戻り値: {"emails": [...優先度順の上位N件], "total": 件数,
+                 "priority_stats": {...}, "category_stats": {...}}
+        """
+        digest: Dict[str, Any] = {"emails": [], "total": 0, "priority_stats": {}, "category_stats": {}}
+        targets = self._targets(mailbox)
+
+        try:
+            for target in targets:
+                where = "status = 'pending'"
+                params: List[Any] = []
+                if target is not None:
+                    where += " AND mailbox = ?"
+                    params.append(target)
+
+                with self._connect(target) as conn:
+                    cursor = conn.cursor()
+                    cursor.row_factory = sqlite3.Row
+
+                    cursor.execute(f'''
+                        SELECT id, subject, sender, category, priority, urgency_score,
+                               {priority_rank_sql()} AS _sort_rank, processed_at AS _sort_processed
+                        FROM emails
+                        WHERE {where}
+                        ORDER BY _sort_rank, urgency_score DESC, processed_at DESC
+                        LIMIT ?
+                    ''', (*params, limit))
+                    digest["emails"].extend(dict(row) for row in cursor.fetchall())
+
+                    # 優先度×カテゴリの件数（グループ数は高々 優先度数×カテゴリ数）
+                    cursor.execute(f'''
+                        SELECT priority, category, COUNT(*) AS count
+                        FROM emails
+                        WHERE {where}
+                        GROUP BY priority, category
+                    ''', params)
+                    for row in cursor.fetchall():
+                        digest["total"] += row['count']
+                        digest["priority_stats"][row['priority']] = digest["priority_stats"].get(row['priority'], 0) + row['count']
+                        digest["category_stats"][row['category']] = digest["category_stats"].get(row['category'], 0) + row['count']
+
+            if len(targets) > 1:
+                # 優先度順 → 緊急度の高い順 → 新しい順（安定ソートを2回）
+                digest["emails"].sort(key=lambda email: str(email['_sort_processed'] or ''), reverse=True)
+                digest["emails"].sort(key=lambda email: (email['_sort_rank'], -(email['urgency_score'] or 0)))
+                del digest["emails"][limit:]
+            digest["emails"] = [strip_sort_columns(email) for email in digest["emails"]]
+            return digest
+
+        except Exception as e:
+            print(f"❌ ダイジェスト取得エラー: {e}")
+            return digest
+
+    @timed_query
+    def get_existing_statuses(self, email_ids: List[str], mailbox: Optional[str] = None) -> Dict[str, str]:
+        """保存済みメールのステータス（取り込み前の振り分け用、SQLITE_IN_CHUNK_SIZE 件ずつ引く）"""
+        if not email_ids:
+            return {}
+        ids = list(dict.fromkeys(email_ids))
+        try:
+            statuses: Dict[str, str] = {}
+            for target in self._targets(mailbox):
+                scope = ' AND mailbox = ?' if target else ''
+                scope_params = [target] if target else []
+                with self._connect(target) as conn:
+                    # 古いSQLiteのバインド変数上限（999）に収まるよう分けて引く
+                    for start in range(0, len(ids), SQLITE_IN_CHUNK_SIZE):
+                        chunk = ids[start:start + SQLITE_IN_CHUNK_SIZE]
+                        placeholders = ', '.join('?' for _ in chunk)
+                        # アーカイブ済みのものも「保存済み」として扱う（本体に残っている方を優先）
+                        for table in ('emails_archive', 'emails'):
+                            statuses.update(conn.execute(
+                                f'SELECT id, status FROM {table} WHERE id IN ({placeholders}){scope}',
+                                (*chunk, *scope_params)
+                            ).fetchall())
+            return statuses
+
+        except Exception as e:
+            print(f"❌ 既存メール確認エラー: {e}")
+            return {}
+
+    @timed_query
+    def archive_emails(self, older_than_days: int = RETENTION_DAYS, batch_size: int = RETENTION_BATCH_SIZE,
+                       mailbox: Optional[str] = None) -> Dict[str, int]:
+        """完了・削除から older_than_days 日を過ぎたメールを同じDBファイルの emails_archive へ移す
+
+        シャードごとに batch_size 件ずつ別トランザクションで移し、その間もUIの読み書きを通す。
+        """
+        # 完了・削除日時（isoformat の 'T' 区切り）と取り込み日時（' ' 区切り）が混在するので datetime() で揃えて比べる
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+        columns = ', '.join(ARCHIVED_EMAIL_FIELDS)
+        statuses = ', '.join('?' for _ in ARCHIVABLE_STATUSES)
+        archived: Counter = Counter()
+        try:
+            for target in self._targets(mailbox):
+                scope = ' AND mailbox = ?' if target else ''
+                scope_params = (target,) if target else ()
+                while True:
+                    with self._connect(target) as conn:
+                        cursor = conn.cursor()
+                        cursor.row_factory = sqlite3.Row
+                        cursor.execute(f'''
+                            SELECT {columns} FROM emails
+                            WHERE status IN ({statuses})
+                              AND datetime(COALESCE(deleted_at, completed_at, processed_at)) < datetime(?){scope}
+                            LIMIT ?
+                        ''', (*ARCHIVABLE_STATUSES, cutoff, *scope_params, batch_size))
+                        rows = [email_row(row) for row in cursor.fetchall()]
+                        if rows:
+                            cursor.executemany('''
+                                INSERT OR REPLACE INTO emails_archive (id, mailbox, status, completed_at, payload)
+                                VALUES (?, ?, ?, ?, ?)
+                            ''', [(row['id'], row['mailbox'], row['status'], row['completed_at'], compress_email(row))
+                                  for row in rows])
+                            cursor.executemany('DELETE FROM emails WHERE id = ?', [(row['id'],) for row in rows])
+                            conn.commit()
+                    archived.update(row['mailbox'] for row in rows)
+                    publish_archived(rows)
+                    if len(rows) < batch_size:
+                        break
+            return dict(archived)
             
-            # カテゴリ別統計
-            cursor.execute('''
-                SELECT category, COUNT(*) 
-                FROM emails WHERE status = 'pending'
-                GROUP BY category
-            ''')
-            category_stats = dict(cursor.fetchall())
+        except Exception as e:
+            print(f"❌ メールアーカイブエラー: {e}")
+            return dict(archived)
+    
+    @timed_query
+    def get_archived_email(self, email_id: str, fields: Optional[List[str]] = None,
+                           mailbox: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """アーカイブ済みメール1件（展開して返す）"""
+        try:
+            for target in self._targets(mailbox):
+                scope = ' AND mailbox = ?' if target else ''
+                with self._connect(target) as conn:
+                    row = conn.execute(f'SELECT payload, archived_at FROM emails_archive WHERE id = ?{scope}',
+                                       (email_id, *([target] if target else []))).fetchone()
+                if row:
+                    return decompress_email(row[0], row[1], fields)
+            return None
             
-            # 優先度別統計
+        except Exception as e:
+            print(f"❌ アーカイブ済みメール取得エラー: {e}")
+            return None
+    
+    def compact(self) -> Dict[str, Dict[str, Any]]:
+        """DBファイルごとに空き領域をOSへ返し、PRAGMA optimize で統計を更新する
+
+        auto_vacuum=INCREMENTAL でないファイル（切り替え前に作ったDB）は初回だけ VACUUM で作り直す。
+        以降は incremental_vacuum で空きページだけを返すので、ファイル全体を書き直さない。
+        """
+        results = {}
+        for mailboxes in self._group_by_shard(self.shard_mailboxes()):
+            path = self.shard_path(mailboxes[0])
+            try:
+                bytes_before = os.path.getsize(path)
+                with self._connect(mailboxes[0]) as conn:
+                    freed_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                        conn.execute('VACUUM')
+                        mode = 'vacuum'
+                    else:
+                        # execute() では1ステップ（1ページ）しか進まないので executescript で最後まで実行する
+                        conn.executescript('PRAGMA incremental_vacuum;')
+                        mode = 'incremental_vacuum'
+                    conn.execute('PRAGMA optimize')
+                    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                results[path] = {
+                    'mode': mode,
+                    'freed_pages': freed_pages,
+                    'bytes_before': bytes_before,
+                    'bytes_after': os.path.getsize(path)
+                }
+            except Exception as e:
+                print(f"❌ DB圧縮エラー ({path}): {e}")
+                results[path] = {'mode': 'error', 'error': str(e)}
+        return results
+
+    @timed_query
+    def save_processing_run(self, record: Dict[str, Any]) -> Optional[int]:
+        """実行履歴を保存（RunTrace.to_record() の形）"""
+        columns = list(record)
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(
+                f"INSERT INTO processing_history ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                [record[column] for column in columns]
+            )
+            run_id = cursor.lastrowid
+            conn.commit()
+            conn.close()
+            return run_id
+
+        except Exception as e:
+            print(f"❌ 実行履歴保存エラー: {e}")
+            return None
+
+    @timed_query
+    def get_processing_runs(self, limit: int = 30, mailbox: Optional[str] = None) -> List[Dict[str, Any]]:
+        """直近の実行履歴（新しい順、スパンは含まない）"""
+        where = 'WHERE mailbox = ?' if mailbox else ''
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {', '.join(HISTORY_LIST_FIELDS)} FROM processing_history
+                {where}
+                ORDER BY execution_time DESC, id DESC
+                LIMIT ?
+            ''', (*([mailbox] if mailbox else []), limit))
+            runs = [history_row(row) for row in cursor.fetchall()]
+            conn.close()
+            return runs
+
+        except Exception as e:
+            print(f"❌ 実行履歴取得エラー: {e}")
+            return []
+
+    @timed_query
+    def get_processing_run(self, run_id: int, mailbox: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """実行履歴1件（エラー詳細・圧縮スパン込み）"""
+        scope = ' AND mailbox = ?' if mailbox else ''
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {', '.join(HISTORY_LIST_FIELDS)}, errors, spans FROM processing_history
+                WHERE id = ?{scope}
+            ''', (run_id, *([mailbox] if mailbox else [])))
+            row = cursor.fetchone()
+            conn.close()
+            return history_row(row) if row else None
+
+        except Exception as e:
+            print(f"❌ 実行履歴取得エラー: {e}")
+            return None
+
+    @timed_query
+    def upsert_tenant(self, tenant_id: str, display_name: str = '', token_file: Optional[str] = None,
+                      enabled: bool = True) -> bool:
+        """テナント（教授のメールボックス）の登録・更新"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
             cursor.execute('''
-                SELECT priority, COUNT(*) 
-                FROM emails WHERE status = 'pending'
-                GROUP BY priority
-            ''')
-            priority_stats = dict(cursor.fetchall())
-            
+                INSERT INTO tenants (tenant_id, display_name, token_file, enabled)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(tenant_id) DO UPDATE SET
+                    display_name = excluded.display_name,
+                    token_file = excluded.token_file,
+                    enabled = excluded.enabled
+            ''', (tenant_id, display_name, token_file, 1 if enabled else 0))
+            conn.commit()
             conn.close()
-            
-            return {
-                'pending_emails': pending_emails,
-                'completed_emails': completed_emails,
-                'deleted_emails': deleted_emails,
-                'total_emails': total_emails,
-                'category_stats': category_stats,
-                'priority_stats': priority_stats
-            }
-            
+            return True
+
         except Exception as e:
-            print(f"❌ 統計情報取得エラー: {e}")
-            return {}
\ No newline at end of file
+            print(f"❌ テナント登録エラー: {e}")
+            return False
+
+    @timed_query
+    def delete_tenant(self, tenant_id: str) -> bool:
+        """テナントの削除（メール・実行履歴は残す）"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM tenants WHERE tenant_id = ?', (tenant_id,))
+            deleted = cursor.rowcount > 0
+            conn.commit()
+            conn.close()
+            return deleted
+
+        except Exception as e:
+            print(f"❌ テナント削除エラー: {e}")
+            return False
+
+    @timed_query
+    def get_tenants(self, enabled_only: bool = False) -> List[Dict[str, Any]]:
+        """テナント一覧"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            where = 'WHERE enabled = 1' if enabled_only else ''
+            cursor.execute(f'SELECT * FROM tenants {where} ORDER BY tenant_id')
+            tenants = [dict(row) for row in cursor.fetchall()]
+            conn.close()
+            return tenants
+
+        except Exception as e:
+            print(f"❌ テナント取得エラー: {e}")
+            return []
@@ -0,0 +1,94 @@
+"""
+メールボックス（テナント）ごとのSQLiteファイルの接続キャッシュ
+
+開いた接続をLRUで上限数まで保持し、必要になったときに開き、追い出すときに閉じる。
+1つの接続を複数スレッドで共有するため、使っている間は接続ごとのロックを持つ
+（同じシャードへの書き込みはどのみちSQLiteが直列化する。別のシャード同士は競合しない）。
+"""
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator
+from utils.log import get_logger, log_fields
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+SHARD_CONNECTIONS_OPEN = metrics.gauge('profmail_db_shard_connections_open', '開いているシャード接続数')
+SHARD_CONNECTION_EVICTIONS = metrics.counter('profmail_db_shard_connection_evictions_total',
+                                             'LRUで閉じたシャード接続数')
+
+
+class _CachedConnection:
+    """キャッシュ内の接続1本（使用中はロックを持つ）"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.closed = False
+
+
+class ShardConnectionCache:
+    """シャードファイルのパス → 開いている接続 のLRUキャッシュ"""
+
+    def __init__(self, max_open: int):
+        self.max_open = max(1, max_open)
+        self._entries: 'OrderedDict[str, _CachedConnection]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, path: str) -> _CachedConnection:
+        """パスの接続を取り出す（なければ開き、上限を超えたら古いものを閉じる）"""
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                return entry
+            entry = _CachedConnection(sqlite3.connect(path, check_same_thread=False))
+            self._entries[path] = entry
+            while len(self._entries) > self.max_open:
+                evicted.append(self._entries.popitem(last=False))
+            SHARD_CONNECTIONS_OPEN.set(len(self._entries))
+        # 使用中の接続はロックが空くのを待ってから閉じる（キャッシュ全体のロックは持たない）
+        for evicted_path, evicted_entry in evicted:
+            self._close(evicted_entry)
+            SHARD_CONNECTION_EVICTIONS.inc()
+            logger.debug("🧹 シャード接続を閉じました", extra=log_fields(path=evicted_path))
+        return entry
+
+    @contextmanager
+    def connection(self, path: str) -> Iterator[sqlite3.Connection]:
+        """パスの接続を排他的に借りる（例外時はロールバック）"""
+        while True:
+            entry = self._entry(path)
+            entry.lock.acquire()
+            if not entry.closed:
+                break
+            # 取り出した直後に追い出された場合は開き直す
+            entry.lock.release()
+        try:
+            yield entry.conn
+        except BaseException:
+            entry.conn.rollback()
+            raise
+        finally:
+            entry.lock.release()
+
+    @staticmethod
+    def _close(entry: _CachedConnection):
+        with entry.lock:
+            entry.closed = True
+            entry.conn.close()
+
+    def close_all(self):
+        """全接続を閉じる"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            SHARD_CONNECTIONS_OPEN.set(0)
+        for entry in entries:
+            self._close(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,273 @@
+"""
+メール保存先のインターフェース
+
+EmailProcessor・Slack・APIルートなどの呼び出し側は EmailStorage のメソッドだけを使い、
+SQL や接続には触れない。既定は SQLite（models.database.ProfessorEmailDatabase）で、
+DATABASE_BACKEND=postgres なら PostgreSQL（models.postgres.PostgresEmailDatabase）を使う。
+"""
+import functools
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from config import (
+    DATABASE_BACKEND,
+    DATABASE_URL,
+    DEFAULT_MAILBOX,
+    RETENTION_BATCH_SIZE,
+    RETENTION_DAYS,
+    TODO_MAX_ITEMS
+)
+
+# API から選択可能なカラム（SELECT句に埋め込むためホワイトリストで管理、どのバックエンドでも共通）
+# body・reply_draft は圧縮して保存するので、一覧では本文の先頭を保存時に切り出した body_preview を読む
+EMAIL_FIELDS = (
+    'id', 'subject', 'sender', 'sender_email', 'date', 'body', 'body_preview', 'category',
+    'priority', 'urgency_score', 'gmail_link', 'reply_draft', 'reply_html',
+    'mailbox', 'status', 'completed_at', 'deleted_at', 'processed_at', 'created_at'
+)
+
+# fields 引数で指定できるカラム
+SELECTABLE_EMAIL_FIELDS = EMAIL_FIELDS
+
+# 一覧表示用の軽量カラム（本文・返信草案を含まない）
+EMAIL_LIST_FIELDS = (
+    'id', 'subject', 'sender', 'date', 'category', 'priority',
+    'urgency_score', 'gmail_link', 'status', 'completed_at', 'processed_at'
+)
+
+# カード表示用（本文は先頭のみ、返信草案は表示・コピーに使うので含める）
+EMAIL_CARD_FIELDS = EMAIL_LIST_FIELDS + ('body_preview', 'reply_draft', 'reply_html')
+
+
+class EmailStorage(ABC):
+    """メール・実行履歴・Slack配信・テナントの保存先
+
+    mailbox 引数を取るメソッドは、省略時（None）は全メールボックスが対象。
+    """
+
+    backend: str = ''
+
+    # --- メール ---
+
+    @abstractmethod
+    def save_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """メール情報を保存（既存メールのステータス保持）"""
+
+    @abstractmethod
+    def list_emails(self, status: Optional[str] = 'pending', category: Optional[str] = None,
+                    priority: Optional[str] = None, fields: Optional[List[str]] = None,
+                    limit: int = 50, offset: int = 0, mailbox: Optional[str] = None) -> List[Dict[str, Any]]:
+        """条件・カラム指定付きメール一覧取得（緊急度の高い順）"""
+
+    @abstractmethod
+    def count_emails(self, status: Optional[str] = 'pending', category: Optional[str] = None,
+                     priority: Optional[str] = None, mailbox: Optional[str] = None) -> int:
+        """条件に一致するメール件数"""
+
+    @abstractmethod
+    def iter_emails(self, status: Optional[str] = 'pending', category: Optional[str] = None,
+                    priority: Optional[str] = None, fields: Optional[List[str]] = None,
+                    limit: int = 0, chunk_size: int = 500,
+                    mailbox: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """メールを少しずつ読み出すジェネレータ（limit=0で全件、ストリーミング応答用）"""
+
+    @abstractmethod
+    def get_email(self, email_id: str, fields: Optional[List[str]] = None,
+                  mailbox: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """メール1件取得"""
+
+    @abstractmethod
+    def get_emails_by_ids(self, email_ids: List[str], fields: Optional[List[str]] = None,
+                          mailbox: Optional[str] = None) -> List[Dict[str, Any]]:
+        """指定したIDのメールをまとめて取得（email_ids の順、見つからないものは含めない）"""
+
+    @abstractmethod
+    def update_email_status(self, email_id: str, status: str, mailbox: Optional[str] = None) -> bool:
+        """メールステータス更新（completed なら完了日時も記録、削除済みの墓標は更新せず False）"""
+
+    @abstractmethod
+    def delete_email(self, email_id: str, mailbox: Optional[str] = None) -> bool:
+        """メール削除（status='deleted' の墓標を残し、Gmailから再取得しても取り込み直さない）"""
+
+    @abstractmethod
+    def bulk_update_status(self, status: str, email_ids: Optional[List[str]] = None,
+                           category: Optional[str] = None, priority: Optional[str] = None,
+                           older_than_days: Optional[int] = None, from_statuses: Sequence[str] = ('pending',),
+                           mailbox: Optional[str] = None) -> List[str]:
+        """ID リストまたは条件に合うメールのステータスを1トランザクションでまとめて変更
+
+        現在のステータスが from_statuses のメールだけを変え、変えたメールのIDを返す。
+        older_than_days は取り込んだ日時（created_at）から数える。
+        """
+
+    @abstractmethod
+    def get_statistics(self, mailbox: Optional[str] = None) -> Dict[str, Any]:
+        """ステータス別・カテゴリ別・優先度別の件数"""
+
+    @abstractmethod
+    def get_mailbox_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """管理用: メールボックスごとの統計"""
+
+    @abstractmethod
+    def get_pending_digests(self, mailboxes: List[str], per_mailbox_limit: int) -> Dict[str, Dict[str, Any]]:
+        """複数メールボックスの未対応ダイジェスト"""
+
+    @abstractmethod
+    def get_pending_digest(self, limit: int = TODO_MAX_ITEMS, mailbox: Optional[str] = None) -> Dict[str, Any]:
+        """TODOダイジェスト用の未対応メール上位N件と件数集計"""
+
+    @abstractmethod
+    def get_existing_statuses(self, email_ids: List[str], mailbox: Optional[str] = None) -> Dict[str, str]:
+        """保存済みメールのステータス（取り込み前の振り分け用）"""
+
+    @abstractmethod
+    def get_email_debug_info(self, mailbox: Optional[str] = None) -> Dict[str, Any]:
+        """デバッグ用: ステータス分布・最近の処理・完了済み・重複IDの状況"""
+
+    @abstractmethod
+    def describe_storage(self, mailbox: Optional[str] = None) -> Dict[str, Any]:
+        """デバッグ用: 保存先・emailsテーブルの構造・サンプル1行"""
+
+    # --- 保持期間・アーカイブ ---
+
+    @abstractmethod
+    def archive_emails(self, older_than_days: int = RETENTION_DAYS, batch_size: int = RETENTION_BATCH_SIZE,
+                       mailbox: Optional[str] = None) -> Dict[str, int]:
+        """完了・削除から older_than_days 日を過ぎたメールを圧縮アーカイブへ移す（{メールボックス: 件数}）"""
+
+    @abstractmethod
+    def get_archived_email(self, email_id: str, fields: Optional[List[str]] = None,
+                           mailbox: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """アーカイブ済みメール1件（展開して返す）"""
+
+    @abstractmethod
+    def compact(self) -> Dict[str, Dict[str, Any]]:
+        """空き領域の回収と統計の更新（{保存先: 結果}）"""
+
+    def get_emails_by_priority(self, priority: str, status: str = 'pending', limit: int = 20,
+                               fields: Optional[List[str]] = None, mailbox: Optional[str] = None) -> List[Dict[str, Any]]:
+        """優先度別メール取得（既定はカード表示用カラムのみ）"""
+        return self.list_emails(status=status, priority=priority,
+                                fields=fields or list(EMAIL_CARD_FIELDS), limit=limit, mailbox=mailbox)
+
+    def get_emails_by_category(self, category: str = None, status: str = 'pending', limit: int = 20,
+                               fields: Optional[List[str]] = None, mailbox: Optional[str] = None) -> List[Dict[str, Any]]:
+        """カテゴリ別メール取得（既定はカード表示用カラムのみ）"""
+        return self.list_emails(status=status, category=category,
+                                fields=fields or list(EMAIL_CARD_FIELDS), limit=limit, mailbox=mailbox)
+
+    def for_mailbox(self, mailbox: str) -> 'MailboxDatabase':
+        """1メールボックスに絞ったビュー"""
+        return MailboxDatabase(self, mailbox)
+
+    # --- Slackアウトボックス ---
+
+    @abstractmethod
+    def enqueue_slack_message(self, payload: Dict[str, Any], error: Optional[str] = None) -> Optional[int]:
+        """Slackアウトボックスにメッセージ追加"""
+
+    @abstractmethod
+    def get_due_slack_messages(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """再送期限の来たSlackメッセージ取得"""
+
+    @abstractmethod
+    def mark_slack_message_sent(self, message_id: int) -> bool:
+        """Slackメッセージ送信済み"""
+
+    @abstractmethod
+    def mark_slack_message_failed(self, message_id: int, error: Optional[str],
+                                  next_attempt_at: datetime, dead: bool = False) -> bool:
+        """Slackメッセージ送信失敗（deadなら再送しない）"""
+
+    @abstractmethod
+    def get_slack_outbox_stats(self) -> Dict[str, int]:
+        """Slackアウトボックスのステータス別件数"""
+
+    # --- Slack DM配信先 ---
+
+    @abstractmethod
+    def upsert_slack_recipient(self, slack_user_id: str, display_name: str = '',
+                               mailbox: str = DEFAULT_MAILBOX, enabled: bool = True) -> bool:
+        """Slack DM配信先の登録・更新（他のメールボックスに登録済みの配信先は書き換えず False）"""
+
+    @abstractmethod
+    def delete_slack_recipient(self, slack_user_id: str, mailbox: Optional[str] = None) -> bool:
+        """Slack DM配信先の削除（mailbox 指定時はそのメールボックスの配信先のみ）"""
+
+    @abstractmethod
+    def get_slack_recipients(self, enabled_only: bool = False, mailbox: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Slack DM配信先一覧（配信実績付き、mailbox 指定時はそのメールボックスのみ）"""
+
+    @abstractmethod
+    def record_slack_delivery(self, slack_user_id: str, success: bool, latency_ms: float,
+                              error: Optional[str] = None) -> bool:
+        """Slack DM配信結果を記録"""
+
+    # --- 実行履歴 ---
+
+    @abstractmethod
+    def save_processing_run(self, record: Dict[str, Any]) -> Optional[int]:
+        """実行履歴を保存（RunTrace.to_record() の形）"""
+
+    @abstractmethod
+    def get_processing_runs(self, limit: int = 30, mailbox: Optional[str] = None) -> List[Dict[str, Any]]:
+        """直近の実行履歴（新しい順、スパンは含まない）"""
+
+    @abstractmethod
+    def get_processing_run(self, run_id: int, mailbox: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """実行履歴1件（エラー詳細・圧縮スパン込み）"""
+
+    # --- テナント ---
+
+    @abstractmethod
+    def upsert_tenant(self, tenant_id: str, display_name: str = '', token_file: Optional[str] = None,
+                      enabled: bool = True) -> bool:
+        """テナント（教授のメールボックス）の登録・更新"""
+
+    @abstractmethod
+    def delete_tenant(self, tenant_id: str) -> bool:
+        """テナントの削除（メール・実行履歴は残す）"""
+
+    @abstractmethod
+    def get_tenants(self, enabled_only: bool = False) -> List[Dict[str, Any]]:
+        """テナント一覧"""
+
+
+def get_storage() -> EmailStorage:
+    """設定（DATABASE_BACKEND）に応じた保存先（どちらもプロセスで1つ）"""
+    if DATABASE_BACKEND == 'postgres':
+        from models.postgres import PostgresEmailDatabase
+        return PostgresEmailDatabase(DATABASE_URL)
+    from models.database import ProfessorEmailDatabase
+    return ProfessorEmailDatabase()
+
+
+# メールボックス単位に絞り込むメソッド（mailbox 引数を自動で渡す）
+MAILBOX_SCOPED_METHODS = frozenset({
+    'get_emails_by_priority', 'get_emails_by_category', 'list_emails', 'count_emails', 'iter_emails',
+    'get_email', 'get_emails_by_ids', 'update_email_status', 'delete_email', 'bulk_update_status', 'get_statistics',
+    'get_pending_digest', 'get_existing_statuses', 'get_processing_runs', 'get_processing_run',
+    'get_email_debug_info', 'describe_storage', 'get_archived_email'
+})
+
+
+class MailboxDatabase:
+    """EmailStorage をテナント（メールボックス）単位で使うためのビュー
+
+    MAILBOX_SCOPED_METHODS は mailbox を固定して呼び、それ以外（Slack配信先・アウトボックス等の
+    プロセス共通のもの）はそのまま委譲する。
+    """
+
+    def __init__(self, db: EmailStorage, mailbox: str):
+        self.db = db
+        self.mailbox = mailbox
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db, name)
+        if name in MAILBOX_SCOPED_METHODS:
+            return functools.partial(attr, mailbox=self.mailbox)
+        return attr
+
+    def save_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """このメールボックスのメールとして保存"""
+        return self.db.save_email({**email_data, 'mailbox': self.mailbox})
@@ -2,8 +2,13 @@
 サービス関連のパッケージ
 """
 from .gmail_service import GmailService
+from .gmail_push import GmailPushIngestor
+from .gmail_writeback import GmailWriteback
 from .openai_service import OpenAIService
+from .slack_delivery import SlackDeliveryClient, SlackOutbox
 from .slack_service import SlackService
+from .tenants import TenantRegistry, current_tenant, tenant_context
 from .email_processor import EmailProcessor
 
-__all__ = ['GmailService', 'OpenAIService', 'SlackService', 'EmailProcessor']
\ No newline at end of file
+__all__ = ['GmailService', 'GmailPushIngestor', 'GmailWriteback', 'OpenAIService', 'SlackDeliveryClient', 'SlackOutbox', 'SlackService',
+           'TenantRegistry', 'current_tenant', 'tenant_context', 'EmailProcessor']
\ No newline at end of file
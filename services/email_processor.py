@@ -4,62 +4,142 @@
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from apscheduler.schedulers.background import BackgroundScheduler
-from models.database import ProfessorEmailDatabase
+from models.storage import EmailStorage, MailboxDatabase, get_storage
 from services.gmail_service import GmailService
+from services.gmail_push import GmailPushIngestor
+from services.gmail_writeback import GmailWriteback
 from services.openai_service import OpenAIService
 from services.slack_service import SlackService
-from config import SCHEDULER_HOUR, SCHEDULER_MINUTE, DEFAULT_DAYS_BACK
+from services.retention import run_retention
+from services.run_trace import RunTrace
+from services.tenants import TenantRegistry, current_tenant
+from utils.log import get_logger, log_fields, sampled
+from utils.metrics import metrics
+from config import (
+    DEFAULT_DAYS_BACK,
+    DEFAULT_MAILBOX,
+    GMAIL_PUSH_ENABLED,
+    GMAIL_PUSH_TOPIC,
+    GMAIL_WATCH_RENEW_HOURS,
+    GMAIL_WRITEBACK_ENABLED,
+    GMAIL_WRITEBACK_INTERVAL_SECONDS,
+    MAX_EMAILS_PER_FETCH,
+    RETENTION_HOUR,
+    RETENTION_MINUTE,
+    SLACK_OUTBOX_RETRY_INTERVAL_SECONDS
+)
+
+logger = get_logger(__name__)
+
+STAGE_SECONDS = metrics.histogram('profmail_pipeline_stage_seconds', 'メール処理の段階ごとの処理時間（秒）', ['stage'])
+PIPELINE_EMAILS = metrics.counter('profmail_pipeline_emails_total', 'メール処理の結果別件数', ['result'])
+LAST_RUN_TIMESTAMP = metrics.gauge('profmail_pipeline_last_run_timestamp_seconds', '最後に日次処理が完了した時刻（UNIX秒）')
+
+# テナントごとの定期実行ジョブID（daily_email_processing:{tenant_id}）
+TENANT_JOB_PREFIX = 'daily_email_processing:'
 
 
 class EmailProcessor:
     _instance: Optional['EmailProcessor'] = None
     _initialized = False
     
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         """シングルトンパターン実装"""
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def __init__(self):
-        """メール処理サービス初期化（1回だけ実行）"""
+    def __init__(self, db: Optional[EmailStorage] = None, gmail_service: Optional[GmailService] = None,
+                 openai_service: Optional[OpenAIService] = None, slack_service: Optional[SlackService] = None,
+                 start_scheduler: bool = True):
+        """メール処理サービス初期化（1回だけ実行）
+
+        各サービスは差し替え可能（オフラインのベンチマークでは偽実装を渡し、スケジューラーも止める）。
+        """
         if EmailProcessor._initialized:
             return
         
-        self.db = ProfessorEmailDatabase()
-        self.gmail_service = GmailService()
-        self.openai_service = OpenAIService()
-        self.slack_service = SlackService()  # Slack通知サービス追加
+        self.db = db or get_storage()
+        self.gmail_service = gmail_service or GmailService()
+        self.openai_service = openai_service or OpenAIService()
+        self.slack_service = slack_service or SlackService()  # Slack通知サービス追加
+        self.tenants = TenantRegistry(self.db, default_gmail=self.gmail_service)
+        # 完了したメールを Gmail 側でもアーカイブ（無効なら None）
+        self.gmail_writeback = GmailWriteback(self.tenants) if GMAIL_WRITEBACK_ENABLED else None
+        # Gmailのプッシュ通知で新着をすぐ取り込む（無効なら None）
+        self.gmail_push = GmailPushIngestor(self.tenants, self.run_push_processing) if GMAIL_PUSH_ENABLED else None
         self.scheduler = None
         self.last_execution = None
         self.last_tasks = []  # 最新タスクリスト
-        self.setup_scheduler()
+        if start_scheduler:
+            self.setup_scheduler()
         
         EmailProcessor._initialized = True
     
-    def process_emails(self, days: int = DEFAULT_DAYS_BACK) -> List[Dict[str, Any]]:
-        """メール処理・分析・分類"""
-        print(f"🔄 教授メール処理開始（直近{days}日間）...")
+    def process_emails(self, days: int = DEFAULT_DAYS_BACK, trace: Optional[RunTrace] = None,
+                       max_emails: int = MAX_EMAILS_PER_FETCH, mailbox: Optional[str] = None,
+                       email_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """メール処理・分析・分類（trace を渡すと段階別の時間・スパンを記録）
+
+        mailbox: 処理するテナント（省略時は trace のもの、なければ処理中のテナント）
+        email_ids: 取り込むメールのID（プッシュ通知の差分取り込み用、省略時は直近days日間を検索）
+        """
+        mailbox = mailbox or (trace.mailbox if trace else current_tenant())
+        trace = trace or RunTrace('adhoc', mailbox)
+        db = self.db.for_mailbox(mailbox)
+        scope = f"新着{len(email_ids)}件" if email_ids is not None else f"直近{days}日間"
+        logger.info(f"🔄 教授メール処理開始（{scope}）", extra=log_fields(mailbox=mailbox))
+        trace.report_progress('fetch')
         
-        emails = self.gmail_service.get_recent_emails(days=days)
+        with STAGE_SECONDS.time(stage='fetch'), trace.phase('fetch'):
+            gmail = self.tenants.gmail(mailbox)
+            if email_ids is not None:
+                emails = gmail.get_emails(email_ids)
+            else:
+                emails = gmail.get_recent_emails(days=days, max_emails=max_emails)
+        PIPELINE_EMAILS.inc(len(emails), result='fetched')
+        trace.counts['fetched'] = len(emails)
         
         if not emails:
-            print("📭 新着メールなし")
+            logger.info("📭 新着メールなし")
             return []
         
+        # 既に保存済みのメールを1クエリで確認（新規/更新の区別と完了ステータスの保持に使う）
+        with STAGE_SECONDS.time(stage='prefilter'), trace.phase('prefilter'):
+            existing_statuses = db.get_existing_statuses([email['id'] for email in emails])
+        
+        # 削除済み（墓標）のメールはAI分析の前に除外（再取得しても復活させず、トークンも使わない）
+        tombstoned = [email for email in emails if existing_statuses.get(email['id']) == 'deleted']
+        if tombstoned:
+            emails = [email for email in emails if existing_statuses.get(email['id']) != 'deleted']
+            PIPELINE_EMAILS.inc(len(tombstoned), result='tombstoned')
+            logger.info(f"🪦 削除済みメールをスキップ: {len(tombstoned)}件", extra=log_fields(tombstoned=len(tombstoned)))
+        
+        # 完了済みなのに受信トレイに残っているメール（書き戻し前の完了・書き戻し失敗）をもう一度キューへ
+        self.queue_gmail_writeback(
+            [email['id'] for email in emails if existing_statuses.get(email['id']) == 'completed'], mailbox
+        )
+        
         processed_emails = []
         categorized_count = 0
-        skipped_count = 0
+        skipped_count = len(tombstoned)
+        trace.report_progress('analyze', done=0, total=len(emails))
         
-        for email in emails:
+        for done, email in enumerate(emails, 1):
             # AI分析・分類・返信草案生成
-            analysis = self.openai_service.categorize_and_analyze_email(
-                email['body'], 
-                email['subject'], 
-                email['sender']
-            )
+            with STAGE_SECONDS.time(stage='analyze'), trace.span(email['id'], 'analyze') as span:
+                analysis = self.openai_service.categorize_and_analyze_email(
+                    email['body'], 
+                    email['subject'], 
+                    email['sender']
+                )
+                span['prompt_tokens'], span['completion_tokens'] = self.openai_service.pop_last_usage()
+                span['outcome'] = 'actionable' if analysis and analysis.get('is_actionable', True) else 'skipped'
+            PIPELINE_EMAILS.inc(result='analyzed')
+            trace.counts['analyzed'] += 1
             
             if analysis and analysis.get('is_actionable', True):
+                existing_status = existing_statuses.get(email['id'])
                 email_record = {
                     'id': email['id'],
                     'subject': email['subject'],
@@ -71,76 +151,116 @@ class EmailProcessor:
                     'priority': analysis.get('priority', '中'),
                     'urgency_score': analysis.get('urgency_score', 5),
                     'reply_draft': analysis.get('reply_draft', ''),
-                    'summary': analysis.get('summary', '')
+                    'summary': analysis.get('summary', ''),
+                    'mailbox': mailbox,
+                    'db_action': 'updated' if existing_status else 'new',
+                    'preserved_status': existing_status
                 }
                 
                 # DBに保存
-                if self.db.save_email(email_record):
+                with STAGE_SECONDS.time(stage='save'), trace.span(email['id'], 'save') as span:
+                    saved = db.save_email(email_record)
+                    span['outcome'] = saved.get('action', 'error')
+                if saved.get('success'):
                     processed_emails.append(email_record)
                     categorized_count += 1
-                    print(f"   ✅ {analysis.get('category')} - {email['subject'][:40]}...")
+                    PIPELINE_EMAILS.inc(result='saved')
+                    logger.debug("✅ 分類・保存", extra=sampled(
+                        email_id=email['id'], category=email_record['category'], priority=email_record['priority']
+                    ))
                 else:
-                    print(f"   ❌ DB保存失敗 - {email['subject'][:40]}...")
+                    PIPELINE_EMAILS.inc(result='save_failed')
+                    trace.record_error('save', saved.get('error', 'unknown'), email['id'])
+                    logger.warning("❌ DB保存失敗", extra=log_fields(email_id=email['id']))
             else:
                 skipped_count += 1
-                if analysis:
-                    print(f"   🗑️ スキップ({analysis.get('category', '不明')}) - {email['subject'][:40]}...")
-                else:
-                    print(f"   🗑️ 不要メール、スキップ - {email['subject'][:40]}...")
+                PIPELINE_EMAILS.inc(result='skipped')
+                logger.debug("🗑️ スキップ", extra=sampled(
+                    email_id=email['id'], category=analysis.get('category') if analysis else None
+                ))
+            trace.report_progress('analyze', done=done, total=len(emails))
         
-        print(f"✅ メール処理完了: {categorized_count}件を分類・保存, {skipped_count}件をスキップ")
+        trace.counts['saved'] = categorized_count
+        trace.counts['skipped'] = skipped_count
+        logger.info(f"✅ メール処理完了: {categorized_count}件を分類・保存, {skipped_count}件をスキップ",
+                    extra=log_fields(fetched=len(emails), saved=categorized_count, skipped=skipped_count))
         return processed_emails
     
-    def run_daily_processing(self) -> List[Dict[str, Any]]:
-        """日次メール処理実行 + Slack通知"""
-        print("🎓 教授メールアシスタント実行開始...")
+    def _save_run(self, trace: RunTrace, status: str):
+        """実行結果を processing_history に記録"""
+        trace.finish(status)
+        run_id = self.db.save_processing_run(trace.to_record())
+        logger.info(f"🧾 実行履歴を記録: {trace.duration_ms / 1000:.1f}秒", extra=log_fields(
+            run_id=run_id, trigger=trace.trigger, status=status,
+            **{f'{phase}_ms': round(ms) for phase, ms in trace.phase_ms.items()}
+        ))
+    
+    def run_daily_processing(self, mailbox: str = DEFAULT_MAILBOX) -> List[Dict[str, Any]]:
+        """日次メール処理実行 + Slack通知（テナントごとに定期実行される）"""
+        print(f"🎓 教授メールアシスタント実行開始... ({mailbox})")
+        trace = RunTrace('scheduled', mailbox)
         
         try:
-            # メール処理実行
-            processed_emails = self.process_emails(days=DEFAULT_DAYS_BACK)
-            
-            # 現在の未対応メール取得
-            pending_emails = self.db.get_emails_by_category(status='pending', limit=50)
-            
-            # Slack通知送信
-            if processed_emails or pending_emails:
-                self.slack_service.send_daily_todo(processed_emails, pending_emails)
-                print(f"📤 Slack通知送信: 新着{len(processed_emails)}件, 未対応{len(pending_emails)}件")
-            else:
-                print("📭 通知するメールがありません")
+            with STAGE_SECONDS.time(stage='total'):
+                # メール処理実行
+                processed_emails = self.process_emails(days=DEFAULT_DAYS_BACK, trace=trace)
+                
+                with STAGE_SECONDS.time(stage='notify'), trace.phase('notify'):
+                    # 未対応メールのダイジェスト（上位N件と件数集計のみ）
+                    digest = self.db.get_pending_digest(mailbox=mailbox)
+                    
+                    # チャンネルへのTODO通知は既定メールボックスのみ（他のテナントは個別DMで受け取る）
+                    if mailbox == DEFAULT_MAILBOX:
+                        if processed_emails or digest['total']:
+                            # 送信はアウトボックス経由でバックグラウンド実行（Slackの遅延・障害で止めない）
+                            self.slack_service.send_daily_todo(processed_emails, digest, wait=False)
+                            print(f"📤 Slack通知キュー投入: 新着{len(processed_emails)}件, 未対応{digest['total']}件")
+                        else:
+                            print("📭 通知するメールがありません")
+                    
+                    # このメールボックスの配信先へ個別DM（バックグラウンドで一斉配信）
+                    self.slack_service.send_dm_digests(processed_emails, wait=False, mailboxes=[mailbox])
             
             self.last_execution = datetime.now()
+            LAST_RUN_TIMESTAMP.set(self.last_execution.timestamp())
             self.last_tasks = processed_emails  # 実行結果を保存
+            self._save_run(trace, 'success')
             
             print("🎉 教授メールアシスタント実行完了！")
             return processed_emails
             
         except Exception as e:
             print(f"❌ 実行エラー: {e}")
+            trace.record_error('run', str(e))
+            self._save_run(trace, 'error')
             self.last_tasks = []  # エラー時は空リスト
             return []
     
-    def run_manual_processing_with_notification(self, days: int = DEFAULT_DAYS_BACK) -> Dict[str, Any]:
-        """手動実行版（Web UI用）+ Slack通知（詳細統計付き）"""
+    def run_manual_processing_with_notification(self, days: int = DEFAULT_DAYS_BACK,
+                                                mailbox: Optional[str] = None) -> Dict[str, Any]:
+        """手動実行版（Web UI用）+ Slack通知（詳細統計付き、省略時は処理中のテナント）"""
+        trace = RunTrace('manual', mailbox or current_tenant())
         try:
             # メール処理実行
-            processed_emails = self.process_emails(days=days)
+            processed_emails = self.process_emails(days=days, trace=trace)
             
             # 統計計算
             new_emails = [e for e in processed_emails if e.get('db_action') == 'new']
             updated_emails = [e for e in processed_emails if e.get('db_action') == 'updated']
             completed_preserved = [e for e in updated_emails if e.get('preserved_status') == 'completed']
             
-            # 現在の未対応メール取得
-            pending_emails = self.db.get_emails_by_category(status='pending', limit=50)
-            
-            # Slack通知送信（新規メールのみを通知対象とする）
-            slack_sent = False
-            if new_emails or pending_emails:
-                slack_sent = self.slack_service.send_daily_todo(new_emails, pending_emails)
+            with trace.phase('notify'):
+                # 未対応メールのダイジェスト（上位N件と件数集計のみ）
+                digest = self.db.get_pending_digest(mailbox=trace.mailbox)
+                
+                # Slack通知送信（新規メールのみを通知対象とする）
+                slack_sent = False
+                if trace.mailbox == DEFAULT_MAILBOX and (new_emails or digest['total']):
+                    slack_sent = self.slack_service.send_daily_todo(new_emails, digest)
             
             self.last_execution = datetime.now()
             self.last_tasks = processed_emails
+            self._save_run(trace, 'success')
             
             return {
                 "success": True,
@@ -148,7 +268,7 @@ class EmailProcessor:
                 "new_emails_count": len(new_emails),
                 "updated_emails_count": len(updated_emails),
                 "completed_preserved_count": len(completed_preserved),
-                "pending_count": len(pending_emails),
+                "pending_count": digest['total'],
                 "slack_notification_sent": slack_sent,
                 "days_processed": days,
                 "categories": {category: len([e for e in new_emails if e.get('category') == category]) 
@@ -158,16 +278,37 @@ class EmailProcessor:
                     "completed_preserved": len(completed_preserved),
                     "message": f"完了済み{len(completed_preserved)}件のステータスを保持しました" if completed_preserved else "ステータス保持なし"
                 },
+                "phase_timings_ms": {phase: round(ms, 1) for phase, ms in trace.phase_ms.items()},
                 "timestamp": datetime.now().isoformat()
             }
             
         except Exception as e:
+            trace.record_error('run', str(e))
+            self._save_run(trace, 'error')
             return {
                 "success": False,
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
             }
     
+    def run_push_processing(self, mailbox: str, email_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """プッシュ通知による取り込み（email_ids が None なら直近分を検索、Slack通知は定時実行に任せる）"""
+        trace = RunTrace('push', mailbox)
+        try:
+            processed_emails = self.process_emails(days=DEFAULT_DAYS_BACK, trace=trace, email_ids=email_ids)
+            self.last_execution = datetime.now()
+            # 新着がなかった取り込みは実行履歴に残さない（既読・ラベル変更の通知でも呼ばれるため）
+            if trace.counts['fetched']:
+                self._save_run(trace, 'success')
+            else:
+                trace.finish('success')
+            return processed_emails
+        except Exception as e:
+            print(f"❌ プッシュ取り込みエラー: {e}")
+            trace.record_error('run', str(e))
+            self._save_run(trace, 'error')
+            return []
+    
     def setup_scheduler(self):
         """スケジューラー設定（重複防止）"""
         if self.scheduler is not None:
@@ -176,21 +317,100 @@ class EmailProcessor:
             
         self.scheduler = BackgroundScheduler()
         
-        # 毎日朝8時に実行（教授が出勤前）
+        # テナントごとに毎朝実行（教授が出勤前、テナント数に応じて時刻をずらす）
+        schedule = self.sync_tenant_schedule()
+        
+        # 送信に失敗したSlack通知の再送
         self.scheduler.add_job(
-            self.run_daily_processing,
+            self.slack_service.flush_outbox,
+            'interval',
+            seconds=SLACK_OUTBOX_RETRY_INTERVAL_SECONDS,
+            id='slack_outbox_retry',
+            max_instances=1,
+            coalesce=True
+        )
+        
+        # 完了したメールの Gmail への書き戻し（この間隔で batchModify にまとめる）
+        if self.gmail_writeback is not None:
+            self.scheduler.add_job(
+                self.gmail_writeback.flush,
+                'interval',
+                seconds=GMAIL_WRITEBACK_INTERVAL_SECONDS,
+                id='gmail_writeback',
+                max_instances=1,
+                coalesce=True
+            )
+        
+        # プッシュ通知の watch 登録（起動時に1回、7日で切れるので以降は定期的に更新）
+        if self.gmail_push is not None:
+            if GMAIL_PUSH_TOPIC:
+                self.scheduler.add_job(
+                    self.gmail_push.watch_all,
+                    'interval',
+                    hours=GMAIL_WATCH_RENEW_HOURS,
+                    next_run_time=datetime.now(),
+                    id='gmail_watch',
+                    max_instances=1,
+                    coalesce=True
+                )
+            else:
+                print("⚠️ PROFMAIL_GMAIL_PUSH_TOPIC が未設定のため Gmail watch を登録しません")
+        
+        # 古いメールのアーカイブとDBの圧縮（利用の少ない深夜）
+        self.scheduler.add_job(
+            self.run_retention,
             'cron',
-            hour=SCHEDULER_HOUR,
-            minute=SCHEDULER_MINUTE,
-            id='daily_email_processing'
+            hour=RETENTION_HOUR,
+            minute=RETENTION_MINUTE,
+            id='retention',
+            max_instances=1,
+            coalesce=True
         )
         
         try:
             self.scheduler.start()
-            print(f"⏰ スケジューラー開始: 毎日 {SCHEDULER_HOUR:02d}:{SCHEDULER_MINUTE:02d} に自動実行 (Slack通知付き)")
+            times = sorted(f"{hour:02d}:{minute:02d}" for hour, minute in schedule.values())
+            print(f"⏰ スケジューラー開始: {len(schedule)}テナントを毎日 {times[0]}〜{times[-1]} に自動実行 (Slack通知付き)")
         except Exception as e:
             print(f"⚠️ スケジューラー開始エラー: {e}")
     
+    def run_retention(self, **kwargs) -> Dict[str, Any]:
+        """保持期間を過ぎたメールのアーカイブとDB圧縮（全メールボックス）"""
+        try:
+            return run_retention(self.db, **kwargs)
+        except Exception as e:
+            print(f"❌ 保持期間処理エラー: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def queue_gmail_writeback(self, email_ids: List[str], mailbox: Optional[str] = None) -> int:
+        """完了したメールを Gmail への書き戻し待ちに追加（書き戻しが無効なら何もしない）"""
+        if self.gmail_writeback is None or not email_ids:
+            return 0
+        return self.gmail_writeback.enqueue(mailbox or current_tenant(), email_ids)
+    
+    def sync_tenant_schedule(self) -> Dict[str, tuple]:
+        """テナントの追加・削除を定期実行ジョブに反映（{tenant_id: (時, 分)} を返す）"""
+        schedule = self.tenants.schedule()
+        if self.scheduler is None:
+            return schedule
+        
+        for job in self.scheduler.get_jobs():
+            if job.id.startswith(TENANT_JOB_PREFIX) and job.id[len(TENANT_JOB_PREFIX):] not in schedule:
+                job.remove()
+        for tenant_id, (hour, minute) in schedule.items():
+            self.scheduler.add_job(
+                self.run_daily_processing,
+                'cron',
+                hour=hour,
+                minute=minute,
+                kwargs={'mailbox': tenant_id},
+                id=f'{TENANT_JOB_PREFIX}{tenant_id}',
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+        return schedule
+    
     def send_test_slack_notification(self) -> bool:
         """テスト用Slack通知"""
         return self.slack_service.send_test_message()
@@ -199,9 +419,9 @@ class EmailProcessor:
         """Slack設定デバッグ情報取得"""
         return self.slack_service.get_debug_info()
     
-    def get_database(self) -> ProfessorEmailDatabase:
-        """データベースインスタンス取得"""
-        return self.db
+    def get_database(self) -> MailboxDatabase:
+        """処理中のテナント（メールボックス）に絞ったデータベース"""
+        return self.db.for_mailbox(current_tenant())
     # services/email_processor.py の最後に追加（get_database関数の下）
 
     def get_openai_service(self) -> OpenAIService:
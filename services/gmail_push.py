@@ -0,0 +1,208 @@
+"""
+Gmail のプッシュ通知による差分取り込み（任意、PROFMAIL_GMAIL_PUSH=true）
+
+users.watch で受信トレイの変更を Cloud Pub/Sub のトピックへ通知させ、push サブスクリプションから
+POST /api/v1/gmail/push に届いた通知で、そのメールボックスだけを取り込む。
+
+- 通知は {"emailAddress": ..., "historyId": ...} を base64 で包んだ Pub/Sub メッセージ。
+  emailAddress からテナントを引き（TenantRegistry.mailbox_for_address）、メールボックスごとにまとめる
+- 続けて届いた通知は GMAIL_PUSH_DEBOUNCE_SECONDS 待ってから1回の取り込みにする
+  （通知が続いても最初の通知から GMAIL_PUSH_MAX_DELAY_SECONDS 以内には取り込む）
+- 取り込みは前回の履歴ID以降の history.list（messageAdded）で新着のIDだけを取得し、
+  その分だけ messages.get・AI分析する。履歴IDがない（起動直後）・古すぎる場合は直近分の全件取得に戻る
+
+履歴IDはメモリ上だけに持つ。再起動後の最初の通知は全件取得になり、定時実行はそのまま残る。
+"""
+import base64
+import hmac
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from utils.log import get_logger, log_fields
+from utils.metrics import metrics
+from config import GMAIL_PUSH_DEBOUNCE_SECONDS, GMAIL_PUSH_MAX_DELAY_SECONDS, GMAIL_PUSH_TOKEN, GMAIL_PUSH_TOPIC
+
+logger = get_logger(__name__)
+
+GMAIL_PUSH_NOTIFICATIONS = metrics.counter(
+    'profmail_gmail_push_notifications_total', 'Gmailのプッシュ通知の受信数（結果別）', ['result']
+)
+GMAIL_PUSH_SYNCS = metrics.counter('profmail_gmail_push_syncs_total', 'プッシュ通知による取り込み回数（方式別）', ['mode'])
+GMAIL_PUSH_LAG = metrics.histogram(
+    'profmail_gmail_push_lag_seconds', 'Pub/Subへの通知から取り込み完了までの秒数',
+    buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+
+
+def _publish_timestamp(value: Any) -> Optional[float]:
+    """Pub/Sub の publishTime（例: 2024-01-01T00:00:00.123456789Z）をUNIX秒に"""
+    try:
+        seconds, _, fraction = value.rstrip('Z').partition('.')
+        timestamp = datetime.strptime(seconds, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc).timestamp()
+        return timestamp + float(f'0.{fraction}') if fraction else timestamp
+    except (AttributeError, ValueError):
+        return None
+
+
+def decode_push_message(envelope: Dict[str, Any]) -> Dict[str, Any]:
+    """Pub/Sub の push リクエスト本文から Gmail の通知を取り出す
+
+    {'email_address', 'history_id', 'published_at'（UNIX秒、なければ None）} を返す。形式が違えば ValueError。
+    """
+    message = envelope.get('message') if isinstance(envelope, dict) else None
+    if not isinstance(message, dict) or not message.get('data'):
+        raise ValueError("message.data がありません")
+    try:
+        data = json.loads(base64.b64decode(message['data']).decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("message.data を解釈できません")
+    if not isinstance(data, dict) or not data.get('emailAddress') or not data.get('historyId'):
+        raise ValueError("emailAddress と historyId が必要です")
+    return {
+        'email_address': data['emailAddress'],
+        'history_id': str(data['historyId']),
+        'published_at': _publish_timestamp(message.get('publishTime'))
+    }
+
+
+class GmailPushIngestor:
+    """プッシュ通知を受けてメールボックスごとに差分取り込みを予約・実行する"""
+
+    def __init__(self, tenants, process: Callable[[str, Optional[List[str]]], Any],
+                 debounce_seconds: float = GMAIL_PUSH_DEBOUNCE_SECONDS,
+                 max_delay_seconds: float = GMAIL_PUSH_MAX_DELAY_SECONDS, token: str = GMAIL_PUSH_TOKEN):
+        """tenants: TenantRegistry、process: (mailbox, email_ids) で取り込む関数（email_ids が None なら全件取得）"""
+        self.tenants = tenants
+        self.process = process
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.token = token
+        self._cursors: Dict[str, str] = {}  # メールボックス → 取り込み済みの履歴ID
+        # メールボックス → 取り込み待ち {'first': 最初の通知(monotonic), 'history_id', 'published_at', 'timer'}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._sync_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def handle(self, envelope: Dict[str, Any], token: str = '') -> Optional[str]:
+        """push リクエストを受け付けて取り込みを予約（予約したメールボックスを返す、宛先不明なら None）
+
+        トークンが違えば PermissionError、本文の形式が違えば ValueError。
+        """
+        if self.token and not hmac.compare_digest(token or '', self.token):
+            GMAIL_PUSH_NOTIFICATIONS.inc(result='unauthorized')
+            raise PermissionError("トークンが一致しません")
+        try:
+            notification = decode_push_message(envelope)
+        except ValueError:
+            GMAIL_PUSH_NOTIFICATIONS.inc(result='invalid')
+            raise
+
+        mailbox = self.tenants.mailbox_for_address(notification['email_address'])
+        if mailbox is None:
+            # 削除したテナントの watch が残っている場合など（再送させないよう受け付けだけ返す）
+            GMAIL_PUSH_NOTIFICATIONS.inc(result='unknown_mailbox')
+            logger.warning("⚠️ 宛先不明のプッシュ通知", extra=log_fields(history_id=notification['history_id']))
+            return None
+
+        GMAIL_PUSH_NOTIFICATIONS.inc(result='accepted')
+        self.notify(mailbox, notification['history_id'], notification['published_at'])
+        return mailbox
+
+    def notify(self, mailbox: str, history_id: Optional[str] = None, published_at: Optional[float] = None):
+        """取り込みを予約（待ち時間内に次の通知が来たら予約し直す）"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._pending.get(mailbox)
+            if state is None:
+                state = self._pending[mailbox] = {'first': now, 'history_id': None, 'published_at': None, 'timer': None}
+            elif state['timer'] is not None:
+                state['timer'].cancel()
+            if history_id and (state['history_id'] is None or int(history_id) > int(state['history_id'])):
+                state['history_id'] = history_id
+            if published_at is not None and (state['published_at'] is None or published_at < state['published_at']):
+                state['published_at'] = published_at
+
+            delay = min(self.debounce_seconds, max(0.0, state['first'] + self.max_delay_seconds - now))
+            timer = threading.Timer(delay, self._fire, args=(mailbox,))
+            timer.name = f'gmail-push-{mailbox}'
+            timer.daemon = True
+            state['timer'] = timer
+            timer.start()
+
+    def pending(self) -> List[str]:
+        """取り込み待ちのメールボックス"""
+        with self._lock:
+            return sorted(self._pending)
+
+    def _fire(self, mailbox: str):
+        with self._lock:
+            state = self._pending.pop(mailbox, None)
+        if state is None:
+            return  # 予約し直された古いタイマー
+        try:
+            self.sync(mailbox, state['history_id'], state['published_at'])
+        except Exception as e:
+            logger.error("❌ プッシュ取り込みエラー", extra=log_fields(mailbox=mailbox, error=str(e)))
+
+    def sync(self, mailbox: str, history_id: Optional[str] = None, published_at: Optional[float] = None) -> int:
+        """前回の履歴ID以降の新着を取り込む（同じメールボックスは1つずつ、取り込んだメール数を返す）
+
+        history_id: 通知時点の履歴ID（全件取得したときの次回の起点）
+        """
+        with self._lock:
+            sync_lock = self._sync_locks.setdefault(mailbox, threading.Lock())
+
+        with sync_lock:
+            with self._lock:
+                cursor = self._cursors.get(mailbox)
+
+            email_ids = None
+            next_cursor = history_id
+            if cursor is not None:
+                try:
+                    email_ids, next_cursor = self.tenants.gmail(mailbox).get_added_message_ids(cursor)
+                except Exception as e:
+                    # 履歴IDが古すぎる（404）など。直近分の全件取得で取りこぼしを防ぐ
+                    logger.warning("⚠️ 履歴の取得に失敗、全件取得に切り替え", extra=log_fields(
+                        mailbox=mailbox, history_id=cursor, error=str(e)
+                    ))
+                    next_cursor = history_id
+
+            if email_ids is None:
+                GMAIL_PUSH_SYNCS.inc(mode='full')
+                processed = self.process(mailbox, None)
+            elif email_ids:
+                GMAIL_PUSH_SYNCS.inc(mode='incremental')
+                processed = self.process(mailbox, email_ids)
+            else:
+                # 既読・ラベル変更など、受信トレイへの追加ではない通知
+                GMAIL_PUSH_SYNCS.inc(mode='noop')
+                processed = []
+
+            if next_cursor:
+                with self._lock:
+                    self._cursors[mailbox] = next_cursor
+            if published_at is not None:
+                GMAIL_PUSH_LAG.observe(max(0.0, time.time() - published_at))
+            logger.info(f"📨 プッシュ取り込み: {len(processed or [])}件", extra=log_fields(
+                mailbox=mailbox, new_messages=None if email_ids is None else len(email_ids), history_id=next_cursor
+            ))
+            return len(processed or [])
+
+    def watch_all(self, topic_name: str = GMAIL_PUSH_TOPIC) -> Dict[str, str]:
+        """全テナントの受信トレイに watch を登録・更新（{tenant_id: 登録時点の履歴ID} を返す）"""
+        registered = {}
+        for tenant_id in sorted(self.tenants.tenant_ids()):
+            try:
+                response = self.tenants.gmail(tenant_id).watch(topic_name)
+            except Exception as e:
+                logger.warning("❌ Gmail watch 登録失敗", extra=log_fields(tenant=tenant_id, error=str(e)))
+                continue
+            registered[tenant_id] = str(response['historyId'])
+            # 取り込み済みの起点がなければ登録時点から（それより前のメールは定時実行・手動実行で取り込む）
+            with self._lock:
+                self._cursors.setdefault(tenant_id, registered[tenant_id])
+        logger.info(f"👀 Gmail watch 登録: {len(registered)}テナント", extra=log_fields(topic=topic_name))
+        return registered
@@ -6,37 +6,67 @@ import pickle
 import base64
 import re
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Tuple
 from google.auth.transport.requests import Request as GoogleRequest
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from config import GMAIL_SCOPES, GMAIL_CREDENTIALS_FILE, GMAIL_TOKEN_FILE, EMAIL_BODY_MAX_LENGTH
+from utils.log import get_logger, log_fields, sampled
+from config import (
+    GMAIL_SCOPES,
+    GMAIL_CREDENTIALS_FILE,
+    GMAIL_TOKEN_FILE,
+    GMAIL_BATCH_MODIFY_MAX_IDS,
+    EMAIL_BODY_MAX_LENGTH,
+    MAX_EMAILS_PER_FETCH
+)
+
+logger = get_logger(__name__)
+
+# messages.list の1ページあたりの上限（Gmail APIの仕様）
+GMAIL_LIST_PAGE_SIZE = 500
+# 取り込まない送信者（get_recent_emails の検索条件 -from:noreply -from:no-reply -from:donotreply と同じ）
+NOREPLY_SENDER_PATTERN = re.compile(r'no-?reply|donotreply', re.IGNORECASE)
 
 
 class GmailService:
-    def __init__(self):
-        """Gmail API サービス初期化"""
-        self.service = None
-        self.authenticate()
+    def __init__(self, service=None, token_file: str = GMAIL_TOKEN_FILE, interactive: bool = True):
+        """Gmail API サービス初期化
+
+        service: 構築済みの Gmail API リソース（ベンチマーク用の偽実装など）。省略時はOAuth認証する。
+        token_file: 認証トークンの保存先（テナントごとに別ファイル）
+        interactive: トークンがないときにブラウザで認証するか（サーバー内のテナントは False）
+        """
+        self.service = service
+        self.token_file = token_file
+        self.interactive = interactive
+        self._label_ids: Dict[str, str] = {}  # ラベル名 → ID
+        self._email_address = None
+        if self.service is None:
+            self.authenticate()
     
     def authenticate(self):
         """Gmail API認証"""
         creds = None
         
-        if os.path.exists(GMAIL_TOKEN_FILE):
-            with open(GMAIL_TOKEN_FILE, 'rb') as token:
+        if os.path.exists(self.token_file):
+            with open(self.token_file, 'rb') as token:
                 creds = pickle.load(token)
         
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(GoogleRequest())
-            else:
+            elif self.interactive:
                 flow = InstalledAppFlow.from_client_secrets_file(
                     GMAIL_CREDENTIALS_FILE, GMAIL_SCOPES)
                 creds = flow.run_local_server(port=0)
+            else:
+                raise RuntimeError(f"Gmail認証トークンがありません: {self.token_file}")
             
-            with open(GMAIL_TOKEN_FILE, 'wb') as token:
+            token_dir = os.path.dirname(self.token_file)
+            if token_dir:
+                os.makedirs(token_dir, exist_ok=True)
+            with open(self.token_file, 'wb') as token:
                 pickle.dump(creds, token)
         
         self.service = build('gmail', 'v1', credentials=creds)
@@ -66,7 +96,7 @@ class GmailService:
             return body[:EMAIL_BODY_MAX_LENGTH]  # 教授メールは長めに取得
             
         except Exception as e:
-            print(f"⚠️  メール本文取得エラー: {e}")
+            logger.warning("⚠️ メール本文取得エラー", extra=log_fields(email_id=message.get('id'), error=str(e)))
             return ""
     
     def _decode_base64(self, data: str) -> str:
@@ -86,55 +116,150 @@ class GmailService:
         else:
             return "unknown@unknown.com"
     
-    def get_recent_emails(self, days: int = 3, max_emails: int = 30) -> List[Dict[str, Any]]:
-        """直近のメールを取得"""
+    def get_recent_emails(self, days: int = 3, max_emails: int = MAX_EMAILS_PER_FETCH) -> List[Dict[str, Any]]:
+        """直近のメールを取得（max_emails が1ページ上限を超える場合はページをたどる）"""
         try:
             # より厳密なフィルタリング（受信トレイのみ、noreply除外）
             date_filter = (datetime.now() - timedelta(days=days)).strftime('%Y/%m/%d')
             query = f'in:inbox after:{date_filter} -from:noreply -from:no-reply -from:donotreply -is:sent'
             
-            print(f"🔍 Gmail検索クエリ: {query}")
-            
-            results = self.service.users().messages().list(
-                userId='me', 
-                q=query, 
-                maxResults=max_emails
-            ).execute()
+            logger.debug("🔍 Gmail検索", extra=log_fields(days=days, max_emails=max_emails, query=query))
             
-            messages = results.get('messages', [])
-            print(f"📬 直近{days}日間のメール: {len(messages)}件取得")
-            
-            email_data = []
-            for msg in messages:
-                message = self.service.users().messages().get(
+            messages = []
+            page_token = None
+            while len(messages) < max_emails:
+                results = self.service.users().messages().list(
                     userId='me', 
-                    id=msg['id'],
-                    format='full'
+                    q=query, 
+                    maxResults=min(max_emails - len(messages), GMAIL_LIST_PAGE_SIZE),
+                    pageToken=page_token
                 ).execute()
-                
-                headers = message['payload'].get('headers', [])
-                subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
-                sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown')
-                date = next((h['value'] for h in headers if h['name'] == 'Date'), 'Unknown')
-                
-                # デバッグ: 取得したメール情報を表示
-                print(f"   📧 {subject[:40]}... - {sender[:30]}...")
-                
-                body = self.get_email_body(message)
-                sender_email = self.extract_sender_email(sender)
-                
-                email_info = {
-                    'id': msg['id'],
-                    'subject': subject,
-                    'sender': sender,
-                    'sender_email': sender_email,
-                    'date': date,
-                    'body': body
-                }
-                email_data.append(email_info)
-            
-            return email_data
-            
+                messages.extend(results.get('messages', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+            logger.info(f"📬 直近{days}日間のメール: {len(messages)}件取得", extra=log_fields(count=len(messages)))
+
+            return [self.get_email(msg['id']) for msg in messages]
+
         except Exception as error:
-            print(f"❌ メール取得エラー: {error}")
-            return []
\ No newline at end of file
+            logger.error("❌ メール取得エラー", extra=log_fields(error=str(error)))
+            return []
+
+    def get_email(self, message_id: str) -> Dict[str, Any]:
+        """メール1件を取得して件名・送信者・本文を取り出す"""
+        message = self.service.users().messages().get(
+            userId='me',
+            id=message_id,
+            format='full'
+        ).execute()
+
+        headers = message['payload'].get('headers', [])
+        subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
+        sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown')
+        date = next((h['value'] for h in headers if h['name'] == 'Date'), 'Unknown')
+
+        logger.debug("📧 メール取得", extra=sampled(email_id=message_id, subject=subject, sender=sender))
+
+        return {
+            'id': message_id,
+            'subject': subject,
+            'sender': sender,
+            'sender_email': self.extract_sender_email(sender),
+            'date': date,
+            'body': self.get_email_body(message)
+        }
+
+    def get_emails(self, message_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """指定したIDのメールを取得（差分取り込み用、取得できないメールと noreply 系の送信者は除く）"""
+        email_data = []
+        for message_id in message_ids:
+            try:
+                email_info = self.get_email(message_id)
+            except Exception as error:
+                # 通知から取得までの間に削除されたメールなど
+                logger.warning("⚠️ メール取得エラー", extra=log_fields(email_id=message_id, error=str(error)))
+                continue
+            # get_recent_emails の検索条件（-from:noreply など）と揃える
+            if NOREPLY_SENDER_PATTERN.search(email_info['sender_email']):
+                continue
+            email_data.append(email_info)
+        return email_data
+
+    def get_email_address(self) -> str:
+        """このアカウントのメールアドレス（プッシュ通知の宛先判定用、結果はキャッシュ）"""
+        if self._email_address is None:
+            profile = self.service.users().getProfile(userId='me').execute()
+            self._email_address = profile['emailAddress']
+        return self._email_address
+
+    def watch(self, topic_name: str) -> Dict[str, Any]:
+        """受信トレイの変更を Pub/Sub トピックへ通知するよう登録（7日で切れるので定期的に呼び直す）
+
+        {'historyId': 登録時点の履歴ID, 'expiration': 期限（UNIXミリ秒）} を返す。
+        """
+        return self.service.users().watch(userId='me', body={
+            'topicName': topic_name,
+            'labelIds': ['INBOX'],
+            'labelFilterBehavior': 'include'
+        }).execute()
+
+    def get_added_message_ids(self, start_history_id: str) -> Tuple[List[str], str]:
+        """start_history_id より後に受信トレイへ追加されたメールのIDと、最新の履歴IDを返す
+
+        履歴IDが古すぎる（約1週間より前）場合は Gmail API が404を返すので、呼び出し側で全件取得に切り替える。
+        """
+        message_ids: Dict[str, None] = {}  # 順序付きの集合（同じメールの重複を除く）
+        history_id = start_history_id
+        page_token = None
+        while True:
+            results = self.service.users().history().list(
+                userId='me',
+                startHistoryId=start_history_id,
+                historyTypes=['messageAdded'],
+                labelId='INBOX',
+                maxResults=GMAIL_LIST_PAGE_SIZE,
+                pageToken=page_token
+            ).execute()
+            for record in results.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    message_ids[added['message']['id']] = None
+            history_id = results.get('historyId', history_id)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+        return list(message_ids), history_id
+
+    def get_label_id(self, name: str) -> str:
+        """ラベル名からIDを取得（なければ作成、結果はキャッシュ）"""
+        label_id = self._label_ids.get(name)
+        if label_id:
+            return label_id
+        
+        labels = self.service.users().labels().list(userId='me').execute().get('labels', [])
+        label = next((label for label in labels if label['name'] == name), None)
+        if label is None:
+            label = self.service.users().labels().create(userId='me', body={
+                'name': name,
+                'labelListVisibility': 'labelShow',
+                'messageListVisibility': 'show'
+            }).execute()
+            logger.info(f"🏷️ Gmailラベル作成: {name}")
+        self._label_ids[name] = label['id']
+        return label['id']
+    
+    def archive_with_label(self, message_ids: Iterable[str], label_name: str) -> int:
+        """ラベルを付けて受信トレイから外す（batchModify で GMAIL_BATCH_MODIFY_MAX_IDS 件ずつ、呼び出し回数を返す）"""
+        message_ids = list(message_ids)
+        if not message_ids:
+            return 0
+        label_id = self.get_label_id(label_name)
+        calls = 0
+        for start in range(0, len(message_ids), GMAIL_BATCH_MODIFY_MAX_IDS):
+            self.service.users().messages().batchModify(userId='me', body={
+                'ids': message_ids[start:start + GMAIL_BATCH_MODIFY_MAX_IDS],
+                'addLabelIds': [label_id],
+                'removeLabelIds': ['INBOX']
+            }).execute()
+            calls += 1
+        return calls
@@ -0,0 +1,95 @@
+"""
+Gmail への完了状態の書き戻し（任意、PROFMAIL_GMAIL_WRITEBACK=true）
+
+ProfMail で完了にしたメールに Gmail 側でも GMAIL_DONE_LABEL を付けて受信トレイから外し、
+次回の in:inbox の一覧取得・本文取得の対象から外す。
+完了操作のたびに API を呼ばず、メールボックスごとのキューに貯めて GMAIL_WRITEBACK_INTERVAL_SECONDS ごとに
+users.messages.batchModify（1回 GMAIL_BATCH_MODIFY_MAX_IDS 件まで）でまとめて送る。
+
+キューはメモリ上だけに持つ。再起動や API エラーで送れなかったメールは、次回の取り込みで
+「受信トレイに残っている完了済みメール」として見つかり、もう一度キューに入る。
+"""
+import threading
+from typing import Dict, Iterable, List
+from utils.log import get_logger, log_fields
+from utils.metrics import metrics
+from config import GMAIL_BATCH_MODIFY_MAX_IDS, GMAIL_DONE_LABEL
+
+logger = get_logger(__name__)
+
+GMAIL_WRITEBACK_EMAILS = metrics.counter(
+    'profmail_gmail_writeback_emails_total', 'Gmailへ書き戻したメール数（結果別）', ['result']
+)
+GMAIL_BATCH_MODIFY_CALLS = metrics.counter('profmail_gmail_batch_modify_calls_total', 'batchModify の呼び出し回数')
+
+
+class GmailWriteback:
+    """完了したメールのラベル付け・アーカイブ待ちキュー（メールボックスごと）"""
+
+    def __init__(self, tenants, label_name: str = GMAIL_DONE_LABEL, max_ids: int = GMAIL_BATCH_MODIFY_MAX_IDS):
+        """tenants: TenantRegistry（メールボックスごとのGmailクライアントを引く）"""
+        self.tenants = tenants
+        self.label_name = label_name
+        self.max_ids = max_ids
+        # メールボックス → 送信待ちID（dict を順序付きの集合として使い、同じIDは1回だけ送る）
+        self._queues: Dict[str, Dict[str, None]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def enqueue(self, mailbox: str, email_ids: Iterable[str]) -> int:
+        """送信待ちに追加（キューの件数を返す）"""
+        with self._lock:
+            queue = self._queues.setdefault(mailbox, {})
+            queue.update(dict.fromkeys(email_ids))
+            return len(queue)
+
+    def pending(self) -> Dict[str, int]:
+        """メールボックスごとの送信待ち件数"""
+        with self._lock:
+            return {mailbox: len(queue) for mailbox, queue in self._queues.items() if queue}
+
+    def _take(self, mailbox: str) -> List[str]:
+        """キューの先頭から max_ids 件を取り出す"""
+        with self._lock:
+            queue = self._queues.get(mailbox, {})
+            batch = list(queue)[:self.max_ids]
+            for email_id in batch:
+                del queue[email_id]
+            return batch
+
+    def flush(self) -> Dict[str, int]:
+        """送信待ちを batchModify で送る（同時実行は1つだけ、{mailbox: 書き戻した件数} を返す）"""
+        summary: Dict[str, int] = {}
+        if not self._flush_lock.acquire(blocking=False):
+            return summary
+
+        try:
+            for mailbox in list(self.pending()):
+                while True:
+                    batch = self._take(mailbox)
+                    if not batch:
+                        break
+                    try:
+                        self.tenants.gmail(mailbox).archive_with_label(batch, self.label_name)
+                    except Exception as e:
+                        # 取りこぼしは次回の取り込みで再びキューに入るので、ここでは積み直さない
+                        GMAIL_WRITEBACK_EMAILS.inc(len(batch), result='failed')
+                        logger.warning("❌ Gmail書き戻し失敗", extra=log_fields(
+                            mailbox=mailbox, emails=len(batch), error=str(e)
+                        ))
+                        break
+                    GMAIL_BATCH_MODIFY_CALLS.inc()
+                    GMAIL_WRITEBACK_EMAILS.inc(len(batch), result='archived')
+                    summary[mailbox] = summary.get(mailbox, 0) + len(batch)
+
+            if summary:
+                logger.info(f"🏷️ Gmail書き戻し: {sum(summary.values())}件をアーカイブ", extra=log_fields(
+                    mailboxes=len(summary), archived=sum(summary.values())
+                ))
+            return summary
+        finally:
+            self._flush_lock.release()
+
+    def flush_in_background(self):
+        """呼び出し元をブロックせずに送信"""
+        threading.Thread(target=self.flush, name='gmail-writeback-flush', daemon=True).start()
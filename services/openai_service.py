@@ -2,28 +2,44 @@
 OpenAI API サービス
 """
 import json
+import threading
+import time
 from typing import Dict, Any, Optional
 from openai import OpenAI
+from utils.metrics import metrics
 from config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS
 
+OPENAI_TOKENS = metrics.counter('profmail_openai_tokens_total', 'OpenAI APIの消費トークン数', ['operation', 'kind'])
+OPENAI_REQUEST_SECONDS = metrics.histogram('profmail_openai_request_seconds', 'OpenAI API呼び出しの処理時間（秒）',
+                                           ['operation', 'result'])
+
+# チャットのコンテキストに使うカラム（本文はキーワード検索に使うため含める）
+CHAT_EMAIL_FIELDS = ['id', 'subject', 'sender', 'category', 'priority', 'urgency_score', 'body']
+
 
 class OpenAIService:
     _instance: Optional['OpenAIService'] = None
     _initialized = False
     
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         """シングルトンパターン実装"""
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def __init__(self):
-        """OpenAI API サービス初期化（1回だけ実行）"""
+    def __init__(self, client=None):
+        """OpenAI API サービス初期化（1回だけ実行）
+
+        client: OpenAI互換のクライアント（ベンチマーク用の偽実装など）。省略時はAPIキーから作成。
+        """
         if OpenAIService._initialized:
             return
             
-        self.client = None
-        if OPENAI_API_KEY:
+        self.client = client
+        self._usage = threading.local()  # 直近の呼び出しのトークン数（スレッドごと）
+        if self.client is not None:
+            print("✅ OpenAI クライアント設定完了")
+        elif OPENAI_API_KEY:
             self.client = OpenAI(api_key=OPENAI_API_KEY)
             print("✅ OpenAI API 初期化完了")
         else:
@@ -31,6 +47,30 @@ class OpenAIService:
         
         OpenAIService._initialized = True
     
+    def _create_completion(self, operation: str, **kwargs):
+        """Chat Completions 呼び出し（処理時間と response.usage のトークン数を記録）"""
+        started = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(**kwargs)
+        except Exception:
+            OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation, result='error')
+            raise
+        OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation, result='ok')
+        
+        usage = getattr(response, 'usage', None)
+        prompt_tokens = (usage.prompt_tokens or 0) if usage is not None else 0
+        completion_tokens = (usage.completion_tokens or 0) if usage is not None else 0
+        OPENAI_TOKENS.inc(prompt_tokens, operation=operation, kind='prompt')
+        OPENAI_TOKENS.inc(completion_tokens, operation=operation, kind='completion')
+        self._usage.value = (prompt_tokens, completion_tokens)
+        return response
+    
+    def pop_last_usage(self) -> tuple:
+        """このスレッドで直近に呼び出したAPIの (prompt, completion) トークン数を取り出す"""
+        usage = getattr(self._usage, 'value', (0, 0))
+        self._usage.value = (0, 0)
+        return usage
+    
     def categorize_and_analyze_email(self, email_content: str, subject: str, sender: str) -> Optional[Dict[str, Any]]:
         """メールのカテゴリ分類・分析・返信草案生成"""
         if not self.client:
@@ -81,7 +121,8 @@ urgency_score採点基準：
 
 重要: JSONのみを出力し、```json や ``` などのマークダウン記法は絶対に使用しないでください。"""
 
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
+                'analyze',
                 model=OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": "あなたは大学教授の優秀なアシスタントです。必ずJSON形式のみで回答し、マークダウンコードブロックは使用しないでください。"},
@@ -129,8 +170,8 @@ urgency_score採点基準：
         try:
             # データベースから現在の状況を取得
             stats = database.get_statistics()
-            pending_emails = database.get_emails_by_category(status='pending', limit=15)
-            high_priority = database.get_emails_by_priority('高', status='pending', limit=8)
+            pending_emails = database.get_emails_by_category(status='pending', limit=15, fields=CHAT_EMAIL_FIELDS)
+            high_priority = database.get_emails_by_priority('高', status='pending', limit=8, fields=CHAT_EMAIL_FIELDS)
             
             # 特定のキーワードでメール検索
             relevant_emails = self._search_relevant_emails(user_message, pending_emails)
@@ -162,7 +203,8 @@ urgency_score採点基準：
 回答は簡潔で実用的に。絵文字を適度に使用してください。
 メールの内容を具体的に参照して、より詳細で役立つアドバイスを提供してください。"""
 
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
+                'chat',
                 model=OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": system_prompt},
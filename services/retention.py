@@ -0,0 +1,70 @@
+"""
+保持期間を過ぎたメールのアーカイブとDBの圧縮
+
+完了・削除から RETENTION_DAYS 日を過ぎたメールは本文ごと圧縮アーカイブ（emails_archive）へ移し、
+一覧・集計が読む emails テーブルを未対応と最近のメールだけに保つ。移した後に空き領域を回収する。
+毎晩 RETENTION_HOUR:RETENTION_MINUTE にスケジューラーから実行するほか、手動でも実行できる:
+    python -m services.retention --days 90
+"""
+import argparse
+import time
+from typing import Any, Dict, Optional
+from models.storage import EmailStorage, get_storage
+from utils.log import get_logger, log_fields
+from utils.metrics import metrics
+from config import RETENTION_BATCH_SIZE, RETENTION_DAYS
+
+logger = get_logger(__name__)
+
+RETENTION_ARCHIVED = metrics.counter('profmail_retention_archived_emails_total', 'アーカイブへ移したメール数', ['mailbox'])
+RETENTION_SECONDS = metrics.histogram('profmail_retention_seconds', '保持期間処理の段階ごとの処理時間（秒）', ['stage'])
+
+
+def run_retention(db: Optional[EmailStorage] = None, days: int = RETENTION_DAYS,
+                  batch_size: int = RETENTION_BATCH_SIZE, compact: bool = True) -> Dict[str, Any]:
+    """古いメールをアーカイブし、DBを圧縮する（days=0 ならアーカイブせず圧縮のみ）"""
+    db = db or get_storage()
+    started = time.perf_counter()
+    archived: Dict[str, int] = {}
+
+    if days > 0:
+        with RETENTION_SECONDS.time(stage='archive'):
+            archived = db.archive_emails(older_than_days=days, batch_size=batch_size)
+        for mailbox, count in archived.items():
+            RETENTION_ARCHIVED.inc(count, mailbox=mailbox)
+
+    compacted: Dict[str, Dict[str, Any]] = {}
+    if compact:
+        with RETENTION_SECONDS.time(stage='compact'):
+            compacted = db.compact()
+
+    reclaimed = sum(max(0, result.get('bytes_before', 0) - result.get('bytes_after', 0))
+                    for result in compacted.values())
+    logger.info(f"🗄️ 保持期間処理完了: {sum(archived.values())}件をアーカイブ", extra=log_fields(
+        days=days, archived=sum(archived.values()), reclaimed_bytes=reclaimed,
+        duration_ms=round((time.perf_counter() - started) * 1000)
+    ))
+    return {"days": days, "archived": archived, "compacted": compacted, "reclaimed_bytes": reclaimed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="古いメールのアーカイブとDBの圧縮")
+    parser.add_argument('--days', type=int, default=RETENTION_DAYS,
+                        help="完了・削除からこの日数を過ぎたメールをアーカイブ（0でアーカイブしない）")
+    parser.add_argument('--batch-size', type=int, default=RETENTION_BATCH_SIZE)
+    parser.add_argument('--no-compact', action='store_true', help="アーカイブのみ行い、DBの圧縮はしない")
+    args = parser.parse_args()
+
+    result = run_retention(days=args.days, batch_size=args.batch_size, compact=not args.no_compact)
+    for mailbox, count in result['archived'].items():
+        print(f"   📦 {mailbox:<24} {count}件")
+    for location, compacted in result['compacted'].items():
+        if compacted['mode'] == 'error':
+            print(f"   ❌ {location}: {compacted['error']}")
+        else:
+            print(f"   🧹 {location}: {compacted['bytes_before']:,} → {compacted['bytes_after']:,} bytes ({compacted['mode']})")
+    print(f"✅ アーカイブ {sum(result['archived'].values())}件, 回収 {result['reclaimed_bytes']:,} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+メール処理1回分のトレース
+
+段階（fetch / prefilter / analyze / save / notify）ごとの合計時間と、
+メール1件×段階ごとのスパンを記録し、processing_history に保存する。
+スパンは [email_id, 段階, 開始オフセットms, 所要ms, 結果, promptトークン, completionトークン]
+の配列をzlib圧縮したJSONで持つ（1000件でも数十KB程度）。
+"""
+import json
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+from utils.events import event_bus
+from config import DEFAULT_MAILBOX
+
+RUN_PHASES = ('fetch', 'prefilter', 'analyze', 'save', 'notify')
+SPAN_FIELDS = ('email_id', 'phase', 'start_ms', 'duration_ms', 'outcome', 'prompt_tokens', 'completion_tokens')
+# エラー詳細は先頭のみ保存（同じ障害で全件失敗したときに履歴が膨らまないように）
+MAX_RECORDED_ERRORS = 50
+
+
+def compress_spans(spans: List[List[Any]]) -> bytes:
+    """スパン配列を圧縮"""
+    return zlib.compress(json.dumps(spans, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def decompress_spans(data: Optional[bytes]) -> List[Dict[str, Any]]:
+    """圧縮済みスパンを辞書のリストに戻す"""
+    if not data:
+        return []
+    return [dict(zip(SPAN_FIELDS, span)) for span in json.loads(zlib.decompress(data).decode('utf-8'))]
+
+
+class RunTrace:
+    """1回の実行（定時・手動）の計測結果"""
+
+    def __init__(self, trigger: str, mailbox: str = DEFAULT_MAILBOX):
+        self.trigger = trigger
+        self.mailbox = mailbox
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.phase_ms: Dict[str, float] = {phase: 0.0 for phase in RUN_PHASES}
+        self.spans: List[List[Any]] = []
+        self.errors: List[Dict[str, Any]] = []
+        self.error_count = 0
+        self.counts = {'fetched': 0, 'analyzed': 0, 'skipped': 0, 'saved': 0}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.status = 'running'
+        self.duration_ms: Optional[float] = None
+
+    def _offset_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """段階全体の時間を加算（メール単位のスパンを取らない段階用）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_ms[name] = self.phase_ms.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    @contextmanager
+    def span(self, email_id: str, phase: str) -> Iterator[Dict[str, Any]]:
+        """メール1件の1段階を計測
+
+        yield した辞書に outcome / prompt_tokens / completion_tokens を書き込むとスパンに残る。
+        """
+        start_ms = self._offset_ms()
+        detail: Dict[str, Any] = {'outcome': 'ok', 'prompt_tokens': 0, 'completion_tokens': 0}
+        try:
+            yield detail
+        except Exception as e:
+            detail['outcome'] = 'error'
+            self.record_error(phase, str(e), email_id)
+            raise
+        finally:
+            duration_ms = self._offset_ms() - start_ms
+            self.phase_ms[phase] = self.phase_ms.get(phase, 0.0) + duration_ms
+            self.prompt_tokens += detail['prompt_tokens']
+            self.completion_tokens += detail['completion_tokens']
+            self.spans.append([
+                email_id, phase, round(start_ms, 1), round(duration_ms, 1), detail['outcome'],
+                detail['prompt_tokens'], detail['completion_tokens']
+            ])
+
+    def record_error(self, phase: str, error: str, email_id: Optional[str] = None):
+        """エラー詳細を記録"""
+        self.error_count += 1
+        if len(self.errors) < MAX_RECORDED_ERRORS:
+            self.errors.append({'phase': phase, 'email_id': email_id, 'error': error[:500]})
+
+    def report_progress(self, phase: str, done: Optional[int] = None, total: Optional[int] = None):
+        """途中経過を画面へ通知（run-progress イベント、done / total はその段階で処理済み / 対象の件数）"""
+        event_bus.publish('run-progress', {
+            'trigger': self.trigger,
+            'phase': phase,
+            'status': self.status,
+            'done': done,
+            'total': total,
+            **self.counts,
+            'elapsed_ms': round(self.duration_ms if self.duration_ms is not None else self._offset_ms()),
+            'error': self.errors[-1]['error'] if self.status == 'error' and self.errors else None
+        }, self.mailbox)
+
+    def finish(self, status: str = 'success'):
+        """実行終了"""
+        self.status = status
+        self.duration_ms = self._offset_ms()
+        self.report_progress('done')
+
+    def to_record(self) -> Dict[str, Any]:
+        """processing_history に保存する形"""
+        return {
+            'execution_time': self.started_at,
+            'mailbox': self.mailbox,
+            'trigger': self.trigger,
+            'status': self.status,
+            'duration_ms': round(self.duration_ms if self.duration_ms is not None else self._offset_ms(), 1),
+            'phase_timings': json.dumps({k: round(v, 1) for k, v in self.phase_ms.items()}),
+            'emails_fetched': self.counts['fetched'],
+            'emails_processed': self.counts['analyzed'],
+            'emails_categorized': self.counts['saved'],
+            'emails_skipped': self.counts['skipped'],
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'error_count': self.error_count,
+            'error_message': self.errors[0]['error'] if self.errors else None,
+            'errors': json.dumps(self.errors, ensure_ascii=False) if self.errors else None,
+            'spans': compress_spans(self.spans),
+        }
@@ -0,0 +1,222 @@
+"""
+Slack配信レイヤー
+
+HTTPセッションの再利用、接続/読み取りタイムアウト、Retry-After を尊重した
+指数バックオフを担当する。送信できなかったメッセージはSQLiteのアウトボックスに
+積まれ、バックグラウンドで再送される。
+"""
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+import requests
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from utils.metrics import metrics
+from config import (
+    SLACK_CONNECT_TIMEOUT,
+    SLACK_READ_TIMEOUT,
+    SLACK_MAX_RETRIES,
+    SLACK_BACKOFF_BASE,
+    SLACK_BACKOFF_MAX,
+    SLACK_OUTBOX_MAX_ATTEMPTS,
+    SLACK_OUTBOX_BATCH_SIZE
+)
+
+SLACK_SEND_SECONDS = metrics.histogram(
+    'profmail_slack_send_seconds', 'Slack送信1回あたりの処理時間（秒、リトライ待ち含む）', ['transport', 'result']
+)
+
+# 一時的な障害とみなすHTTPステータス
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Bot APIで再試行しても結果が変わらないエラー
+PERMANENT_SLACK_ERRORS = {
+    'invalid_auth', 'not_authed', 'account_inactive', 'token_revoked',
+    'channel_not_found', 'not_in_channel', 'is_archived', 'invalid_blocks',
+    'user_not_found', 'missing_scope'
+}
+
+
+def _result(ok: bool, retryable: bool = False, error: Optional[str] = None,
+            retry_after: Optional[float] = None) -> Dict[str, Any]:
+    """送信結果"""
+    return {"ok": ok, "retryable": retryable, "error": error, "retry_after": retry_after}
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-Afterヘッダー（秒）を解釈"""
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None,
+                  base: float = SLACK_BACKOFF_BASE, cap: float = SLACK_BACKOFF_MAX) -> float:
+    """再試行までの待ち時間（Retry-After優先、なければジッター付き指数バックオフ）"""
+    if retry_after is not None:
+        return retry_after
+    delay = min(cap, base * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class SlackDeliveryClient:
+    """Webhook / Bot API への送信（リトライ付き）"""
+
+    def __init__(self, webhook_url: str = '', bot_token: str = '', username: str = ''):
+        self.webhook_url = webhook_url
+        self.username = username
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self.client = WebClient(token=bot_token, timeout=int(SLACK_READ_TIMEOUT)) if bot_token else None
+
+    @property
+    def configured(self) -> bool:
+        """送信手段が設定されているか"""
+        return bool(self.client or self.webhook_url)
+
+    def post_webhook(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Webhook経由で1回送信"""
+        try:
+            response = self.session.post(
+                self.webhook_url,
+                json=payload,
+                timeout=(SLACK_CONNECT_TIMEOUT, SLACK_READ_TIMEOUT)
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            return _result(False, retryable=True, error=f"{type(e).__name__}: {e}")
+        except requests.RequestException as e:
+            return _result(False, error=str(e))
+
+        if response.status_code == 200:
+            return _result(True)
+        return _result(
+            False,
+            retryable=response.status_code in RETRYABLE_STATUS_CODES,
+            error=f"HTTP {response.status_code}: {response.text[:200]}",
+            retry_after=_parse_retry_after(response.headers.get('Retry-After'))
+        )
+
+    def post_bot(self, channel: str, blocks: List[Dict], text: str = '') -> Dict[str, Any]:
+        """Bot API (chat.postMessage) で1回送信"""
+        try:
+            self.client.chat_postMessage(
+                channel=channel,
+                blocks=blocks,
+                text=text or 'ProfMail通知',
+                username=self.username
+            )
+            return _result(True)
+        except SlackApiError as e:
+            error = e.response.get('error', 'unknown_error') if e.response is not None else str(e)
+            status_code = getattr(e.response, 'status_code', None)
+            headers = getattr(e.response, 'headers', {}) or {}
+            retryable = (status_code in RETRYABLE_STATUS_CODES or error == 'ratelimited') \
+                and error not in PERMANENT_SLACK_ERRORS
+            return _result(False, retryable=retryable, error=error,
+                           retry_after=_parse_retry_after(headers.get('Retry-After') or headers.get('retry-after')))
+        except Exception as e:
+            # 接続エラー・タイムアウトなど
+            return _result(False, retryable=True, error=f"{type(e).__name__}: {e}")
+
+    def deliver(self, payload: Dict[str, Any], max_retries: int = SLACK_MAX_RETRIES,
+                sleep: Callable[[float], None] = time.sleep) -> Dict[str, Any]:
+        """メッセージ送信（一時的なエラーはバックオフしながら再試行）"""
+        if self.client:
+            transport = 'bot'
+
+            def send():
+                return self.post_bot(payload['channel'], payload['blocks'], payload.get('text', ''))
+        elif self.webhook_url:
+            transport = 'webhook'
+
+            def send():
+                return self.post_webhook({"username": self.username, "blocks": payload['blocks'],
+                                          "text": payload.get('text', '')})
+        else:
+            return _result(False, error="Slack設定が不完全です")
+
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            result = send()
+            if result['ok'] or not result['retryable'] or attempt >= max_retries:
+                result['attempts'] = attempt + 1
+                SLACK_SEND_SECONDS.observe(time.perf_counter() - started, transport=transport,
+                                           result='ok' if result['ok'] else 'error')
+                return result
+            delay = backoff_delay(attempt, result['retry_after'])
+            print(f"⏳ Slack送信リトライ {attempt + 1}/{max_retries}: {result['error']} ({delay:.1f}秒後)")
+            sleep(delay)
+            attempt += 1
+
+
+class SlackOutbox:
+    """送信待ちメッセージの永続キュー（SQLiteのslack_outboxテーブル）"""
+
+    def __init__(self, database, delivery: SlackDeliveryClient):
+        self.db = database
+        self.delivery = delivery
+        self._flush_lock = threading.Lock()
+
+    def enqueue(self, payload: Dict[str, Any], error: Optional[str] = None) -> Optional[int]:
+        """アウトボックスに追加"""
+        return self.db.enqueue_slack_message(payload, error=error)
+
+    def flush(self, limit: int = SLACK_OUTBOX_BATCH_SIZE) -> Dict[str, int]:
+        """送信期限の来たメッセージを再送（同時実行は1つだけ）"""
+        summary = {"sent": 0, "failed": 0, "dead": 0}
+        if not self._flush_lock.acquire(blocking=False):
+            return summary
+
+        try:
+            for message in self.db.get_due_slack_messages(limit=limit):
+                attempts = message['attempts'] + 1
+                # 再送ワーカー内では長く待たず、次回の再送タイミングに任せる
+                result = self.delivery.deliver(message['payload'], max_retries=0)
+                if result['ok']:
+                    self.db.mark_slack_message_sent(message['id'])
+                    summary["sent"] += 1
+                    continue
+
+                dead = not result['retryable'] or attempts >= SLACK_OUTBOX_MAX_ATTEMPTS
+                next_attempt_at = datetime.now() + timedelta(
+                    seconds=backoff_delay(attempts, result['retry_after'], base=30.0, cap=3600.0)
+                )
+                self.db.mark_slack_message_failed(message['id'], result['error'], next_attempt_at, dead=dead)
+                summary["dead" if dead else "failed"] += 1
+
+            if any(summary.values()):
+                print(f"📮 Slackアウトボックス再送: 成功{summary['sent']}件, 再試行待ち{summary['failed']}件, 破棄{summary['dead']}件")
+            return summary
+        finally:
+            self._flush_lock.release()
+
+    def flush_in_background(self):
+        """呼び出し元をブロックせずに再送"""
+        threading.Thread(target=self.flush, name='slack-outbox-flush', daemon=True).start()
+
+
+class RateLimiter:
+    """スレッドセーフなトークンバケット（Slackのメソッド別レート制限内に収める）"""
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンが1つ取れるまで待機"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,109 @@
+"""
+Slack DM一斉配信（教授ごとのダイジェスト）
+
+登録済みの配信先ごとに、その教授のメールボックスの未対応メールから
+ダイジェストを作り、レート制限内で並行してDM送信する。
+chat.postMessage の上限はチャンネル（DM）ごとに約1件/秒なので、配信先ごとのバケットと
+ワークスペース全体のバケットの両方で待ち合わせる（配信先が異なれば並行して送れる）。
+未対応メールは全メールボックス分をまとめて取得する（配信先数に比例したクエリは発行しない）。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from config import (
+    SLACK_FANOUT_CONCURRENCY,
+    SLACK_FANOUT_RATE_PER_SECOND,
+    SLACK_FANOUT_WORKSPACE_RATE_PER_SECOND,
+    TODO_MAX_ITEMS
+)
+from services.slack_delivery import RateLimiter
+from utils.log import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+
+class SlackFanoutSender:
+    def __init__(self, slack_service, database):
+        """slack_service: SlackService（メッセージ生成・配信クライアント・アウトボックスを利用）"""
+        self.slack_service = slack_service
+        self.db = database
+        # ワークスペース全体（同時実行数ぶんのバースト）と、送信先チャンネルごとのレート制限
+        self.rate_limiter = RateLimiter(SLACK_FANOUT_WORKSPACE_RATE_PER_SECOND, burst=SLACK_FANOUT_CONCURRENCY)
+        self._channel_limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _channel_limiter(self, channel: str) -> RateLimiter:
+        """送信先チャンネル（DMならユーザーID）ごとのレート制限"""
+        with self._lock:
+            limiter = self._channel_limiters.get(channel)
+            if limiter is None:
+                limiter = self._channel_limiters[channel] = RateLimiter(SLACK_FANOUT_RATE_PER_SECOND)
+            return limiter
+
+    def send_digests(self, new_emails_by_mailbox: Dict[str, List[Dict[str, Any]]],
+                     mailboxes: Optional[List[str]] = None) -> Dict[str, Any]:
+        """配信先にDMでダイジェスト送信（mailboxes 指定時はそのメールボックスの配信先のみ）"""
+        recipients = self.db.get_slack_recipients(enabled_only=True)
+        if mailboxes is not None:
+            recipients = [r for r in recipients if r['mailbox'] in mailboxes]
+        if not recipients:
+            return {"recipients": 0, "sent": 0, "failed": 0}
+        if not self.slack_service.client:
+            logger.warning("⚠️ DM配信にはSlack Bot Tokenが必要です", extra=log_fields(recipients=len(recipients)))
+            return {"recipients": len(recipients), "sent": 0, "failed": len(recipients),
+                    "error": "bot_token_required"}
+
+        mailboxes = sorted({r['mailbox'] for r in recipients})
+        digests = self.db.get_pending_digests(mailboxes, per_mailbox_limit=TODO_MAX_ITEMS)
+
+        # 同じメールボックスを見る配信先同士でメッセージを共有
+        blocks_by_mailbox = {
+            mailbox: self.slack_service._generate_todo_message(new_emails_by_mailbox.get(mailbox, []), digest)
+            for mailbox, digest in digests.items()
+        }
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=SLACK_FANOUT_CONCURRENCY, thread_name_prefix='slack-dm') as pool:
+            results = list(pool.map(
+                lambda recipient: self._send_one(recipient, blocks_by_mailbox[recipient['mailbox']]),
+                recipients
+            ))
+
+        latencies = sorted(r['latency_ms'] for r in results)
+        summary = {
+            "recipients": len(recipients),
+            "sent": sum(1 for r in results if r['ok']),
+            "failed": sum(1 for r in results if not r['ok']),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "latency_ms_p50": round(latencies[len(latencies) // 2], 1),
+            "latency_ms_max": round(latencies[-1], 1),
+            "failures": [
+                {"slack_user_id": r['slack_user_id'], "error": r['error']}
+                for r in results if not r['ok']
+            ]
+        }
+        logger.info(f"📤 Slack DM一斉配信: {summary['sent']}/{summary['recipients']}件成功", extra=log_fields(
+            recipients=summary['recipients'], sent=summary['sent'], failed=summary['failed'],
+            elapsed_seconds=summary['elapsed_seconds'], latency_ms_p50=summary['latency_ms_p50'],
+            latency_ms_max=summary['latency_ms_max']
+        ))
+        return summary
+
+    def _send_one(self, recipient: Dict[str, Any], blocks: List[Dict]) -> Dict[str, Any]:
+        """1人分のDM送信（chat.postMessage にユーザーIDを指定するとDMになる）"""
+        user_id = recipient['slack_user_id']
+        payload = {"channel": user_id, "blocks": blocks, "text": "🎓 今日のメールTODO"}
+
+        self._channel_limiter(user_id).acquire()
+        self.rate_limiter.acquire()
+        started = time.perf_counter()
+        result = self.slack_service.delivery.deliver(payload)
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        self.db.record_slack_delivery(user_id, result['ok'], latency_ms, result['error'])
+        if not result['ok'] and result['retryable']:
+            self.slack_service.outbox.enqueue(payload, error=result['error'])
+
+        return {"slack_user_id": user_id, "ok": result['ok'], "error": result['error'],
+                "latency_ms": latency_ms}
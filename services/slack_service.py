@@ -1,12 +1,12 @@
 """
 Slack通知サービス
 """
-import json
-import requests
+import threading
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+from models.storage import get_storage
+from services.slack_delivery import SlackDeliveryClient, SlackOutbox
+from services.slack_fanout import SlackFanoutSender
 from config import (
     SLACK_WEBHOOK_URL, 
     SLACK_BOT_TOKEN, 
@@ -15,7 +15,8 @@ from config import (
     SLACK_ENABLED,
     TODO_MAX_ITEMS,
     TODO_PRIORITY_ORDER,
-    EMAIL_CATEGORIES
+    EMAIL_CATEGORIES,
+    DEFAULT_MAILBOX
 )
 
 
@@ -39,10 +40,13 @@ class SlackService:
         self.channel = SLACK_CHANNEL
         self.username = SLACK_USERNAME
         self.enabled = SLACK_ENABLED
-        self.client = None
+        self.delivery = SlackDeliveryClient(self.webhook_url, self.bot_token, self.username)
+        self.client = self.delivery.client
+        self.db = get_storage()
+        self.outbox = SlackOutbox(self.db, self.delivery)
+        self.fanout = SlackFanoutSender(self, self.db)
         
-        if self.bot_token:
-            self.client = WebClient(token=self.bot_token)
+        if self.client:
             print("✅ Slack Bot API 初期化完了")
         elif self.webhook_url:
             print("✅ Slack Webhook URL 設定完了")
@@ -51,31 +55,88 @@ class SlackService:
         
         SlackService._initialized = True
     
-    def send_daily_todo(self, new_emails: List[Dict[str, Any]], pending_emails: List[Dict[str, Any]]) -> bool:
-        """毎日のTODOリストをSlackに送信"""
+    def send_daily_todo(self, new_emails: List[Dict[str, Any]], digest: Optional[Dict[str, Any]] = None,
+                        wait: bool = True) -> bool:
+        """毎日のTODOリストをSlackに送信（wait=Falseならアウトボックス経由で非同期送信）
+
+        digest: get_pending_digest() の結果（省略時はここで取得）
+        """
         if not self.enabled:
             print("⚠️ Slack通知が無効です")
             return False
         
         try:
             # TODOリストメッセージ生成
-            message_blocks = self._generate_todo_message(new_emails, pending_emails)
-            
-            # 送信方法選択
-            if self.client:
-                return self._send_with_bot_api(message_blocks)
-            elif self.webhook_url:
-                return self._send_with_webhook(message_blocks)
-            else:
-                print("❌ Slack設定が不完全です")
-                return False
+            if digest is None:
+                digest = self.db.get_pending_digest()
+            message_blocks = self._generate_todo_message(new_emails, digest)
+            return self.send_blocks(message_blocks, text="🎓 今日のメールTODO", wait=wait)
                 
         except Exception as e:
             print(f"❌ Slack通知エラー: {e}")
             return False
     
-    def _generate_todo_message(self, new_emails: List[Dict[str, Any]], pending_emails: List[Dict[str, Any]]) -> List[Dict]:
-        """TODOリストメッセージブロック生成"""
+    def send_blocks(self, blocks: List[Dict], channel: Optional[str] = None, text: str = '',
+                    wait: bool = True) -> bool:
+        """メッセージ送信（失敗時はアウトボックスに積んでバックグラウンドで再送）"""
+        if not self.delivery.configured:
+            print("❌ Slack設定が不完全です")
+            return False
+        
+        payload = {"channel": channel or self.channel, "blocks": blocks, "text": text}
+        
+        if not wait:
+            # 送信はバックグラウンドに任せ、呼び出し元をSlackの遅延で待たせない
+            queued = self.outbox.enqueue(payload) is not None
+            if queued:
+                self.outbox.flush_in_background()
+                print("📮 Slack通知をアウトボックスに追加しました")
+            return queued
+        
+        result = self.delivery.deliver(payload)
+        if result['ok']:
+            print(f"✅ Slack通知送信完了 ({'Bot API' if self.client else 'Webhook'})")
+            return True
+        
+        print(f"❌ Slack送信エラー: {result['error']}")
+        if result['retryable']:
+            self.outbox.enqueue(payload, error=result['error'])
+            print("📮 再送用にアウトボックスへ追加しました")
+        return False
+    
+    def send_dm_digests(self, new_emails: List[Dict[str, Any]], wait: bool = True,
+                        mailboxes: Optional[List[str]] = None) -> Dict[str, Any]:
+        """登録済みの教授それぞれにDMでダイジェストを一斉送信（mailboxes 指定時はその配信先のみ）"""
+        if not self.enabled:
+            print("⚠️ Slack通知が無効です")
+            return {"recipients": 0, "sent": 0, "failed": 0}
+        
+        new_emails_by_mailbox: Dict[str, List[Dict[str, Any]]] = {}
+        for email in new_emails:
+            new_emails_by_mailbox.setdefault(email.get('mailbox', DEFAULT_MAILBOX), []).append(email)
+        
+        if not wait:
+            threading.Thread(
+                target=self.fanout.send_digests,
+                args=(new_emails_by_mailbox, mailboxes),
+                name='slack-dm-fanout',
+                daemon=True
+            ).start()
+            return {"queued": True}
+        return self.fanout.send_digests(new_emails_by_mailbox, mailboxes)
+    
+    def flush_outbox(self) -> Dict[str, int]:
+        """アウトボックスの再送（スケジューラーから定期実行）"""
+        if not self.enabled or not self.delivery.configured:
+            return {"sent": 0, "failed": 0, "dead": 0}
+        return self.outbox.flush()
+    
+    def _generate_todo_message(self, new_emails: List[Dict[str, Any]], digest: Dict[str, Any]) -> List[Dict]:
+        """TODOリストメッセージブロック生成
+
+        digest の emails はSQL側で優先度順に並べ替え・件数制限済み。
+        件数は total / priority_stats（未対応メール全体の集計）を使う。
+        """
         today = datetime.now().strftime('%Y-%m-%d (%a)')
         
         # 新着メール集計
@@ -85,20 +146,7 @@ class SlackService:
             category = email.get('category', 'その他')
             new_by_category[category] = new_by_category.get(category, 0) + 1
         
-        # 未対応メールを優先度順にソート
-        pending_sorted = sorted(
-            pending_emails, 
-            key=lambda x: (
-                TODO_PRIORITY_ORDER.index(x.get('priority', '中')),
-                -x.get('urgency_score', 5)
-            )
-        )
-        
-        # 優先度別集計
-        priority_stats = {}
-        for email in pending_emails:
-            priority = email.get('priority', '中')
-            priority_stats[priority] = priority_stats.get(priority, 0) + 1
+        priority_stats = digest.get('priority_stats', {})
         
         # Slack メッセージブロック構築
         blocks = [
@@ -137,7 +185,7 @@ class SlackService:
             ])
         
         # 未対応メール概要
-        total_pending = len(pending_emails)
+        total_pending = digest.get('total', 0)
         if total_pending > 0:
             priority_summary = " | ".join([
                 f"{priority}: {count}件" 
@@ -155,7 +203,7 @@ class SlackService:
             })
             
             # 優先度の高いTODOアイテム表示
-            top_todos = pending_sorted[:TODO_MAX_ITEMS]
+            top_todos = digest.get('emails', [])[:TODO_MAX_ITEMS]
             todo_items = []
             
             for i, email in enumerate(top_todos, 1):
@@ -235,46 +283,6 @@ class SlackService:
         
         return blocks
     
-    def _send_with_bot_api(self, blocks: List[Dict]) -> bool:
-        """Bot API経由でメッセージ送信"""
-        try:
-            response = self.client.chat_postMessage(
-                channel=self.channel,
-                blocks=blocks,
-                username=self.username
-            )
-            print(f"✅ Slack通知送信完了 (Bot API)")
-            return True
-            
-        except SlackApiError as e:
-            print(f"❌ Slack Bot API エラー: {e.response['error']}")
-            return False
-    
-    def _send_with_webhook(self, blocks: List[Dict]) -> bool:
-        """Webhook経由でメッセージ送信"""
-        try:
-            payload = {
-                "username": self.username,
-                "blocks": blocks
-            }
-            
-            response = requests.post(
-                self.webhook_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            if response.status_code == 200:
-                print(f"✅ Slack通知送信完了 (Webhook)")
-                return True
-            else:
-                print(f"❌ Slack Webhook エラー: {response.status_code}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Slack Webhook 送信エラー: {e}")
-            return False
-    
     def send_test_message(self) -> bool:
         """テスト通知送信"""
         if not self.enabled:
@@ -291,10 +299,16 @@ class SlackService:
             }
         ]
         
-        if self.client:
-            return self._send_with_bot_api(test_blocks)
-        elif self.webhook_url:
-            return self._send_with_webhook(test_blocks)
-        else:
-            print("❌ Slack設定が不完全です")
-            return False
\ No newline at end of file
+        return self.send_blocks(test_blocks, text="ProfMail テスト通知")
+    
+    def get_debug_info(self) -> Dict[str, Any]:
+        """Slack設定デバッグ情報"""
+        return {
+            "enabled": self.enabled,
+            "method": "bot_api" if self.client else ("webhook" if self.webhook_url else "none"),
+            "channel": self.channel,
+            "username": self.username,
+            "has_webhook_url": bool(self.webhook_url),
+            "has_bot_token": bool(self.bot_token),
+            "outbox": self.outbox.db.get_slack_outbox_stats()
+        }
@@ -0,0 +1,243 @@
+"""
+テナント（教授ごとのメールボックス）管理
+
+1プロセスで複数の教授のGmailアカウントを扱う。テナントIDは emails.mailbox の値と同じで、
+既定メールボックス（DEFAULT_MAILBOX）は従来どおり GMAIL_TOKEN_FILE を使う。
+
+- 処理中のテナントは contextvars で持ち回る（リクエスト単位は api.tenants.TenantMiddleware が設定）
+- Gmail APIクライアントはテナントごとに遅延生成し、LRUで上限数だけ保持する
+- 定期実行は SCHEDULER_HOUR:MINUTE から TENANT_SCHEDULE_WINDOW_MINUTES の幅に均等にずらす
+
+テナントの追加（ブラウザでOAuth認証してトークンを保存）:
+    python -m services.tenants add suzuki --name "鈴木教授"
+"""
+import argparse
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from services.gmail_service import GmailService
+from utils.log import get_logger, log_fields
+from config import (
+    DEFAULT_MAILBOX,
+    SCHEDULER_HOUR,
+    SCHEDULER_MINUTE,
+    TENANT_ADDRESS_RETRY_SECONDS,
+    TENANT_GMAIL_CACHE_SIZE,
+    TENANT_SCHEDULE_WINDOW_MINUTES,
+    TENANT_TOKEN_DIR
+)
+
+logger = get_logger(__name__)
+
+# URL・ファイル名に使うので英小文字・数字・-・_ のみ
+TENANT_ID_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+
+_current_tenant: ContextVar[str] = ContextVar('profmail_tenant', default=DEFAULT_MAILBOX)
+
+
+def current_tenant() -> str:
+    """処理中のテナントID"""
+    return _current_tenant.get()
+
+
+@contextmanager
+def tenant_context(tenant_id: str) -> Iterator[None]:
+    """with ブロック内の処理をこのテナントとして実行"""
+    token = _current_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+def is_valid_tenant_id(tenant_id: str) -> bool:
+    return bool(TENANT_ID_PATTERN.match(tenant_id or ''))
+
+
+def default_token_file(tenant_id: str) -> str:
+    """テナントの token.pickle の既定パス"""
+    return os.path.join(TENANT_TOKEN_DIR, f'{tenant_id}.pickle')
+
+
+def stagger_schedule(tenant_ids: List[str], hour: int = SCHEDULER_HOUR, minute: int = SCHEDULER_MINUTE,
+                     window_minutes: int = TENANT_SCHEDULE_WINDOW_MINUTES) -> Dict[str, Tuple[int, int]]:
+    """テナントごとの実行時刻 {tenant_id: (時, 分)}
+
+    並び順で均等に割り振る（既定メールボックスは常に先頭＝従来の時刻）。
+    """
+    ordered = sorted(tenant_ids, key=lambda tenant_id: (tenant_id != DEFAULT_MAILBOX, tenant_id))
+    schedule = {}
+    for index, tenant_id in enumerate(ordered):
+        offset = index * window_minutes // max(len(ordered), 1)
+        total = (hour * 60 + minute + offset) % (24 * 60)
+        schedule[tenant_id] = (total // 60, total % 60)
+    return schedule
+
+
+class TenantRegistry:
+    """テナント一覧とテナントごとのGmailクライアント"""
+
+    def __init__(self, db, default_gmail: Optional[GmailService] = None,
+                 max_clients: int = TENANT_GMAIL_CACHE_SIZE):
+        """db: EmailStorage、default_gmail: 既定メールボックス用（EmailProcessorのもの）"""
+        self.db = db
+        self.default_gmail = default_gmail
+        self.max_clients = max_clients
+        self._clients: 'OrderedDict[str, GmailService]' = OrderedDict()
+        self._tenant_ids: Optional[Set[str]] = None
+        self._addresses: Dict[str, str] = {}  # Gmailアドレス（小文字）→ テナントID
+        # TENANT_ADDRESS_RETRY_SECONDS の間は確認し直さないもの（値は確認した時刻、monotonic）
+        self._failed_probes: Dict[str, float] = {}  # getProfile に失敗したテナントID
+        self._unknown_addresses: Dict[str, float] = {}  # どのテナントのものでもなかったアドレス
+        self._lock = threading.Lock()
+
+    def tenants(self, enabled_only: bool = True) -> List[Dict[str, Any]]:
+        """登録済みテナント（既定メールボックスは登録がなくても含める）"""
+        tenants = self.db.get_tenants(enabled_only=enabled_only)
+        if not any(t['tenant_id'] == DEFAULT_MAILBOX for t in tenants):
+            tenants.insert(0, {'tenant_id': DEFAULT_MAILBOX, 'display_name': '', 'token_file': None, 'enabled': 1})
+        return tenants
+
+    def tenant_ids(self) -> Set[str]:
+        """有効なテナントIDの集合（リクエストごとの検証用にキャッシュ）"""
+        with self._lock:
+            if self._tenant_ids is None:
+                self._tenant_ids = {t['tenant_id'] for t in self.tenants(enabled_only=True)}
+            return self._tenant_ids
+
+    def exists(self, tenant_id: str) -> bool:
+        return tenant_id in self.tenant_ids()
+
+    def add(self, tenant_id: str, display_name: str = '', token_file: Optional[str] = None,
+            enabled: bool = True) -> bool:
+        """テナントを登録・更新"""
+        if not is_valid_tenant_id(tenant_id):
+            raise ValueError(f"テナントIDは英小文字・数字・-・_ で指定してください: {tenant_id!r}")
+        saved = self.db.upsert_tenant(tenant_id, display_name, token_file or default_token_file(tenant_id), enabled)
+        self._invalidate(tenant_id)
+        return saved
+
+    def remove(self, tenant_id: str) -> bool:
+        """テナントの登録を削除（保存済みメールは残す）"""
+        deleted = self.db.delete_tenant(tenant_id)
+        self._invalidate(tenant_id)
+        return deleted
+
+    def _invalidate(self, tenant_id: str):
+        with self._lock:
+            self._tenant_ids = None
+            self._clients.pop(tenant_id, None)
+            self._addresses = {address: t for address, t in self._addresses.items() if t != tenant_id}
+            self._failed_probes.pop(tenant_id, None)
+            self._unknown_addresses.clear()
+
+    def gmail(self, tenant_id: str) -> GmailService:
+        """テナントのGmailクライアント（なければトークンから生成）"""
+        if tenant_id == DEFAULT_MAILBOX and self.default_gmail is not None:
+            return self.default_gmail
+        with self._lock:
+            client = self._clients.get(tenant_id)
+            if client is not None:
+                self._clients.move_to_end(tenant_id)
+                return client
+
+        tenant = next((t for t in self.db.get_tenants() if t['tenant_id'] == tenant_id), None)
+        if tenant is None:
+            raise KeyError(f"テナントが登録されていません: {tenant_id}")
+        # 認証・discovery の読み込みはロックの外で行う（他テナントを待たせない）
+        client = GmailService(token_file=tenant['token_file'] or default_token_file(tenant_id), interactive=False)
+
+        with self._lock:
+            self._clients[tenant_id] = client
+            self._clients.move_to_end(tenant_id)
+            while len(self._clients) > self.max_clients:
+                evicted, _ = self._clients.popitem(last=False)
+                logger.debug("🧹 Gmailクライアント破棄", extra=log_fields(tenant=evicted))
+        return client
+
+    def mailbox_for_address(self, email_address: str) -> Optional[str]:
+        """Gmailアドレスからテナントを引く（プッシュ通知の emailAddress 用、なければ None）
+
+        未確認のテナントだけ getProfile で自分のアドレスを調べ、結果を覚えておく。
+        取得に失敗したテナントと宛先不明のアドレスも TENANT_ADDRESS_RETRY_SECONDS の間は覚えておき、
+        通知のたびに調べ直さない。
+        """
+        address = (email_address or '').lower()
+        now = time.monotonic()
+        with self._lock:
+            tenant_id = self._addresses.get(address)
+            checked_at = self._unknown_addresses.get(address)
+            known = set(self._addresses.values())
+            retrying = {t for t, failed_at in self._failed_probes.items()
+                        if now - failed_at < TENANT_ADDRESS_RETRY_SECONDS}
+        if tenant_id is not None:
+            return tenant_id
+        if checked_at is not None and now - checked_at < TENANT_ADDRESS_RETRY_SECONDS:
+            return None
+
+        for tenant_id in sorted(self.tenant_ids() - known - retrying):
+            try:
+                own_address = self.gmail(tenant_id).get_email_address().lower()
+            except Exception as e:
+                logger.warning("⚠️ Gmailアドレス取得失敗", extra=log_fields(tenant=tenant_id, error=str(e)))
+                with self._lock:
+                    self._failed_probes[tenant_id] = time.monotonic()
+                continue
+            with self._lock:
+                self._addresses[own_address] = tenant_id
+                self._failed_probes.pop(tenant_id, None)
+            if own_address == address:
+                return tenant_id
+
+        with self._lock:
+            now = time.monotonic()
+            self._unknown_addresses = {a: t for a, t in self._unknown_addresses.items()
+                                       if now - t < TENANT_ADDRESS_RETRY_SECONDS}
+            self._unknown_addresses[address] = now
+        return None
+
+    def schedule(self) -> Dict[str, Tuple[int, int]]:
+        """有効なテナントの定期実行時刻"""
+        return stagger_schedule(sorted(self.tenant_ids()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="テナント（教授のメールボックス）管理")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    add_parser = subparsers.add_parser('add', help="テナントを追加（Gmailの認証を行う）")
+    add_parser.add_argument('tenant_id')
+    add_parser.add_argument('--name', default='')
+    add_parser.add_argument('--token-file')
+    remove_parser = subparsers.add_parser('remove', help="テナントを削除")
+    remove_parser.add_argument('tenant_id')
+    subparsers.add_parser('list', help="テナント一覧と実行時刻")
+    args = parser.parse_args()
+
+    from models.storage import get_storage
+    registry = TenantRegistry(get_storage())
+
+    if args.command == 'add':
+        token_file = args.token_file or default_token_file(args.tenant_id)
+        if not is_valid_tenant_id(args.tenant_id):
+            parser.error(f"テナントIDは英小文字・数字・-・_ で指定してください: {args.tenant_id!r}")
+        # ブラウザでOAuth認証してトークンを保存
+        GmailService(token_file=token_file, interactive=True)
+        registry.add(args.tenant_id, args.name, token_file)
+        print(f"✅ テナント追加: {args.tenant_id} ({token_file})")
+    elif args.command == 'remove':
+        print("✅ テナント削除" if registry.remove(args.tenant_id) else "⚠️ テナントが見つかりません")
+    else:
+        schedule = registry.schedule()
+        for tenant in registry.tenants(enabled_only=False):
+            hour, minute = schedule.get(tenant['tenant_id'], (None, None))
+            when = f"{hour:02d}:{minute:02d}" if hour is not None else "停止中"
+            print(f"   {tenant['tenant_id']:<24} {when}  {tenant.get('display_name') or ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,504 @@
+// 🎯 統一されたコピー機能
+class UnifiedCopyManager {
+    async copyEmailDraft(emailId) {
+        const textarea = document.querySelector(`#markdown-textarea-${emailId}`);
+        const button = event.target.closest('.copy-btn-unified');
+
+        if (!textarea) {
+            this._showNotification('草案が見つかりません', 'error');
+            return false;
+        }
+
+        const text = textarea.value;
+        if (!text.trim()) {
+            this._showNotification('コピーする内容がありません', 'warning');
+            return false;
+        }
+
+        return await this.copyToClipboard(text, button, '📋 メール草案をコピーしました！');
+    }
+
+    async copyToClipboard(text, button, successMessage = 'コピーしました！') {
+        try {
+            await this._performCopy(text);
+            this._showButtonSuccess(button);
+            this._showNotification(successMessage, 'success');
+            return true;
+        } catch (error) {
+            this._showNotification('コピーに失敗しました', 'error');
+            return false;
+        }
+    }
+
+    async _performCopy(text) {
+        if (navigator.clipboard && navigator.clipboard.writeText) {
+            await navigator.clipboard.writeText(text);
+            return;
+        }
+        const tempTextarea = document.createElement('textarea');
+        tempTextarea.value = text;
+        tempTextarea.style.position = 'fixed';
+        tempTextarea.style.opacity = '0';
+        document.body.appendChild(tempTextarea);
+        tempTextarea.select();
+        const success = document.execCommand('copy');
+        document.body.removeChild(tempTextarea);
+        if (!success) throw new Error('Fallback copy failed');
+    }
+
+    _showButtonSuccess(button) {
+        if (!button) return;
+        const originalText = button.innerHTML;
+        button.classList.add('success');
+        button.innerHTML = '<span class="icon">✅</span><span>コピー完了</span>';
+        button.disabled = true;
+        setTimeout(() => {
+            button.classList.remove('success');
+            button.innerHTML = originalText;
+            button.disabled = false;
+        }, 2000);
+    }
+
+    _showNotification(message, type = 'success') {
+        const existingNotification = document.querySelector('.copy-notification');
+        if (existingNotification) existingNotification.remove();
+
+        const notification = document.createElement('div');
+        notification.className = 'copy-notification';
+        const icons = { success: '✅', error: '❌', warning: '⚠️' };
+        notification.innerHTML = `<span class="icon">${icons[type] || icons.success}</span><span>${message}</span>`;
+
+        if (type === 'error') {
+            notification.style.background = 'linear-gradient(135deg, #f44336 0%, #e57373 100%)';
+        } else if (type === 'warning') {
+            notification.style.background = 'linear-gradient(135deg, #ff9800 0%, #ffb74d 100%)';
+        }
+
+        document.body.appendChild(notification);
+        setTimeout(() => { if (notification.parentNode) notification.remove(); }, 3000);
+    }
+}
+
+const copyManager = new UnifiedCopyManager();
+
+// グローバル関数
+async function copyEmailDraft(emailId) {
+    return await copyManager.copyEmailDraft(emailId);
+}
+
+function showReplyTab(emailId, tabType) {
+    document.querySelectorAll(`#reply-preview-${emailId}, #reply-markdown-${emailId}`).forEach(el => el.classList.remove('active'));
+    document.querySelectorAll(`.tab-btn`).forEach(el => el.classList.remove('active'));
+    document.getElementById(`reply-${tabType}-${emailId}`).classList.add('active');
+    event.target.classList.add('active');
+}
+
+async function copyToClipboard(emailId) {
+    return await copyManager.copyEmailDraft(emailId);
+}
+
+async function copyTextToClipboard(text, successMessage) {
+    const button = event ? event.target.closest('.copy-btn-unified') : null;
+    return await copyManager.copyToClipboard(text, button, successMessage);
+}
+
+function showCopySuccess(message) {
+    copyManager._showNotification(message, 'success');
+}
+
+// 📡 JSON API 経由でDOMを部分更新（ページ全体の再読み込みはしない）
+function removeEmailElement(emailId) {
+    document.querySelectorAll(`[data-email-id="${emailId}"]`).forEach(el => {
+        const tabContent = el.closest('.tab-content');
+        el.remove();
+        if (tabContent) updateTabCount(tabContent.id);
+    });
+    updateEmailCount();
+}
+
+function updateEmailCount() {
+    // 表示中の件数から数え直す（変更通知と自分の操作で同じメールを二重に減らさない）
+    const lists = document.querySelectorAll('[data-live-view]');
+    if (lists.length === 0) return;
+    const count = [...lists].reduce((sum, list) => sum + list.querySelectorAll('[data-email-id]').length, 0);
+    document.querySelectorAll('.email-count').forEach(el => { el.textContent = count; });
+}
+
+function updateTabCount(tabId) {
+    const tab = document.querySelector(`[onclick="showTab('${tabId}')"] .tab-count`);
+    const content = document.getElementById(tabId);
+    if (tab && content) tab.textContent = content.querySelectorAll('[data-email-id]').length;
+}
+
+async function refreshStats() {
+    try {
+        const response = await fetch('/api/v1/stats');
+        if (!response.ok) return;
+        const stats = await response.json();
+        document.querySelectorAll('[data-stat]').forEach(el => {
+            const [key, sub] = el.dataset.stat.split('.');
+            const value = sub ? (stats[key] || {})[sub] : stats[key];
+            el.textContent = value || 0;
+        });
+        document.querySelectorAll('[data-category-count]').forEach(el => {
+            const count = (stats.category_stats || {})[el.dataset.categoryCount] || 0;
+            el.textContent = count;
+            el.className = count === 0 ? 'category-count-zero' : 'category-count';
+        });
+    } catch (error) { /* カウンター更新失敗は致命的ではない */ }
+}
+
+async function markCompleted(emailId) {
+    try {
+        const response = await fetch(`/api/v1/emails/${encodeURIComponent(emailId)}/complete`, { method: 'POST' });
+        const result = await response.json();
+        if (response.ok && result.success) {
+            removeEmailElement(emailId);
+            refreshStats();
+            copyManager._showNotification('✅ 完了にしました', 'success');
+        }
+        else { alert('エラー: ' + (result.detail || result.error)); }
+    } catch (error) { alert('エラーが発生しました: ' + error.message); }
+}
+
+async function deleteEmail(emailId) {
+    if (confirm('このメールを削除しますか？')) {
+        try {
+            const response = await fetch(`/api/v1/emails/${encodeURIComponent(emailId)}`, { method: 'DELETE' });
+            const result = await response.json();
+            if (response.ok && result.success) {
+                removeEmailElement(emailId);
+                refreshStats();
+            }
+            else { alert('エラー: ' + (result.detail || result.error)); }
+        } catch (error) { alert('エラーが発生しました: ' + error.message); }
+    }
+}
+
+// ☑️ 複数選択したメールを1リクエストでまとめて完了・削除
+function selectedEmailIds() {
+    return [...document.querySelectorAll('.email-select:checked')].map(el => el.value);
+}
+
+function updateBulkBar() {
+    const bar = document.getElementById('bulk-bar');
+    if (!bar) return;
+    const count = selectedEmailIds().length;
+    bar.classList.toggle('show', count > 0);
+    bar.querySelector('.bulk-count').textContent = count;
+}
+
+function selectAllEmails() {
+    // 非表示のタブにあるメールは選ばない
+    document.querySelectorAll('.email-select').forEach(el => { if (el.offsetParent !== null) el.checked = true; });
+    updateBulkBar();
+}
+
+function clearEmailSelection() {
+    document.querySelectorAll('.email-select:checked').forEach(el => { el.checked = false; });
+    updateBulkBar();
+}
+
+async function bulkUpdateEmails(action) {
+    const ids = selectedEmailIds();
+    if (ids.length === 0) return;
+    if (action === 'delete' && !confirm(`${ids.length}件のメールを削除しますか？`)) return;
+    try {
+        const response = await fetch('/api/v1/emails/bulk', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ action: action, ids: ids })
+        });
+        const result = await response.json();
+        if (response.ok && result.success) {
+            result.ids.forEach(removeEmailElement);
+            clearEmailSelection();
+            refreshStats();
+            const label = action === 'complete' ? '完了にしました' : '削除しました';
+            copyManager._showNotification(`${result.count}件を${label}`, 'success');
+        }
+        else { alert('エラー: ' + (result.detail || result.error)); }
+    } catch (error) { alert('エラーが発生しました: ' + error.message); }
+}
+
+// 🔴 サーバーからの変更通知（SSE）で、開いているページのカード・行・件数をその場で更新
+const LIVE_FETCH_DELAY_MS = 300;  // 続けて届いた変更をまとめてからHTMLを取得
+const LIVE_FETCH_MAX_IDS = 50;    // /api/v1/fragments/emails の1回あたりの上限
+const liveFetchIds = new Set();
+let liveFetchTimer = null;
+
+function liveLists() {
+    return [...document.querySelectorAll('[data-live-view]')];
+}
+
+function liveListAccepts(list, email) {
+    const filter = list.dataset;
+    return (!filter.liveStatus || filter.liveStatus === email.status)
+        && (!filter.livePriority || filter.livePriority === email.priority)
+        && (!filter.liveCategory || filter.liveCategory === email.category);
+}
+
+function liveRemove(list, emailId) {
+    const el = list.querySelector(`[data-email-id="${CSS.escape(emailId)}"]`);
+    if (!el) return false;
+    el.remove();
+    return true;
+}
+
+function handleEmailChanged(data) {
+    const lists = liveLists();
+    if (lists.length === 0) return;
+    const summaries = new Map((data.emails || []).map(email => [email.id, email]));
+    let changed = false;
+    data.ids.forEach(emailId => {
+        const summary = summaries.get(emailId);
+        let fetch = false;
+        lists.forEach(list => {
+            const accepts = summary ? liveListAccepts(list, summary)
+                : (data.action !== 'deleted' && data.action !== 'archived'
+                   && (!list.dataset.liveStatus || list.dataset.liveStatus === data.status));
+            if (accepts) fetch = true;
+            else if (liveRemove(list, emailId)) changed = true;
+        });
+        if (fetch) liveFetchIds.add(emailId);
+    });
+    if (changed) liveListsChanged(lists);
+    if (liveFetchIds.size > 0 && liveFetchTimer === null) {
+        liveFetchTimer = setTimeout(fetchLiveFragments, LIVE_FETCH_DELAY_MS);
+    }
+}
+
+async function fetchLiveFragments() {
+    liveFetchTimer = null;
+    const ids = [...liveFetchIds].slice(0, LIVE_FETCH_MAX_IDS);
+    ids.forEach(emailId => liveFetchIds.delete(emailId));
+    if (liveFetchIds.size > 0) liveFetchTimer = setTimeout(fetchLiveFragments, 0);
+
+    const lists = liveLists();
+    const views = [...new Set(lists.map(list => list.dataset.liveView))];
+    try {
+        const params = new URLSearchParams({ ids: ids.join(','), views: views.join(',') });
+        const response = await fetch(`/api/v1/fragments/emails?${params}`);
+        if (!response.ok) return;
+        const result = await response.json();
+        const found = new Map(result.emails.map(email => [email.id, email]));
+        ids.forEach(emailId => {
+            const email = found.get(emailId);
+            lists.forEach(list => {
+                if (!email || !liveListAccepts(list, email)) {
+                    liveRemove(list, emailId);
+                    return;
+                }
+                const template = document.createElement('template');
+                template.innerHTML = email.html[list.dataset.liveView].trim();
+                const element = template.content.firstElementChild;
+                const existing = list.querySelector(`[data-email-id="${CSS.escape(emailId)}"]`);
+                if (existing) {
+                    // 選択中のチェックは引き継ぐ
+                    const checked = existing.querySelector('.email-select:checked');
+                    existing.replaceWith(element);
+                    if (checked) element.querySelector('.email-select').checked = true;
+                } else {
+                    // 「メールがありません」の表示を外して先頭に追加
+                    [...list.children].filter(el => !el.dataset.emailId).forEach(el => el.remove());
+                    list.prepend(element);
+                }
+            });
+        });
+        liveListsChanged(lists);
+    } catch (error) { /* 次の変更通知か再接続時の取り直しで追いつく */ }
+}
+
+function liveListsChanged(lists) {
+    lists.filter(list => list.classList.contains('tab-content')).forEach(list => updateTabCount(list.id));
+    updateEmailCount();
+    updateBulkBar();
+}
+
+function resyncLiveLists() {
+    // 取りこぼしたイベントがありうる（再接続・キューの溢れ）ので、表示中のメールを取り直す
+    refreshStats();
+    liveLists().forEach(list => {
+        list.querySelectorAll('[data-email-id]').forEach(el => liveFetchIds.add(el.dataset.emailId));
+    });
+    if (liveFetchIds.size > 0 && liveFetchTimer === null) fetchLiveFragments();
+}
+
+function connectEvents() {
+    if (!window.EventSource) return;
+    const source = new EventSource('/api/v1/events');
+    let disconnected = false;
+    source.addEventListener('email-changed', event => handleEmailChanged(JSON.parse(event.data)));
+    source.addEventListener('stats-changed', () => {
+        if (document.querySelector('[data-stat], [data-category-count]')) refreshStats();
+    });
+    source.addEventListener('resync', () => resyncLiveLists());
+    source.addEventListener('error', () => { disconnected = true; });
+    source.addEventListener('open', () => {
+        if (disconnected) resyncLiveLists();
+        disconnected = false;
+    });
+}
+
+document.addEventListener('DOMContentLoaded', connectEvents);
+
+function showTab(tabName) {
+    document.querySelectorAll('.tab-content').forEach(el => el.classList.remove('active'));
+    document.querySelectorAll('.tab').forEach(el => el.classList.remove('active'));
+    document.getElementById(tabName).classList.add('active');
+    document.querySelector(`[onclick="showTab('${tabName}')"]`).classList.add('active');
+}
+
+// 🤖 チャットボット機能
+class ProfessorChatBot {
+    constructor() {
+        this.isOpen = false;
+        this.messages = [];
+        this.init();
+    }
+
+    init() {
+        // 初回メッセージ
+        this.messages = [{
+            type: 'assistant',
+            content: '🎓 こんにちは！ProfMail AIアシスタントです。\n\n今日のメール状況を確認したり、特定のメールを検索したりできます。\n\n例：「今日やるべきことは？」「高優先度のメールを見せて」「論文査読のメールは？」',
+            timestamp: new Date()
+        }];
+    }
+
+    toggle() {
+        const popup = document.getElementById('chat-popup');
+        if (this.isOpen) {
+            popup.classList.remove('open');
+            this.isOpen = false;
+        } else {
+            popup.classList.add('open');
+            this.isOpen = true;
+            this.renderMessages();
+            const input = document.getElementById('chat-input');
+            if (input) input.focus();
+        }
+    }
+
+    async sendMessage() {
+        const input = document.getElementById('chat-input');
+        const message = input.value.trim();
+
+        if (!message) return;
+
+        // ユーザーメッセージを追加
+        this.messages.push({
+            type: 'user',
+            content: message,
+            timestamp: new Date()
+        });
+
+        input.value = '';
+        this.renderMessages();
+        this.showTyping();
+
+        try {
+            // APIにメッセージ送信
+            const response = await fetch('/chat', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ message: message })
+            });
+
+            const result = await response.json();
+
+            this.hideTyping();
+
+            if (result.success) {
+                this.messages.push({
+                    type: 'assistant',
+                    content: result.response,
+                    timestamp: new Date()
+                });
+            } else {
+                this.messages.push({
+                    type: 'assistant',
+                    content: '申し訳ございません。エラーが発生しました。',
+                    timestamp: new Date()
+                });
+            }
+
+            this.renderMessages();
+
+        } catch (error) {
+            this.hideTyping();
+            this.messages.push({
+                type: 'assistant',
+                content: 'ネットワークエラーが発生しました。しばらく後で再試行してください。',
+                timestamp: new Date()
+            });
+            this.renderMessages();
+        }
+    }
+
+    renderMessages() {
+        const container = document.getElementById('chat-messages');
+        if (!container) return;
+
+        container.innerHTML = '';
+
+        this.messages.forEach(msg => {
+            const messageDiv = document.createElement('div');
+            messageDiv.className = `chat-message ${msg.type}`;
+
+            const bubbleDiv = document.createElement('div');
+            bubbleDiv.className = `chat-bubble ${msg.type}`;
+            bubbleDiv.innerHTML = msg.content.replace(/\n/g, '<br>');
+
+            messageDiv.appendChild(bubbleDiv);
+            container.appendChild(messageDiv);
+        });
+
+        // 最新メッセージまでスクロール
+        container.scrollTop = container.scrollHeight;
+    }
+
+    showTyping() {
+        const typingElement = document.getElementById('chat-typing');
+        if (typingElement) {
+            typingElement.classList.add('show');
+            const container = document.getElementById('chat-messages');
+            if (container) container.scrollTop = container.scrollHeight;
+        }
+    }
+
+    hideTyping() {
+        const typingElement = document.getElementById('chat-typing');
+        if (typingElement) {
+            typingElement.classList.remove('show');
+        }
+    }
+
+    handleKeyPress(event) {
+        if (event.key === 'Enter' && !event.shiftKey) {
+            event.preventDefault();
+            this.sendMessage();
+        }
+    }
+}
+
+// グローバルチャットボットインスタンス
+let chatBot;
+
+// ページ読み込み時にチャットボット初期化
+document.addEventListener('DOMContentLoaded', function() {
+    chatBot = new ProfessorChatBot();
+});
+
+// グローバル関数
+function toggleChat() {
+    if (chatBot) chatBot.toggle();
+}
+
+function sendChatMessage() {
+    if (chatBot) chatBot.sendMessage();
+}
+
+function handleChatKeyPress(event) {
+    if (chatBot) chatBot.handleKeyPress(event);
+}
@@ -0,0 +1,542 @@
+// 🎯 統一されたコピー機能
+class UnifiedCopyManager {
+    async copyEmailDraft(emailId) {
+        const textarea = document.querySelector(`#markdown-textarea-${emailId}`);
+        const button = event.target.closest('.copy-btn-unified');
+
+        if (!textarea) {
+            this._showNotification('草案が見つかりません', 'error');
+            return false;
+        }
+
+        const text = textarea.value;
+        if (!text.trim()) {
+            this._showNotification('コピーする内容がありません', 'warning');
+            return false;
+        }
+
+        return await this.copyToClipboard(text, button, '📋 メール草案をコピーしました！');
+    }
+
+    async copyToClipboard(text, button, successMessage = 'コピーしました！') {
+        try {
+            await this._performCopy(text);
+            this._showButtonSuccess(button);
+            this._showNotification(successMessage, 'success');
+            return true;
+        } catch (error) {
+            this._showNotification('コピーに失敗しました', 'error');
+            return false;
+        }
+    }
+
+    async _performCopy(text) {
+        if (navigator.clipboard && navigator.clipboard.writeText) {
+            await navigator.clipboard.writeText(text);
+            return;
+        }
+        const tempTextarea = document.createElement('textarea');
+        tempTextarea.value = text;
+        tempTextarea.style.position = 'fixed';
+        tempTextarea.style.opacity = '0';
+        document.body.appendChild(tempTextarea);
+        tempTextarea.select();
+        const success = document.execCommand('copy');
+        document.body.removeChild(tempTextarea);
+        if (!success) throw new Error('Fallback copy failed');
+    }
+
+    _showButtonSuccess(button) {
+        if (!button) return;
+        const originalText = button.innerHTML;
+        button.classList.add('success');
+        button.innerHTML = '<span class="icon">✅</span><span>コピー完了</span>';
+        button.disabled = true;
+        setTimeout(() => {
+            button.classList.remove('success');
+            button.innerHTML = originalText;
+            button.disabled = false;
+        }, 2000);
+    }
+
+    _showNotification(message, type = 'success') {
+        const existingNotification = document.querySelector('.copy-notification');
+        if (existingNotification) existingNotification.remove();
+
+        const notification = document.createElement('div');
+        notification.className = 'copy-notification';
+        const icons = { success: '✅', error: '❌', warning: '⚠️' };
+        notification.innerHTML = `<span class="icon">${icons[type] || icons.success}</span><span>${message}</span>`;
+
+        if (type === 'error') {
+            notification.style.background = 'linear-gradient(135deg, #f44336 0%, #e57373 100%)';
+        } else if (type === 'warning') {
+            notification.style.background = 'linear-gradient(135deg, #ff9800 0%, #ffb74d 100%)';
+        }
+
+        document.body.appendChild(notification);
+        setTimeout(() => { if (notification.parentNode) notification.remove(); }, 3000);
+    }
+}
+
+const copyManager = new UnifiedCopyManager();
+
+// グローバル関数
+async function copyEmailDraft(emailId) {
+    return await copyManager.copyEmailDraft(emailId);
+}
+
+// 📡 ページを再読み込みせずにカウンターだけ更新
+async function refreshStats() {
+    try {
+        const response = await fetch('/api/v1/stats');
+        if (!response.ok) return;
+        const stats = await response.json();
+        document.querySelectorAll('[data-stat]').forEach(el => {
+            const [key, sub] = el.dataset.stat.split('.');
+            const value = sub ? (stats[key] || {})[sub] : stats[key];
+            el.textContent = value || 0;
+        });
+        document.querySelectorAll('[data-category-count]').forEach(el => {
+            const count = (stats.category_stats || {})[el.dataset.categoryCount] || 0;
+            el.textContent = count;
+            el.className = count === 0 ? 'category-count-zero' : 'category-count';
+        });
+    } catch (error) { /* カウンター更新失敗は致命的ではない */ }
+}
+
+// 🔴 サーバーからの変更通知（SSE）でカウンターと実行状況を更新（定期的な問い合わせはしない）
+const RUN_TRIGGER_LABELS = { manual: '手動実行', scheduled: '定期実行', push: '新着取り込み' };
+let runProgressTimer = null;
+
+function showRunProgress(progress) {
+    const el = document.getElementById('run-progress');
+    if (!el) return;
+    const label = RUN_TRIGGER_LABELS[progress.trigger] || progress.trigger;
+    let text;
+    if (progress.phase === 'fetch') {
+        text = `📥 ${label}: メール取得中...`;
+    } else if (progress.phase === 'analyze') {
+        text = `🤖 ${label}: 分析中 ${progress.done}/${progress.total}`;
+    } else {
+        const icon = progress.status === 'success' ? '✅' : '❌';
+        text = `${icon} ${label}: ${progress.saved}件保存（${(progress.elapsed_ms / 1000).toFixed(1)}秒）`;
+    }
+    el.textContent = text;
+    el.classList.add('show');
+    clearTimeout(runProgressTimer);
+    if (progress.phase === 'done') {
+        refreshStats();
+        runProgressTimer = setTimeout(() => el.classList.remove('show'), 5000);
+    }
+}
+
+function connectEvents() {
+    if (!window.EventSource) return;
+    const source = new EventSource('/api/v1/events');
+    let disconnected = false;
+    source.addEventListener('stats-changed', () => refreshStats());
+    source.addEventListener('resync', () => refreshStats());
+    source.addEventListener('run-progress', event => {
+        const progress = JSON.parse(event.data);
+        showRunProgress(progress);
+        onManualRunDone(progress);
+    });
+    source.addEventListener('error', () => { disconnected = true; });
+    source.addEventListener('open', () => {
+        // 切断中の変更を取りこぼしているかもしれないので取り直す
+        if (disconnected) refreshStats();
+        disconnected = false;
+    });
+}
+
+document.addEventListener('DOMContentLoaded', connectEvents);
+
+// 手動実行の結果は run-progress の done イベントで受け取る（POST の応答は待たない）
+let manualRunPending = false;
+const MANUAL_RUN_EVENT_GRACE_MS = 5000;
+
+function finishManualRun(succeeded, message) {
+    if (!manualRunPending) return;
+    manualRunPending = false;
+    const button = document.getElementById('process-btn');
+    setButtonLoading(button, succeeded ? '✅ 処理完了！' : '❌ エラー', false);
+    setTimeout(() => {
+        alert(message);
+        refreshStats();
+        resetButton(button, '実行');
+    }, 800); // 結果を少し見せてからアラート
+}
+
+function onManualRunDone(progress) {
+    if (progress.trigger !== 'manual' || progress.phase !== 'done') return;
+    if (progress.status !== 'success') {
+        finishManualRun(false, 'エラー: ' + (progress.error || '実行履歴を確認してください'));
+        return;
+    }
+    let message = `メール処理完了！\n`;
+    message += `📥 取得: ${progress.fetched}件\n`;
+    message += `🤖 分析: ${progress.analyzed}件\n`;
+    message += `💾 保存: ${progress.saved}件\n`;
+    if (progress.skipped > 0) {
+        message += `⏭️ 処理済みのためスキップ: ${progress.skipped}件\n`;
+    }
+    message += `⏱️ ${(progress.elapsed_ms / 1000).toFixed(1)}秒`;
+    finishManualRun(true, message);
+}
+
+async function processEmails() {
+    const button = document.getElementById('process-btn');
+    if (manualRunPending) return;
+    manualRunPending = true;
+
+    // ローディング状態開始
+    setButtonLoading(button, '✉️分析中...', true);
+
+    try {
+        const response = await fetch('/process', { method: 'POST' });
+        const result = await response.json();
+        const finishFromResponse = () => finishManualRun(result.success, result.success
+            ? `メール処理完了！\n📧 処理総数: ${result.processed_count}件`
+            : 'エラー: ' + (result.error || result.detail || response.status));
+        // 通常は応答より先に done イベントで完了している（SSE非対応・切断中に取りこぼしたときだけ応答で完了させる）
+        if (!window.EventSource || !response.ok) {
+            finishFromResponse();
+        } else {
+            setTimeout(finishFromResponse, MANUAL_RUN_EVENT_GRACE_MS);
+        }
+    } catch (error) {
+        finishManualRun(false, 'エラーが発生しました: ' + error.message);
+    }
+}
+
+async function testSlackNotification() {
+    const button = document.getElementById('slack-test-btn');
+
+    // ローディング状態開始
+    setButtonLoading(button, '📤 送信中...', false);
+
+    try {
+        const response = await fetch('/slack/test', { method: 'POST' });
+        const result = await response.json();
+
+        if (result.success) {
+            setButtonLoading(button, '✅ 送信完了！', false);
+            setTimeout(() => {
+                alert('✅ Slackテスト通知を送信しました！\nSlackチャンネルを確認してください。');
+                resetButton(button, '📤 Slack テスト');
+            }, 800);
+        } else {
+            setButtonLoading(button, '❌ 失敗', false);
+            setTimeout(() => {
+                alert('❌ Slack通知送信失敗: ' + (result.error || result.message));
+                resetButton(button, '📤 Slack テスト');
+            }, 800);
+        }
+    } catch (error) {
+        setButtonLoading(button, '❌ エラー', false);
+        setTimeout(() => {
+            alert('エラーが発生しました: ' + error.message);
+            resetButton(button, '📤 Slack テスト');
+        }, 800);
+    }
+}
+
+// ボタンローディング状態制御関数
+function setButtonLoading(button, text, useSpinner = true) {
+    button.disabled = true;
+    button.classList.add('loading');
+
+    if (useSpinner) {
+        button.innerHTML = `<span class="loading-spinner"></span>${text}`;
+    } else {
+        button.innerHTML = text;
+        button.classList.add('processing-pulse');
+    }
+}
+
+function resetButton(button, originalText) {
+    button.disabled = false;
+    button.classList.remove('loading', 'processing-pulse');
+    button.innerHTML = originalText;
+}
+
+async function showSlackDebug() {
+    try {
+        const response = await fetch('/debug/slack');
+        const result = await response.json();
+
+        let debugMessage = '🔍 Slack設定デバッグ情報:\n\n';
+        debugMessage += `Slack通知有効: ${result.debug_info.enabled}\n`;
+        debugMessage += `Webhook URL設定: ${result.debug_info.has_webhook_url}\n`;
+        debugMessage += `Bot Token設定: ${result.debug_info.has_bot_token}\n`;
+        debugMessage += `チャンネル設定: ${result.debug_info.channel}\n`;
+
+        if (result.debug_info.available_channels) {
+            debugMessage += '\n📋 利用可能チャンネル:\n';
+            result.debug_info.available_channels.slice(0, 5).forEach(ch => {
+                debugMessage += `  - ${ch.name} (ID: ${ch.id})\n`;
+            });
+        }
+
+        if (result.debug_info.target_channel_found !== undefined) {
+            debugMessage += `\n🎯 指定チャンネル存在: ${result.debug_info.target_channel_found}\n`;
+            if (result.debug_info.target_channel_info) {
+                debugMessage += `   名前: ${result.debug_info.target_channel_info.name}\n`;
+                debugMessage += `   ID: ${result.debug_info.target_channel_info.id}\n`;
+            }
+        }
+
+        if (result.debug_info.channels_error) {
+            debugMessage += `\n❌ チャンネル取得エラー: ${result.debug_info.channels_error}\n`;
+        }
+
+        alert(debugMessage);
+    } catch (error) {
+        alert('デバッグ情報取得エラー: ' + error.message);
+    }
+}
+
+async function showPreservationTest() {
+    try {
+        const response = await fetch('/debug/email-preservation-test');
+        const result = await response.json();
+
+        let testMessage = '🧪 メール状態保持テスト結果:\n\n';
+
+        // 完了済みメール
+        testMessage += `✅ 完了済みメール: ${result.preservation_test.completed_count}件\n`;
+        if (result.completed_emails.length > 0) {
+            testMessage += '\n最近完了したメール（最大5件）:\n';
+            result.completed_emails.forEach((email, index) => {
+                testMessage += `   ${index + 1}. ${email.subject}\n`;
+                testMessage += `      完了日時: ${email.completed_at ? email.completed_at.slice(0,16) : 'N/A'}\n`;
+            });
+        }
+
+        // 重複チェック
+        testMessage += `\n🔍 重複メール検出: ${result.preservation_test.has_duplicates ? 'あり' : 'なし'}\n`;
+        if (result.duplicate_emails.length > 0) {
+            testMessage += '重複メール一覧:\n';
+            result.duplicate_emails.forEach(dup => {
+                testMessage += `   ID: ${dup.id} (重複数: ${dup.count})\n`;
+            });
+        }
+
+        // 最近の処理
+        testMessage += `\n📧 最近処理されたメール（最大5件）:\n`;
+        result.recent_processed.slice(0, 5).forEach((email, index) => {
+            const statusEmoji = email.status === 'pending' ? '📋' : '✅';
+            testMessage += `   ${index + 1}. ${statusEmoji} ${email.subject}\n`;
+            testMessage += `      ID: ${email.id}\n`;
+        });
+
+        // 問題の診断
+        testMessage += '\n🔬 診断結果:\n';
+        if (result.preservation_test.has_duplicates) {
+            testMessage += '⚠️  重複メールが検出されました。メールIDの一意性に問題がある可能性があります。\n';
+        } else {
+            testMessage += '✅ メールIDは一意です。\n';
+        }
+
+        if (result.preservation_test.completed_count > 0) {
+            testMessage += '✅ 完了済みメールが存在します。\n';
+            testMessage += '   次回の「実行」ボタンクリック時に、これらのメールが未対応に戻らないかテストしてください。\n';
+        } else {
+            testMessage += '📝 完了済みメールがありません。\n';
+            testMessage += '   テストするには、まずメールを完了マークしてください。\n';
+        }
+
+        alert(testMessage);
+    } catch (error) {
+        alert('状態保持テストエラー: ' + error.message);
+    }
+}
+
+async function showEmailStatus() {
+    try {
+        const response = await fetch('/debug/email-status');
+        const result = await response.json();
+
+        let statusMessage = '📊 メール状態統計:\n\n';
+
+        // ステータス分布
+        statusMessage += '📈 ステータス分布:\n';
+        for (const [status, count] of Object.entries(result.status_distribution)) {
+            const statusEmoji = status === 'pending' ? '📋' : status === 'completed' ? '✅' : '❓';
+            statusMessage += `   ${statusEmoji} ${status}: ${count}件\n`;
+        }
+
+        // 完了済み統計
+        if (result.completed_statistics.total_completed > 0) {
+            statusMessage += `\n✅ 完了済み統計:\n`;
+            statusMessage += `   総件数: ${result.completed_statistics.total_completed}件\n`;
+            if (result.completed_statistics.first_completed) {
+                statusMessage += `   最初の完了: ${result.completed_statistics.first_completed.slice(0,16)}\n`;
+            }
+            if (result.completed_statistics.last_completed) {
+                statusMessage += `   最新の完了: ${result.completed_statistics.last_completed.slice(0,16)}\n`;
+            }
+        }
+
+        // 最近のメール
+        statusMessage += `\n📧 最近の処理メール（上位5件）:\n`;
+        result.recent_emails.slice(0, 5).forEach((email, index) => {
+            const statusEmoji = email.status === 'pending' ? '📋' : '✅';
+            statusMessage += `   ${index + 1}. ${statusEmoji} ${email.subject}\n`;
+        });
+
+        alert(statusMessage);
+    } catch (error) {
+        alert('メール状態確認エラー: ' + error.message);
+    }
+}
+
+function viewCategory(category) {
+    window.location.href = `/category/${encodeURIComponent(category)}`;
+}
+
+// 🤖 チャットボット機能
+class ProfessorChatBot {
+    constructor() {
+        this.isOpen = false;
+        this.messages = [];
+        this.init();
+    }
+
+    init() {
+        // 初回メッセージ
+        this.messages = [{
+            type: 'assistant',
+            content: '🎓 こんにちは！ProfMail AIアシスタントです。\n\n今日のメール状況を確認したり、特定のメールを検索したりできます。\n\n例：「今日やるべきことは？」「高優先度のメールを見せて」「論文査読のメールは？」',
+            timestamp: new Date()
+        }];
+    }
+
+    toggle() {
+        const popup = document.getElementById('chat-popup');
+        if (this.isOpen) {
+            popup.classList.remove('open');
+            this.isOpen = false;
+        } else {
+            popup.classList.add('open');
+            this.isOpen = true;
+            this.renderMessages();
+            document.getElementById('chat-input').focus();
+        }
+    }
+
+    async sendMessage() {
+        const input = document.getElementById('chat-input');
+        const message = input.value.trim();
+
+        if (!message) return;
+
+        // ユーザーメッセージを追加
+        this.messages.push({
+            type: 'user',
+            content: message,
+            timestamp: new Date()
+        });
+
+        input.value = '';
+        this.renderMessages();
+        this.showTyping();
+
+        try {
+            // APIにメッセージ送信
+            const response = await fetch('/chat', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ message: message })
+            });
+
+            const result = await response.json();
+
+            this.hideTyping();
+
+            if (result.success) {
+                this.messages.push({
+                    type: 'assistant',
+                    content: result.response,
+                    timestamp: new Date()
+                });
+            } else {
+                this.messages.push({
+                    type: 'assistant',
+                    content: '申し訳ございません。エラーが発生しました。',
+                    timestamp: new Date()
+                });
+            }
+
+            this.renderMessages();
+
+        } catch (error) {
+            this.hideTyping();
+            this.messages.push({
+                type: 'assistant',
+                content: 'ネットワークエラーが発生しました。しばらく後で再試行してください。',
+                timestamp: new Date()
+            });
+            this.renderMessages();
+        }
+    }
+
+    renderMessages() {
+        const container = document.getElementById('chat-messages');
+        container.innerHTML = '';
+
+        this.messages.forEach(msg => {
+            const messageDiv = document.createElement('div');
+            messageDiv.className = `chat-message ${msg.type}`;
+
+            const bubbleDiv = document.createElement('div');
+            bubbleDiv.className = `chat-bubble ${msg.type}`;
+            bubbleDiv.innerHTML = msg.content.replace(/\n/g, '<br>');
+
+            messageDiv.appendChild(bubbleDiv);
+            container.appendChild(messageDiv);
+        });
+
+        // 最新メッセージまでスクロール
+        container.scrollTop = container.scrollHeight;
+    }
+
+    showTyping() {
+        document.getElementById('chat-typing').classList.add('show');
+        const container = document.getElementById('chat-messages');
+        container.scrollTop = container.scrollHeight;
+    }
+
+    hideTyping() {
+        document.getElementById('chat-typing').classList.remove('show');
+    }
+
+    handleKeyPress(event) {
+        if (event.key === 'Enter' && !event.shiftKey) {
+            event.preventDefault();
+            this.sendMessage();
+        }
+    }
+}
+
+// グローバルチャットボットインスタンス
+let chatBot;
+
+// ページ読み込み時にチャットボット初期化
+document.addEventListener('DOMContentLoaded', function() {
+    chatBot = new ProfessorChatBot();
+});
+
+// グローバル関数
+function toggleChat() {
+    if (chatBot) chatBot.toggle();
+}
+
+function sendChatMessage() {
+    if (chatBot) chatBot.sendMessage();
+}
+
+function handleChatKeyPress(event) {
+    if (chatBot) chatBot.handleKeyPress(event);
+}
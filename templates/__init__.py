@@ -5,12 +5,23 @@ from .html_generator import (
     generate_email_cards,
     generate_category_list,
     generate_completed_email_rows,
-    generate_email_table_rows
+    generate_completed_email_row,
+    generate_email_table_rows,
+    generate_email_table_row,
+    generate_run_rows,
+    generate_run_phase_legend
 )
+from .fragment_cache import FragmentCache, email_card_cache
 
 __all__ = [
     'generate_email_cards',
     'generate_category_list',
     'generate_completed_email_rows',
-    'generate_email_table_rows'
+    'generate_completed_email_row',
+    'generate_email_table_rows',
+    'generate_email_table_row',
+    'generate_run_rows',
+    'generate_run_phase_legend',
+    'FragmentCache',
+    'email_card_cache'
 ]
\ No newline at end of file
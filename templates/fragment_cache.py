@@ -0,0 +1,107 @@
+"""
+描画済みHTMLフラグメントのLRUキャッシュ
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from config import CARD_CACHE_MAX_ENTRIES
+from utils.metrics import metrics
+
+
+class FragmentCache:
+    """(メールID, processed_at, status) をキーにした描画結果のLRUキャッシュ
+
+    同じメールIDで新しいキーが保存されると古いエントリは破棄される
+    （再分析で processed_at が変わった場合など）。
+    """
+
+    def __init__(self, max_entries: int = CARD_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[Hashable, ...], str]' = OrderedDict()
+        self._keys_by_id: Dict[Hashable, Tuple[Hashable, ...]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[str]:
+        """キャッシュ取得（ヒット時はLRU順を更新）"""
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def set(self, key: Tuple[Hashable, ...], html: str):
+        """キャッシュ保存（容量超過時は最も古いエントリを破棄）"""
+        email_id = key[0]
+        with self._lock:
+            old_key = self._keys_by_id.get(email_id)
+            if old_key is not None and old_key != key:
+                self._entries.pop(old_key, None)
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            self._keys_by_id[email_id] = key
+
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                if self._keys_by_id.get(evicted_key[0]) == evicted_key:
+                    del self._keys_by_id[evicted_key[0]]
+                self.evictions += 1
+
+    def invalidate(self, email_id: Hashable) -> bool:
+        """メールIDに紐づくエントリを破棄（ステータス変更・削除時）"""
+        with self._lock:
+            key = self._keys_by_id.pop(email_id, None)
+            if key is None:
+                return False
+            self._entries.pop(key, None)
+            self.invalidations += 1
+            return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """全エントリ破棄"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュ統計"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+# メールカード用のキャッシュ（プロセス内で共有）
+email_card_cache = FragmentCache()
+
+metrics.callback(
+    'profmail_fragment_cache_requests_total', 'HTMLフラグメントキャッシュの参照回数', 'counter',
+    lambda: {('email_cards', 'hit'): email_card_cache.hits, ('email_cards', 'miss'): email_card_cache.misses},
+    ['cache', 'result']
+)
+metrics.callback(
+    'profmail_fragment_cache_evictions_total', 'HTMLフラグメントキャッシュの追い出し回数', 'counter',
+    lambda: {('email_cards',): email_card_cache.evictions},
+    ['cache']
+)
+metrics.callback(
+    'profmail_fragment_cache_entries', 'HTMLフラグメントキャッシュのエントリ数', 'gauge',
+    lambda: {('email_cards',): len(email_card_cache)},
+    ['cache']
+)
@@ -1,110 +1,128 @@
 """
 HTML生成関数
 """
+from html import escape
 from typing import List, Dict, Any
 from utils.helpers import truncate_text
+from utils.markdown import render_markdown
+from templates.fragment_cache import email_card_cache
 
 def generate_email_cards(emails: List[Dict[str, Any]]) -> str:
-    """メールカード生成"""
+    """メールカード生成（描画済みカードはキャッシュから再利用）"""
     if not emails:
         return '<div class="email-card"><div class="email-header"><p>📭 このカテゴリにはメールがありません</p></div></div>'
     
     cards = []
     for email in emails:
-        reply_section = ""
-        reply_draft = email.get("reply_draft", "")
-        email_id = email.get("id", "")
-        if reply_draft:
-            # マークダウンを簡易HTMLに変換（基本的な変換のみ）
-            reply_html = (reply_draft
-                .replace('\n### ', '<br><h4>')
-                .replace('\n## ', '<br><h3>')
-                .replace('\n# ', '<br><h2>')
-                .replace('**', '<strong>', 1).replace('**', '</strong>', 1)
-                .replace('- ', '<br>• ')
-                .replace('\n', '<br>'))
-            
-            # HTMLタグを閉じる
-            reply_html = reply_html.replace('<h4>', '<h4>').replace('<h3>', '<h3>').replace('<h2>', '<h2>')
-            
-            # シンプルな表示：文章 + コピーボタン
-            reply_section = f'''<div class="reply-preview">
-                <h5>🤖 AI返信草案</h5>
-                <div class="reply-text">{reply_html}</div>
-                <div style="margin-top: 15px;">
-                    <button class="copy-btn-unified" onclick="copyEmailDraft('{email_id}')">
-                        <span class="icon">📋</span>
-                        <span>返信草案をコピー</span>
-                    </button>
-                </div>
-                <!-- 隠しテキストエリア（コピー用） -->
-                <textarea id="markdown-textarea-{email_id}" style="display: none;">{reply_draft}</textarea>
-            </div>'''
+        email_id = email.get("id")
+        processed_at = email.get("processed_at")
+        if not email_id or not processed_at:
+            cards.append(_render_email_card(email))
+            continue
         
-        sender = email.get("sender", "Unknown")
-        sender_display = truncate_text(sender, 60)
-        
-        subject = email.get("subject", "No Subject")
-        
-        # メール本文表示の改善
-        summary = email.get("summary", "")
-        body = email.get("body", "")
-        
-        if summary and summary != "メール内容を分析中...":
-            # AI分析済みの場合はsummaryを表示
-            content_display = summary
-        elif body:
-            # AI分析前の場合はメール本文のプレビューを表示
-            body_preview = body.replace('\n', ' ').replace('\r', ' ').strip()
-            content_display = truncate_text(body_preview, 150)
-        else:
-            content_display = "メール内容を取得中..."
-        
-        priority = email.get("priority", "中")
-        urgency_score = email.get("urgency_score", 5)
-        date = email.get("date", "Unknown Date")
-        gmail_link = email.get("gmail_link", "#")
-        
-        # メールのステータスに応じてアクションボタンを変更
-        status = email.get("status", "pending")
-        
-        if status == "completed":
-            # 完了済みメールの場合
-            action_buttons = f'''
-                <a href="{gmail_link}" target="_blank" class="btn btn-primary">📧 Gmailで開く</a>
-                <span class="btn btn-completed" style="cursor: default;">✅ 完了済み</span>
-                <button onclick="deleteEmail('{email_id}')" class="btn btn-danger">🗑️ 削除</button>
-            '''
-        else:
-            # 未対応メールの場合
-            action_buttons = f'''
-                <a href="{gmail_link}" target="_blank" class="btn btn-primary">📧 Gmailで開く</a>
-                <button onclick="markCompleted('{email_id}')" class="btn btn-success">✅ 完了</button>
-                <button onclick="deleteEmail('{email_id}')" class="btn btn-danger">🗑️ 削除</button>
-            '''
+        cache_key = (email_id, processed_at, email.get("status", "pending"))
+        card = email_card_cache.get(cache_key)
+        if card is None:
+            card = _render_email_card(email)
+            email_card_cache.set(cache_key, card)
+        cards.append(card)
+    
+    return ''.join(cards)
+
+
+def _render_email_card(email: Dict[str, Any]) -> str:
+    """メールカード1件を描画"""
+    reply_section = ""
+    reply_draft = email.get("reply_draft", "")
+    email_id = email.get("id", "")
+    if reply_draft:
+        # 取り込み時に生成済みのHTMLを優先（未生成の旧データのみここで変換）
+        reply_html = email.get("reply_html") or render_markdown(reply_draft)
         
-        card = f'''<div class="email-card">
-            <div class="email-header priority-{priority.lower()}">
-                <div class="email-subject">{subject}</div>
-                <div class="email-meta">
-                    From: {sender_display}<br>
-                    Date: {date[:25]}<br>
-                    Priority: {priority} 
-                    <span class="urgency-score">緊急度: {urgency_score}/10</span>
-                </div>
-                <div class="email-summary">
-                    {content_display}
-                </div>
-                {reply_section}
-            </div>
-            
-            <div class="email-actions">
-                {action_buttons}
+        # シンプルな表示：文章 + コピーボタン
+        reply_section = f'''<div class="reply-preview">
+            <h5>🤖 AI返信草案</h5>
+            <div class="reply-text">{reply_html}</div>
+            <div style="margin-top: 15px;">
+                <button class="copy-btn-unified" onclick="copyEmailDraft('{email_id}')">
+                    <span class="icon">📋</span>
+                    <span>返信草案をコピー</span>
+                </button>
             </div>
+            <!-- 隠しテキストエリア（コピー用） -->
+            <textarea id="markdown-textarea-{email_id}" style="display: none;">{escape(reply_draft)}</textarea>
         </div>'''
-        cards.append(card)
     
-    return ''.join(cards)
+    sender = email.get("sender", "Unknown")
+    sender_display = truncate_text(sender, 60)
+    
+    subject = email.get("subject", "No Subject")
+    
+    # メール本文表示の改善
+    summary = email.get("summary", "")
+    body = email.get("body") or email.get("body_preview", "")
+    
+    if summary and summary != "メール内容を分析中...":
+        # AI分析済みの場合はsummaryを表示
+        content_display = summary
+    elif body:
+        # AI分析前の場合はメール本文のプレビューを表示
+        body_preview = body.replace('\n', ' ').replace('\r', ' ').strip()
+        content_display = truncate_text(body_preview, 150)
+    else:
+        content_display = "メール内容を取得中..."
+    
+    priority = email.get("priority", "中")
+    urgency_score = email.get("urgency_score", 5)
+    date = email.get("date", "Unknown Date")
+    gmail_link = email.get("gmail_link", "#")
+    
+    # メールのステータスに応じてアクションボタンを変更
+    status = email.get("status", "pending")
+    
+    if status == "completed":
+        # 完了済みメールの場合
+        action_buttons = f'''
+            <a href="{gmail_link}" target="_blank" class="btn btn-primary">📧 Gmailで開く</a>
+            <span class="btn btn-completed" style="cursor: default;">✅ 完了済み</span>
+            <button onclick="deleteEmail('{email_id}')" class="btn btn-danger">🗑️ 削除</button>
+        '''
+    else:
+        # 未対応メールの場合
+        action_buttons = f'''
+            <a href="{gmail_link}" target="_blank" class="btn btn-primary">📧 Gmailで開く</a>
+            <button onclick="markCompleted('{email_id}')" class="btn btn-success">✅ 完了</button>
+            <button onclick="deleteEmail('{email_id}')" class="btn btn-danger">🗑️ 削除</button>
+        '''
+    
+    card = f'''<div class="email-card" data-email-id="{email_id}">
+        <div class="email-header priority-{priority.lower()}">
+            <div class="email-subject">{subject}</div>
+            <div class="email-meta">
+                From: {sender_display}<br>
+                Date: {date[:25]}<br>
+                Priority: {priority} 
+                <span class="urgency-score">緊急度: {urgency_score}/10</span>
+            </div>
+            <div class="email-summary">
+                {content_display}
+            </div>
+            {reply_section}
+        </div>
+        
+        <div class="email-actions">
+            {_email_select_checkbox(email_id)}
+            {action_buttons}
+        </div>
+    </div>'''
+    return card
+
+
+def _email_select_checkbox(email_id: str) -> str:
+    """一括操作用の選択チェックボックス"""
+    return (f'<label class="email-select-label"><input type="checkbox" class="email-select" '
+            f'value="{escape(email_id)}" onchange="updateBulkBar()"></label>')
+
 
 def generate_category_list(categories: Dict[str, str], stats: Dict[str, Any]) -> str:
     """カテゴリリスト生成"""
@@ -116,7 +134,7 @@ def generate_category_list(categories: Dict[str, str], stats: Dict[str, Any]) ->
         item = f'''<li class="category-item" onclick="viewCategory('{category}')">
             <span class="category-icon">{icon}</span>
             {category}
-            <span class="{count_class}">{count}</span>
+            <span class="{count_class}" data-category-count="{category}">{count}</span>
         </li>'''
         items.append(item)
     return ''.join(items)
@@ -127,32 +145,33 @@ def generate_completed_email_rows(emails: List[Dict[str, Any]]) -> str:
     if not emails:
         return '<tr><td colspan="5" style="text-align: center; padding: 40px;">📭 完了済みメールがありません</td></tr>'
     
-    rows = []
-    for email in emails:
-        subject = email.get("subject", "No Subject")
-        sender = email.get("sender", "Unknown")
-        category = email.get("category", "その他")
-        completed_at = email.get("completed_at", "Unknown")
-        gmail_link = email.get("gmail_link", "#")
-        
-        subject_display = truncate_text(subject, 50)
-        sender_display = truncate_text(sender, 30)
-        completed_display = completed_at[:19] if completed_at != "Unknown" else "未記録"
-        
-        row = f'''<tr class="completed-item">
-            <td><strong>{subject_display}</strong><br>
-                <span class="completed-badge">完了済み</span>
-            </td>
-            <td>{sender_display}</td>
-            <td><span class="category-badge">{category}</span></td>
-            <td>{completed_display}</td>
-            <td>
-                <a href="{gmail_link}" target="_blank" class="btn btn-primary">Gmail</a>
-            </td>
-        </tr>'''
-        rows.append(row)
+    return ''.join(generate_completed_email_row(email) for email in emails)
+
+
+def generate_completed_email_row(email: Dict[str, Any]) -> str:
+    """完了メール1行生成（ストリーミング応答からも使用）"""
+    subject = email.get("subject", "No Subject")
+    sender = email.get("sender", "Unknown")
+    category = email.get("category", "その他")
+    completed_at = email.get("completed_at") or "Unknown"
+    gmail_link = email.get("gmail_link", "#")
     
-    return ''.join(rows)
+    subject_display = truncate_text(subject, 50)
+    sender_display = truncate_text(sender, 30)
+    completed_display = completed_at[:19] if completed_at != "Unknown" else "未記録"
+    
+    row = f'''<tr class="completed-item" data-email-id="{email.get("id", "")}">
+        <td><strong>{subject_display}</strong><br>
+            <span class="completed-badge">完了済み</span>
+        </td>
+        <td>{sender_display}</td>
+        <td><span class="category-badge">{category}</span></td>
+        <td>{completed_display}</td>
+        <td>
+            <a href="{gmail_link}" target="_blank" class="btn btn-primary">Gmail</a>
+        </td>
+    </tr>'''
+    return row
 
 
 def generate_email_table_rows(emails: List[Dict[str, Any]]) -> str:
@@ -160,54 +179,103 @@ def generate_email_table_rows(emails: List[Dict[str, Any]]) -> str:
     if not emails:
         return '<tr><td colspan="6" style="text-align: center; padding: 40px;">📭 メールがありません</td></tr>'
     
+    return ''.join(generate_email_table_row(email) for email in emails)
+
+
+def generate_email_table_row(email: Dict[str, Any]) -> str:
+    """メールテーブル1行生成（ストリーミング応答からも使用）"""
+    subject = email.get("subject", "No Subject")
+    
+    # メール本文表示の改善
+    summary = email.get("summary", "")
+    body = email.get("body") or email.get("body_preview", "")
+    
+    if summary and summary != "メール内容を分析中...":
+        # AI分析済みの場合はsummaryを表示
+        content_display = summary
+    elif body:
+        # AI分析前の場合はメール本文のプレビューを表示
+        body_preview = body.replace('\n', ' ').replace('\r', ' ').strip()
+        content_display = truncate_text(body_preview, 60)
+    else:
+        content_display = "メール内容を取得中..."
+    
+    sender = email.get("sender", "Unknown")
+    category = email.get("category", "その他")
+    priority = email.get("priority", "中")
+    urgency_score = email.get("urgency_score", 5)
+    gmail_link = email.get("gmail_link", "#")
+    
+    # 文字数制限を調整（固定幅に合わせて）
+    subject_display = truncate_text(subject, 35)
+    content_display = truncate_text(content_display, 50)
+    sender_display = truncate_text(sender, 20)
+    
+    # HTMLエスケープ処理
+    subject_escaped = subject.replace('"', '&quot;').replace("'", "&#39;")
+    content_escaped = content_display.replace('"', '&quot;').replace("'", "&#39;")
+    sender_escaped = sender.replace('"', '&quot;').replace("'", "&#39;")
+    
+    row = f'''<tr class="priority-{priority.lower()}" data-email-id="{email.get("id", "")}">
+        <td>
+            {_email_select_checkbox(email.get("id", ""))}
+            <strong class="subject-cell" title="{subject_escaped}">{subject_display}</strong>
+            <small class="subject-preview" title="{content_escaped}">{content_display}</small>
+        </td>
+        <td class="sender-cell" title="{sender_escaped}">{sender_display}</td>
+        <td><span class="category-badge">{category}</span></td>
+        <td>{priority}</td>
+        <td>{urgency_score}/10</td>
+        <td>
+            <a href="{gmail_link}" target="_blank" class="btn btn-primary">Gmail</a>
+            <button onclick="location.href='/category/{category}'" class="btn btn-success">詳細</button>
+        </td>
+    </tr>'''
+    return row
+
+
+# 実行履歴の段階ごとの表示色
+RUN_PHASE_COLORS = {
+    'fetch': '#4a90e2',
+    'prefilter': '#9b59b6',
+    'analyze': '#e67e22',
+    'save': '#27ae60',
+    'notify': '#16a085'
+}
+
+
+def generate_run_rows(runs: List[Dict[str, Any]]) -> str:
+    """実行履歴テーブル行生成（段階別の所要時間を最長の実行に対する積み上げバーで表示）"""
+    if not runs:
+        return '<tr><td colspan="6">📭 実行履歴がありません</td></tr>'
+    
+    longest_ms = max((run.get('duration_ms') or 0) for run in runs) or 1
     rows = []
-    for email in emails:
-        subject = email.get("subject", "No Subject")
-        
-        # メール本文表示の改善
-        summary = email.get("summary", "")
-        body = email.get("body", "")
-        
-        if summary and summary != "メール内容を分析中...":
-            # AI分析済みの場合はsummaryを表示
-            content_display = summary
-        elif body:
-            # AI分析前の場合はメール本文のプレビューを表示
-            body_preview = body.replace('\n', ' ').replace('\r', ' ').strip()
-            content_display = truncate_text(body_preview, 60)
-        else:
-            content_display = "メール内容を取得中..."
-        
-        sender = email.get("sender", "Unknown")
-        category = email.get("category", "その他")
-        priority = email.get("priority", "中")
-        urgency_score = email.get("urgency_score", 5)
-        gmail_link = email.get("gmail_link", "#")
-        
-        # 文字数制限を調整（固定幅に合わせて）
-        subject_display = truncate_text(subject, 35)
-        content_display = truncate_text(content_display, 50)
-        sender_display = truncate_text(sender, 20)
-        
-        # HTMLエスケープ処理
-        subject_escaped = subject.replace('"', '&quot;').replace("'", "&#39;")
-        content_escaped = content_display.replace('"', '&quot;').replace("'", "&#39;")
-        sender_escaped = sender.replace('"', '&quot;').replace("'", "&#39;")
-        
-        row = f'''<tr class="priority-{priority.lower()}">
-            <td>
-                <strong class="subject-cell" title="{subject_escaped}">{subject_display}</strong>
-                <small class="subject-preview" title="{content_escaped}">{content_display}</small>
-            </td>
-            <td class="sender-cell" title="{sender_escaped}">{sender_display}</td>
-            <td><span class="category-badge">{category}</span></td>
-            <td>{priority}</td>
-            <td>{urgency_score}/10</td>
-            <td>
-                <a href="{gmail_link}" target="_blank" class="btn btn-primary">Gmail</a>
-                <button onclick="location.href='/category/{category}'" class="btn btn-success">詳細</button>
-            </td>
-        </tr>'''
-        rows.append(row)
-    
-    return ''.join(rows)
\ No newline at end of file
+    for run in runs:
+        phases = run.get('phase_timings') or {}
+        segments = ''.join(
+            f'<span class="run-bar-segment" style="width: {ms / longest_ms * 100:.2f}%; background: {color};" '
+            f'title="{phase}: {ms / 1000:.2f}秒"></span>'
+            for phase, color in RUN_PHASE_COLORS.items()
+            for ms in [phases.get(phase, 0)]
+            if ms > 0
+        )
+        status_icon = '✅' if run.get('status') == 'success' else '❌'
+        error_message = run.get('error_message') or ''
+        rows.append(f'''<tr data-run-id="{run.get("id")}">
+            <td>{escape(str(run.get("execution_time", ""))[:19])}<br><small>{escape(run.get("trigger") or "")}</small></td>
+            <td title="{escape(error_message)}">{status_icon} {run.get("error_count") or 0}</td>
+            <td>{(run.get("duration_ms") or 0) / 1000:.1f}秒</td>
+            <td>{run.get("emails_fetched") or 0} / {run.get("emails_categorized") or 0} / {run.get("emails_skipped") or 0}</td>
+            <td>{(run.get("prompt_tokens") or 0) + (run.get("completion_tokens") or 0):,}</td>
+            <td><div class="run-bar">{segments}</div></td>
+        </tr>''')
+    return ''.join(rows)
+
+
+def generate_run_phase_legend() -> str:
+    """実行履歴バーの凡例"""
+    return ''.join(
+        f'<span class="run-legend-item"><span class="run-bar-segment" style="background: {color};"></span>{phase}</span>'
+        for phase, color in RUN_PHASE_COLORS.items()
+    )
@@ -0,0 +1,25 @@
+"""
+テスト共通設定（リポジトリ直下をインポートパスに追加、一時ディレクトリのSQLite）
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import ProfessorEmailDatabase  # noqa: E402
+
+
+def reset_singleton(cls):
+    """シングルトンを作り直せるようにする"""
+    cls._instance = None
+    cls._initialized = False
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """テストごとに空の SQLite 保存先"""
+    reset_singleton(ProfessorEmailDatabase)
+    yield ProfessorEmailDatabase(str(tmp_path / 'emails.db'), shard_dir=str(tmp_path / 'shards'))
+    reset_singleton(ProfessorEmailDatabase)
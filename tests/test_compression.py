@@ -0,0 +1,45 @@
+"""
+models.compression のテスト（圧縮・展開の往復）
+"""
+import pytest
+
+from models.compression import (
+    COMPRESSED_EMAIL_FIELDS, MIN_COMPRESS_BYTES, compress_text, decompress_columns, decompress_text
+)
+
+
+@pytest.mark.parametrize('text', [
+    '先生、来週のゼミの資料を添付します。ご確認よろしくお願いいたします。\n' * 20,
+    'Dear Professor, please find attached the draft of my thesis chapter. ' * 20,
+    '混在 mixed テキスト 🎓 with emoji and 記号 <>&"\'\n' * 30,
+])
+def test_round_trip(text):
+    packed = compress_text(text)
+    assert isinstance(packed, bytes)
+    assert len(packed) < len(text.encode('utf-8'))
+    assert decompress_text(packed) == text
+
+
+@pytest.mark.parametrize('value', [None, '', 'short', 'あ' * (MIN_COMPRESS_BYTES // 3 - 1)])
+def test_small_values_stay_plain(value):
+    assert compress_text(value) == value
+    assert decompress_text(value) == value
+
+
+def test_incompressible_text_stays_plain():
+    text = ''.join(chr(0x4E00 + (i * 7919) % 20000) for i in range(200))
+    packed = compress_text(text)
+    assert decompress_text(packed) == text
+
+
+def test_decompress_accepts_memoryview():
+    text = 'ご連絡ありがとうございます。' * 20
+    assert decompress_text(memoryview(compress_text(text))) == text
+
+
+def test_decompress_columns_only_touches_selected_fields():
+    body = '本文です。' * 50
+    email = {'id': 'm1', 'body': compress_text(body), 'subject': '件名'}
+    assert decompress_columns(email) == {'id': 'm1', 'body': body, 'subject': '件名'}
+    assert 'reply_draft' in COMPRESSED_EMAIL_FIELDS
+    assert 'reply_draft' not in email
@@ -0,0 +1,54 @@
+"""
+utils.markdown のテスト（エスケープと危険なURLの除外）
+"""
+import pytest
+
+from utils.markdown import render_inline
+
+
+def test_plain_text_is_escaped():
+    assert render_inline('<script>alert("x")</script>') == '&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt;'
+
+
+def test_inline_markup():
+    assert render_inline('**重要** と `a<b`') == '<strong>重要</strong> と <code>a&lt;b</code>'
+
+
+def test_markup_contents_are_escaped():
+    assert render_inline('**<img src=x onerror=alert(1)>**') == \
+        '<strong>&lt;img src=x onerror=alert(1)&gt;</strong>'
+
+
+def test_safe_link():
+    assert render_inline('[資料](https://example.ac.jp/a?x=1&y=2)') == \
+        '<a href="https://example.ac.jp/a?x=1&amp;y=2" target="_blank" rel="noopener">資料</a>'
+
+
+def test_link_label_and_url_are_escaped():
+    html = render_inline('[<b>x</b>](https://example.ac.jp/"onmouseover="alert(1))')
+    assert '<b>' not in html
+    assert '"onmouseover' not in html
+    assert 'href="https://example.ac.jp/&quot;onmouseover=&quot;alert(1"' in html
+
+
+@pytest.mark.parametrize('url', [
+    'javascript:alert(1)',
+    'JavaScript:alert(1)',
+    'data:text/html;base64,PHNjcmlwdD4=',
+    'vbscript:msgbox(1)',
+    '//evil.example.com',
+    'https://example.ac.jp/a b',
+])
+def test_unsafe_urls_are_not_linked(url):
+    html = render_inline(f'[click]({url})')
+    assert '<a ' not in html
+    assert 'href' not in html
+
+
+def test_overlong_url_is_not_linked():
+    assert '<a ' not in render_inline(f"[x](https://example.ac.jp/{'a' * 3000})")
+
+
+def test_unclosed_markers_are_literal():
+    text = '**' * 1000 + '[' * 1000 + '`'
+    assert render_inline(text) == text
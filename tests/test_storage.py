@@ -0,0 +1,177 @@
+"""
+保存先（EmailStorage）の共通テスト
+
+SQLite は常に、PostgreSQL は PROFMAIL_DATABASE_URL が設定されているときだけ同じテストを走らせる。
+"""
+import pytest
+
+from config import DATABASE_URL
+from models.database import SQLITE_IN_CHUNK_SIZE
+from conftest import reset_singleton
+
+MAILBOX = 'prof-a'
+OTHER_MAILBOX = 'prof-b'
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def storage(request):
+    """テストごとに空の保存先（シングルトンを作り直す）"""
+    if request.param == 'sqlite':
+        yield request.getfixturevalue('sqlite_db')
+        return
+
+    if not DATABASE_URL:
+        pytest.skip("PROFMAIL_DATABASE_URL が設定されていません")
+    from models.postgres import PostgresEmailDatabase
+    reset_singleton(PostgresEmailDatabase)
+    db = PostgresEmailDatabase(DATABASE_URL)
+    db._execute('TRUNCATE emails, emails_archive')
+    yield db
+    db._execute('TRUNCATE emails, emails_archive')
+    db.close()
+    reset_singleton(PostgresEmailDatabase)
+
+
+def make_email(email_id: str, mailbox: str = MAILBOX, **overrides):
+    email = {
+        'id': email_id,
+        'subject': f'件名 {email_id}',
+        'sender': 'Student',
+        'sender_email': 'student@example.ac.jp',
+        'date': 'Mon, 19 Oct 2026 09:00:00 +0900',
+        'body': '先生、来週のゼミの資料を添付します。' * 10,
+        'category': '学生対応',
+        'priority': '中',
+        'urgency_score': 5,
+        'reply_draft': 'ご連絡ありがとうございます。確認します。' * 5,
+        'summary': 'ゼミ資料の送付',
+        'mailbox': mailbox,
+    }
+    email.update(overrides)
+    return email
+
+
+def save_all(storage, *emails):
+    for email in emails:
+        assert storage.save_email(email)['success']
+
+
+def test_save_and_get(storage):
+    email = make_email('m1')
+    save_all(storage, email)
+
+    saved = storage.get_email('m1', mailbox=MAILBOX)
+    assert saved['subject'] == email['subject']
+    assert saved['body'] == email['body']
+    assert saved['reply_draft'] == email['reply_draft']
+    assert saved['status'] == 'pending'
+    assert storage.get_email('m1', fields=['id', 'subject'], mailbox=MAILBOX) == {'id': 'm1', 'subject': '件名 m1'}
+    assert storage.get_email('m1', mailbox=OTHER_MAILBOX) is None
+    assert storage.get_email('missing', mailbox=MAILBOX) is None
+
+
+def test_save_keeps_existing_status(storage):
+    save_all(storage, make_email('m1'))
+    assert storage.update_email_status('m1', 'completed', mailbox=MAILBOX)
+
+    save_all(storage, make_email('m1', subject='再取り込み'))
+    assert storage.get_email('m1', mailbox=MAILBOX)['status'] == 'completed'
+
+
+def test_get_emails_by_ids(storage):
+    save_all(storage, make_email('m1'), make_email('m2'), make_email('m3', mailbox=OTHER_MAILBOX))
+
+    emails = storage.get_emails_by_ids(['m2', 'missing', 'm1', 'm3'], fields=['subject'], mailbox=MAILBOX)
+    assert [email['id'] for email in emails] == ['m2', 'm1']
+    assert emails[0]['subject'] == '件名 m2'
+    assert storage.get_emails_by_ids([], mailbox=MAILBOX) == []
+
+
+def test_list_and_count(storage):
+    save_all(storage,
+             make_email('m1', priority='高'),
+             make_email('m2'),
+             make_email('m3'),
+             make_email('m4', mailbox=OTHER_MAILBOX))
+    storage.update_email_status('m3', 'completed', mailbox=MAILBOX)
+
+    pending = storage.list_emails(status='pending', fields=['id', 'status'], mailbox=MAILBOX)
+    assert sorted(email['id'] for email in pending) == ['m1', 'm2']
+    assert [e['id'] for e in storage.list_emails(status='pending', priority='高', mailbox=MAILBOX)] == ['m1']
+    assert len(storage.list_emails(status='pending', limit=1, mailbox=MAILBOX)) == 1
+    assert storage.count_emails(status='pending', mailbox=MAILBOX) == 2
+    assert storage.count_emails(status='completed', mailbox=MAILBOX) == 1
+    assert storage.count_emails(status='pending', mailbox=OTHER_MAILBOX) == 1
+
+
+def test_update_status_is_scoped_to_mailbox(storage):
+    save_all(storage, make_email('m1'))
+
+    assert not storage.update_email_status('m1', 'completed', mailbox=OTHER_MAILBOX)
+    assert storage.get_email('m1', mailbox=MAILBOX)['status'] == 'pending'
+    assert storage.update_email_status('m1', 'completed', mailbox=MAILBOX)
+    saved = storage.get_email('m1', mailbox=MAILBOX)
+    assert saved['status'] == 'completed'
+    assert saved['completed_at']
+
+
+def test_delete_leaves_tombstone(storage):
+    save_all(storage, make_email('m1'))
+
+    assert not storage.delete_email('m1', mailbox=OTHER_MAILBOX)
+    assert storage.delete_email('m1', mailbox=MAILBOX)
+    saved = storage.get_email('m1', mailbox=MAILBOX)
+    assert saved['status'] == 'deleted'
+    assert saved['deleted_at']
+
+    # 墓標はステータス更新でも再取り込みでも復活しない
+    assert not storage.update_email_status('m1', 'pending', mailbox=MAILBOX)
+    save_all(storage, make_email('m1'))
+    assert storage.get_email('m1', mailbox=MAILBOX)['status'] == 'deleted'
+
+
+def test_bulk_update_status(storage):
+    save_all(storage, make_email('m1'), make_email('m2', category='事務'), make_email('m3'),
+             make_email('m4', mailbox=OTHER_MAILBOX))
+    storage.delete_email('m3', mailbox=MAILBOX)
+
+    changed = storage.bulk_update_status('completed', email_ids=['m1', 'm3', 'm4'],
+                                         from_statuses=('pending', 'deleted'), mailbox=MAILBOX)
+    assert changed == ['m1']
+    assert storage.get_email('m3', mailbox=MAILBOX)['status'] == 'deleted'
+    assert storage.get_email('m4', mailbox=OTHER_MAILBOX)['status'] == 'pending'
+
+    assert storage.bulk_update_status('completed', category='事務', mailbox=MAILBOX) == ['m2']
+    assert storage.count_emails(status='completed', mailbox=MAILBOX) == 2
+
+
+def test_archive_emails(storage):
+    save_all(storage, make_email('m1'), make_email('m2'), make_email('m3'))
+    storage.update_email_status('m1', 'completed', mailbox=MAILBOX)
+    storage.delete_email('m2', mailbox=MAILBOX)
+
+    # 期限内のものは移さない
+    assert storage.archive_emails(older_than_days=30, mailbox=MAILBOX) == {}
+    # 締め切りを1日先にして、完了・削除済みのものをすべて期限切れにする
+    assert storage.archive_emails(older_than_days=-1, batch_size=1, mailbox=MAILBOX) == {MAILBOX: 2}
+
+    assert storage.get_email('m1', mailbox=MAILBOX) is None
+    assert storage.get_email('m3', mailbox=MAILBOX)['status'] == 'pending'
+    archived = storage.get_archived_email('m1', mailbox=MAILBOX)
+    assert archived['subject'] == '件名 m1'
+    assert archived['body'] == make_email('m1')['body']
+    assert storage.get_archived_email('m1', mailbox=OTHER_MAILBOX) is None
+
+
+def test_get_existing_statuses(storage):
+    save_all(storage, make_email('m1'), make_email('m2'), make_email('m3'), make_email('m4', mailbox=OTHER_MAILBOX))
+    storage.update_email_status('m1', 'completed', mailbox=MAILBOX)
+    storage.delete_email('m2', mailbox=MAILBOX)
+    storage.archive_emails(older_than_days=-1, mailbox=MAILBOX)
+
+    # バインド変数の上限をまたぐ件数・重複IDでも1回で引ける
+    ids = [f'missing-{i}' for i in range(SQLITE_IN_CHUNK_SIZE * 2)] + ['m1', 'm2', 'm3', 'm4', 'm3']
+    assert storage.get_existing_statuses(ids, mailbox=MAILBOX) == {
+        'm1': 'completed', 'm2': 'deleted', 'm3': 'pending'
+    }
+    assert storage.get_existing_statuses([], mailbox=MAILBOX) == {}
@@ -0,0 +1,64 @@
+"""
+逐次送信する一覧ページ（/completed・/all）が gzip 圧縮下でも先頭をすぐ送ることのテスト
+"""
+import zlib
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.events import EventStreamGZipMiddleware
+from api.routes import create_routes
+from config import GZIP_MINIMUM_SIZE
+
+EMAIL_COUNT = 6
+
+
+@pytest.fixture
+def app(sqlite_db):
+    for i in range(EMAIL_COUNT):
+        sqlite_db.save_email({
+            'id': f'm{i:04d}', 'subject': f'件名 {i}', 'sender': 'Student', 'sender_email': 'student@example.ac.jp',
+            'date': 'Mon, 19 Oct 2026 09:00:00 +0900', 'body': '本文', 'category': '学生対応', 'priority': '中',
+            'urgency_score': 5, 'reply_draft': '', 'summary': '要約', 'mailbox': 'default',
+        })
+        if i % 2:
+            sqlite_db.update_email_status(f'm{i:04d}', 'completed')
+    app = FastAPI()
+    app.add_middleware(EventStreamGZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+    create_routes(app, SimpleNamespace(get_database=lambda: sqlite_db))
+    return app
+
+
+def record_body_messages(app, messages):
+    """送信された http.response.body を記録する（TestClient は本文をまとめて返すため）"""
+    async def recorder(scope, receive, send):
+        async def record(message):
+            if message['type'] == 'http.response.body':
+                messages.append(message)
+            await send(message)
+        await app(scope, receive, record)
+    return recorder
+
+
+@pytest.mark.parametrize('path, title', [('/completed', '完了済みメール'), ('/all', 'すべてのメール')])
+def test_first_gzip_chunk_contains_page_head(app, path, title):
+    messages = []
+    client = TestClient(record_body_messages(app, messages))
+    response = client.get(path, params={'limit': 0}, headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert len(messages) > 2
+
+    # 最初のチャンクだけで head からテーブルの見出しまで展開できる
+    first = zlib.decompressobj(wbits=31).decompress(messages[0]['body']).decode('utf-8')
+    assert f'<title>{title}' in first
+    assert '<thead>' in first
+    assert 'm0000' not in first and 'm0001' not in first
+
+    # 全チャンクをつなげると1つの gzip ストリームになる
+    body = zlib.decompress(b''.join(m['body'] for m in messages), wbits=31).decode('utf-8')
+    assert body == response.text
+    assert body.rstrip().endswith('</html>')
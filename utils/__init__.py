@@ -2,5 +2,9 @@
 ユーティリティ関連のパッケージ
 """
 from .helpers import format_datetime, truncate_text, extract_email_domain
+from .events import event_bus, EventBus
+from .log import get_logger, setup_logging, log_fields, sampled
+from .metrics import metrics, MetricsRegistry
 
-__all__ = ['format_datetime', 'truncate_text', 'extract_email_domain']
\ No newline at end of file
+__all__ = ['format_datetime', 'truncate_text', 'extract_email_domain', 'event_bus', 'EventBus',
+           'get_logger', 'setup_logging', 'log_fields', 'sampled', 'metrics', 'MetricsRegistry']
@@ -0,0 +1,127 @@
+"""
+画面へのリアルタイム通知（Server-Sent Events）のイベントバス
+
+DBへの書き込みやメール処理の各段階（スケジューラー・プッシュ取り込みなど別スレッド）から publish し、
+/api/v1/events を開いているブラウザのタブ（asyncio のイベントループ）へ届ける。
+
+- email-changed: {ids, action（saved / completed / pending / deleted / archived）, status, emails?}
+- stats-changed: {} 同じメールボックスの連続した変更は EVENT_STATS_INTERVAL_SECONDS に1回へまとめる
+- run-progress:  {trigger, phase（fetch / analyze / done）, status, done, total, fetched, analyzed, saved, skipped, elapsed_ms}
+
+購読者ごとに上限付きのキューを持つ。遅いタブのキューが溢れたら中身を捨てて resync を1件だけ送り、
+ページ側で取り直させる（書き込み側は購読者を待たない）。購読者がいなければ publish は何もしない。
+"""
+import asyncio
+import itertools
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from utils.metrics import metrics
+from config import EVENT_QUEUE_SIZE, EVENT_STATS_INTERVAL_SECONDS
+
+EVENTS_PUBLISHED = metrics.counter('profmail_events_published_total', '画面へ送ったイベント数（種類別）', ['event'])
+EVENTS_DROPPED = metrics.counter('profmail_events_dropped_total', 'キューが溢れて捨てたイベント数')
+
+
+class Subscription:
+    """1つのタブの購読（イベントループとキュー）"""
+
+    def __init__(self, mailbox: str, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.mailbox = mailbox
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """次のイベント（timeout 秒以内に来なければ None）"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _put(self, event: Dict[str, Any]):
+        """イベントループ上で呼ばれる"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            dropped = self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            EVENTS_DROPPED.inc(dropped + 1)
+            self.queue.put_nowait({'id': event['id'], 'event': 'resync', 'data': {}})
+
+
+class EventBus:
+    """メールボックス単位で購読・配信するイベントバス"""
+
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE, stats_interval: float = EVENT_STATS_INTERVAL_SECONDS):
+        self.queue_size = queue_size
+        self.stats_interval = stats_interval
+        self._subscriptions: List[Subscription] = []
+        self._stats_pending: set = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, mailbox: str) -> Subscription:
+        """このメールボックスのイベントを購読（イベントループ上で呼ぶ）"""
+        subscription = Subscription(mailbox, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscriptions = [*self._subscriptions, subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def publish(self, event_type: str, data: Dict[str, Any], mailbox: Optional[str] = None):
+        """イベントを配信（mailbox が None なら全メールボックスの購読者へ、どのスレッドからでも呼べる）"""
+        subscriptions = self._subscriptions  # 購読・解除のたびに作り直すので、ロックなしで読める
+        targets = [s for s in subscriptions if mailbox is None or s.mailbox == mailbox]
+        if not targets:
+            return
+        event = {'id': next(self._ids), 'event': event_type, 'data': data}
+        EVENTS_PUBLISHED.inc(event=event_type)
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, event)
+            except RuntimeError:
+                # イベントループが終了済み（切断を検知する前にサーバーが止まった場合など）
+                self.unsubscribe(subscription)
+
+    def email_changed(self, mailbox: Optional[str], ids: Iterable[str], action: str, status: Optional[str] = None,
+                      emails: Optional[List[Dict[str, Any]]] = None):
+        """メールの追加・更新・状態変更を通知し、統計の変更もまとめて通知する"""
+        if not self._subscriptions:
+            return
+        ids = list(ids)
+        if not ids:
+            return
+        data: Dict[str, Any] = {'ids': ids, 'action': action, 'status': status}
+        if emails is not None:
+            data['emails'] = emails
+        self.publish('email-changed', data, mailbox)
+        self.stats_changed(mailbox)
+
+    def stats_changed(self, mailbox: Optional[str]):
+        """統計の変更を通知（stats_interval の間の変更は1回にまとめる）"""
+        if not self._subscriptions:
+            return
+        with self._lock:
+            if mailbox in self._stats_pending:
+                return
+            self._stats_pending.add(mailbox)
+        timer = threading.Timer(self.stats_interval, self._flush_stats, args=(mailbox,))
+        timer.daemon = True
+        timer.start()
+
+    def _flush_stats(self, mailbox: Optional[str]):
+        with self._lock:
+            self._stats_pending.discard(mailbox)
+        self.publish('stats-changed', {}, mailbox)
+
+
+# プロセス共通のイベントバス
+event_bus = EventBus()
+
+metrics.callback('profmail_event_subscribers', 'イベントを購読中のタブ数', 'gauge', lambda: {(): len(event_bus)})
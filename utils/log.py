@@ -0,0 +1,130 @@
+"""
+構造化ログ
+
+標準の logging の上に、レベル・JSON出力・メール単位のDEBUG行のサンプリング・
+キュー経由の非同期出力（QueueHandler / QueueListener）を用意する。
+件名・差出人・本文などの個人情報は既定ではログに出さない（PROFMAIL_LOG_INCLUDE_PII=true で出力）。
+
+    logger = get_logger(__name__)
+    logger.info("📬 メール取得完了", extra=log_fields(count=len(emails)))
+    logger.debug("📝 メール保存", extra=sampled(email_id=email_id, action='inserted'))
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from config import LOG_LEVEL, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE, LOG_INCLUDE_PII
+
+ROOT_LOGGER_NAME = 'profmail'
+
+# 既定のログに値を出さないフィールド（長さだけ残す）
+PII_FIELDS = frozenset({
+    'subject', 'sender', 'sender_email', 'body', 'reply_draft', 'reply_html', 'summary', 'query'
+})
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def log_fields(**fields: Any) -> Dict[str, Any]:
+    """logger の extra に渡す構造化フィールド"""
+    return {'fields': fields}
+
+
+def sampled(**fields: Any) -> Dict[str, Any]:
+    """サンプリング対象の行（LOG_DEBUG_SAMPLE_RATE の割合だけ出力）"""
+    return {'fields': fields, 'sampled': True}
+
+
+def redact(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """個人情報フィールドを伏せ字にする"""
+    if LOG_INCLUDE_PII:
+        return fields
+    return {
+        key: f"<redacted:{len(str(value))}>" if key in PII_FIELDS and value is not None else value
+        for key, value in fields.items()
+    }
+
+
+class SamplingFilter(logging.Filter):
+    """sampled() 付きの行を一定割合だけ通す（キュー投入前に捨てるので呼び出し側の負担も小さい）"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, 'sampled', False):
+            return self.rate >= 1.0 or random.random() < self.rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """1行1JSONのフォーマッター"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update(redact(getattr(record, 'fields', None) or {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """人が読む用のフォーマッター（フィールドは key=value で末尾に付ける）"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s', datefmt='%H:%M:%S')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = redact(getattr(record, 'fields', None) or {})
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT,
+                  sample_rate: float = LOG_DEBUG_SAMPLE_RATE) -> logging.Logger:
+    """profmail ロガーを設定（2回目以降は何もしない）
+
+    ログ出力は QueueListener のスレッドで行い、リクエスト処理やメール処理の
+    スレッドは標準出力への書き込みを待たない。
+    """
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    with _setup_lock:
+        if _listener is not None:
+            return root
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+        log_queue: 'queue.SimpleQueue[logging.LogRecord]' = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(sample_rate))
+
+        root.handlers = [queue_handler]
+        root.setLevel(level)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+    return root
+
+
+def get_logger(name: str) -> logging.Logger:
+    """profmail 配下のロガー取得（未設定なら既定値で設定）"""
+    setup_logging()
+    short_name = name.rsplit('.', 1)[-1] if name != '__main__' else 'main'
+    return logging.getLogger(f'{ROOT_LOGGER_NAME}.{short_name}')
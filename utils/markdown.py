@@ -0,0 +1,158 @@
+"""
+返信草案用の軽量マークダウン→HTML変換
+
+行単位で1回だけ走査し、インライン要素も1パスでトークン化する（入力長に対して線形）。
+すべてのテキストはHTMLエスケープされる。
+対応記法: 見出し(# 〜 ###)、箇条書き(- / * / +)、番号付きリスト(1.)、
+**太字**、`コード`、[リンク](https://...)、```コードブロック```
+"""
+import re
+from html import escape
+from typing import Dict, List
+
+_HEADING_PATTERN = re.compile(r'^(#{1,3})\s+(.*)$')
+_BULLET_PATTERN = re.compile(r'^\s*[-*+]\s+(.*)$')
+_ORDERED_PATTERN = re.compile(r'^\s*\d+[.)]\s+(.*)$')
+_SAFE_URL_PATTERN = re.compile(r'^(https?://|mailto:)', re.IGNORECASE)
+_MAX_URL_LENGTH = 2048
+# インライン記法の開始記号（ここまではC実装の正規表現で読み飛ばす）
+_SPECIAL_PATTERN = re.compile(r'`|\*\*|\[')
+
+# 既存のカード表示に合わせて # → h2, ## → h3, ### → h4
+_HEADING_TAGS = {1: 'h2', 2: 'h3', 3: 'h4'}
+
+
+def render_inline(text: str) -> str:
+    """インライン要素を変換（エスケープ込み）
+
+    閉じ記号の検索結果を記号ごとに覚えておくことで、閉じられていない
+    記号が大量にあっても再走査せずに済む（全体で線形時間）。
+    """
+    if _SPECIAL_PATTERN.search(text) is None:
+        return escape(text)
+
+    parts: List[str] = []
+    next_positions: Dict[str, int] = {}
+    literal_start = 0
+    i = 0
+
+    def find(token: str, start: int) -> int:
+        position = next_positions.get(token)
+        if position is None or (position != -1 and position < start):
+            position = text.find(token, start)
+            next_positions[token] = position
+        return position
+
+    def emit(html: str, end: int):
+        parts.append(escape(text[literal_start:i]))
+        parts.append(html)
+        return end
+
+    while True:
+        special = _SPECIAL_PATTERN.search(text, i)
+        if special is None:
+            break
+        i = special.start()
+        char = text[i]
+        if char == '`':
+            end = find('`', i + 1)
+            if end > i + 1:
+                i = literal_start = emit(f"<code>{escape(text[i + 1:end])}</code>", end + 1)
+                continue
+        elif char == '*':
+            end = find('**', i + 2)
+            if end > i + 2:
+                i = literal_start = emit(f"<strong>{escape(text[i + 2:end])}</strong>", end + 2)
+                continue
+            i += 2
+            continue
+        elif char == '[':
+            close = find(']', i + 1)
+            if close > i + 1 and text.startswith('(', close + 1):
+                paren = find(')', close + 2)
+                url = text[close + 2:paren] if 0 < paren - close - 2 <= _MAX_URL_LENGTH else ''
+                if url and not any(c.isspace() for c in url) and _SAFE_URL_PATTERN.match(url):
+                    label = escape(text[i + 1:close])
+                    link = f'<a href="{escape(url)}" target="_blank" rel="noopener">{label}</a>'
+                    i = literal_start = emit(link, paren + 1)
+                    continue
+        i += 1
+
+    parts.append(escape(text[literal_start:]))
+    return ''.join(parts)
+
+
+def render_markdown(text: str) -> str:
+    """マークダウンをHTMLに変換"""
+    if not text:
+        return ''
+
+    html: List[str] = []
+    paragraph: List[str] = []
+    list_tag = None
+    in_code_block = False
+    code_lines: List[str] = []
+
+    def flush_paragraph():
+        if paragraph:
+            html.append(f"<p>{'<br>'.join(paragraph)}</p>")
+            paragraph.clear()
+
+    def flush_code_block():
+        code = escape('\n'.join(code_lines))
+        html.append(f"<pre><code>{code}</code></pre>")
+        code_lines.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            html.append(f"</{list_tag}>")
+            list_tag = None
+
+    for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        if line.lstrip().startswith('```'):
+            if in_code_block:
+                flush_code_block()
+                in_code_block = False
+            else:
+                flush_paragraph()
+                close_list()
+                in_code_block = True
+            continue
+        if in_code_block:
+            code_lines.append(line)
+            continue
+
+        if not line.strip():
+            flush_paragraph()
+            close_list()
+            continue
+
+        heading = _HEADING_PATTERN.match(line)
+        if heading:
+            flush_paragraph()
+            close_list()
+            tag = _HEADING_TAGS[len(heading.group(1))]
+            html.append(f"<{tag}>{render_inline(heading.group(2).strip())}</{tag}>")
+            continue
+
+        bullet = _BULLET_PATTERN.match(line)
+        ordered = None if bullet else _ORDERED_PATTERN.match(line)
+        if bullet or ordered:
+            flush_paragraph()
+            tag = 'ul' if bullet else 'ol'
+            if list_tag != tag:
+                close_list()
+                html.append(f"<{tag}>")
+                list_tag = tag
+            html.append(f"<li>{render_inline((bullet or ordered).group(1))}</li>")
+            continue
+
+        close_list()
+        paragraph.append(render_inline(line))
+
+    if in_code_block:
+        flush_code_block()
+    flush_paragraph()
+    close_list()
+    return ''.join(html)